@@ -3,6 +3,8 @@ from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from .models import Profile, Client
 from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from . import images
 
 # The BusRegisterForm class is a form for registering users with validation that checks if the email
 # domain belongs to a student.
@@ -84,3 +86,14 @@ class ProfileUpdateForm(forms.ModelForm):
     class Meta:
         model = Profile
         fields = ['image', 'bio', 'cv']
+
+    def clean_image(self):
+        """
+        This function checks the uploaded image against the budget of profiles before decoding it and
+        replaces it with a bounded JPEG without metadata.
+        :return: the sanitized image, or the current image if no file has been uploaded.
+        """
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            image = images.sanitize(image, 'profile')
+        return image
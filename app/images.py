@@ -0,0 +1,302 @@
+import os
+from datetime import timedelta
+from io import BytesIO
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+from .models import ImageJob
+
+# Pillow warns about images with more pixels than this and only refuses to open those with more than
+# twice as many, so the uploads are held to it by `inspect` from the dimensions in their header.
+Image.MAX_IMAGE_PIXELS = settings.IMAGE_MAX_PIXELS
+
+# The formats the variants are encoded in, with the name of the Pillow plugin, the media type sent by
+# the clients that accept them and the options of the encoder. JPEG is always written, as the fallback
+# for the clients that accept no other format.
+FORMATS = {
+    'avif': ('AVIF', 'image/avif', {'quality': 60, 'speed': 8}),
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', 'image/jpeg', {'optimize': True, 'progressive': True}),
+}
+
+def formats():
+    """
+    The function returns the formats the variants are encoded in, best first.
+    :return: a list with the extensions of the formats of the `IMAGE_FORMATS` setting Pillow has an
+    encoder for, followed by 'jpg'. The encoders are looked up in the registry of the plugins, which
+    also knows the formats added by third party plugins.
+    """
+    Image.init()
+    return [ext for ext in settings.IMAGE_FORMATS if FORMATS[ext][0] in Image.SAVE] + ['jpg']
+
+def qualities(header):
+    """
+    The function parses the Accept header of a request.
+
+    :param header: The header parameter is the value of the Accept header
+    :return: a dictionary with the quality of every media type listed by the client, in lowercase and
+    without its parameters. Media types with an invalid quality are left out.
+    """
+    accepted = {}
+    for part in header.split(','):
+        media_type, *params = [value.strip() for value in part.split(';')]
+        quality = next((param[2:] for param in params if param.startswith('q=')), '1')
+        try:
+            accepted[media_type.lower()] = float(quality)
+        except ValueError:
+            pass
+    return accepted
+
+def negotiate(request):
+    """
+    The function picks the best image format accepted by the client that made a request. Only the
+    media types listed by name count, as the wildcards sent by every client say nothing about the
+    formats it can decode.
+
+    :param request: The request parameter is the HttpRequest, whose Accept header lists the media types
+    the client can display
+    :return: the extension of the format with the highest quality for the client, the best of them in
+    the order of `formats` on a tie, or 'jpg' if the client accepts no other format.
+    The result is kept in the `image_format` attribute of the request, which also tells the
+    `VaryAcceptMiddleware` that the response depends on the Accept header.
+    """
+    if not hasattr(request, 'image_format'):
+        accepted = qualities(request.META.get('HTTP_ACCEPT', ''))
+        candidates = [ext for ext in formats()[:-1] if accepted.get(FORMATS[ext][1], 0) > 0]
+        request.image_format = max(candidates, key=lambda ext: accepted[FORMATS[ext][1]], default='jpg')
+    return request.image_format
+
+def variant_name(name, variant, ext='jpg'):
+    """
+    The function returns the name of a variant of an uploaded image, stored next to the original.
+
+    :param name: The name parameter is the name of the original image in the storage
+    :param variant: The variant parameter is the name of the variant, one of the keys of the
+    `IMAGE_VARIANTS` setting
+    :param ext: The ext parameter is the extension of the format of the variant, one of the keys of
+    `FORMATS`
+    :return: the name of the variant, made of the name of the original without its extension, the name
+    of the variant and the extension of its format.
+    """
+    base, original = os.path.splitext(name)
+    return f'{base}_{variant}.{ext}'
+
+def flatten(image):
+    """
+    The function converts an image to RGB, painting transparent pixels white instead of black.
+
+    :param image: The image parameter is a Pillow image in any mode
+    :return: an RGB Pillow image.
+    """
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+def inspect(upload, budget):
+    """
+    The function checks an uploaded image against a budget using only its size in bytes and the
+    dimensions in its header, without decoding any pixel.
+
+    :param upload: The upload parameter is the UploadedFile received in the request
+    :param budget: The budget parameter is the name of the budget of the field, one of the keys of the
+    `IMAGE_BUDGETS` setting, such as 'profile', 'post', 'offer' or 'message'
+    :raises ValidationError: if the file is not an image, or if it has more bytes or pixels than the
+    budget or the `IMAGE_MAX_PIXELS` setting allow.
+    """
+    pixels, size = settings.IMAGE_BUDGETS[budget]
+    pixels = min(pixels, settings.IMAGE_MAX_PIXELS)
+    if upload.size > size:
+        raise ValidationError(f'The image must be smaller than {size // 2 ** 20} MB.')
+    too_large = ValidationError(f'The image must have less than {pixels // 10 ** 6} megapixels.')
+    upload.seek(0)
+    try:
+        with Image.open(upload) as image:
+            width, height = image.size
+    except Image.DecompressionBombError:
+        # Pillow refuses to open the images with more than twice `IMAGE_MAX_PIXELS` pixels
+        raise too_large
+    except OSError:
+        raise ValidationError('Upload a valid image.')
+    finally:
+        upload.seek(0)
+    if width * height > pixels:
+        raise too_large
+
+def sanitize(upload, budget):
+    """
+    The function checks an uploaded image against a budget and decodes it at the smallest scale that
+    still covers the `IMAGE_MAX_EDGE` setting, using the draft mode of JPEG images. The image is
+    rotated as its EXIF orientation says and encoded again as a JPEG without any metadata.
+
+    :param upload: The upload parameter is the UploadedFile received in the request
+    :param budget: The budget parameter is the name of the budget of the field, as in `inspect`
+    :raises ValidationError: if the image does not fit in the budget or cannot be decoded
+    :return: a ContentFile with the JPEG, named after the upload, to be saved in place of the upload.
+    """
+    inspect(upload, budget)
+    edge = settings.IMAGE_MAX_EDGE
+    try:
+        with Image.open(upload) as original:
+            original.draft('RGB', (edge, edge))
+            image = flatten(ImageOps.exif_transpose(original))
+    except Image.DecompressionBombError:
+        limit = settings.IMAGE_MAX_PIXELS // 10 ** 6
+        raise ValidationError(f'The image must have less than {limit} megapixels.')
+    except OSError:
+        raise ValidationError('Upload a valid image.')
+    image.thumbnail((edge, edge), Image.LANCZOS, reducing_gap=3.0)
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=settings.IMAGE_QUALITY)
+    return ContentFile(buffer.getvalue(), name=upload.name)
+
+def generate(field):
+    """
+    The function decodes an uploaded image once and encodes every variant of the `IMAGE_VARIANTS`
+    setting in every format, from the largest to the smallest, each one scaled down from the previous
+    one. Files that already exist are kept.
+
+    :param field: The field parameter is the ImageFieldFile of a Profile, Post, Offer or Message
+    :return: the number of files written, which is 0 if they all existed or the image could not be
+    decoded.
+    """
+    storage = field.storage
+    # Variants are named after their original instead of their own content, so they can be found
+    save = getattr(storage, 'store', storage.save)
+    variants = sorted(settings.IMAGE_VARIANTS.items(), key=lambda item: item[1], reverse=True)
+    missing = []
+    for variant, size in variants:
+        exts = [ext for ext in formats() if not storage.exists(variant_name(field.name, variant, ext))]
+        missing.append((variant, size, exts))
+    if not any(exts for variant, size, exts in missing):
+        return 0
+    try:
+        with field.open('rb'), Image.open(field) as original:
+            original.draft('RGB', (variants[0][1], variants[0][1]))
+            image = flatten(ImageOps.exif_transpose(original))
+    except (OSError, Image.DecompressionBombError):
+        return 0
+    written = 0
+    for variant, size, exts in missing:
+        image.thumbnail((size, size), Image.LANCZOS)
+        for ext in exts:
+            plugin, media_type, options = FORMATS[ext]
+            buffer = BytesIO()
+            image.save(buffer, plugin, **{'quality': settings.IMAGE_QUALITY, **options})
+            save(variant_name(field.name, variant, ext), ContentFile(buffer.getvalue()))
+            written += 1
+    return written
+
+def available(field):
+    """
+    The function lists the formats every variant of an image has been generated in.
+
+    :param field: The field parameter is the ImageFieldFile of a Profile, Post, Offer or Message
+    :return: a list with the extensions of the formats, best first.
+    """
+    names = lambda ext: [variant_name(field.name, variant, ext) for variant in settings.IMAGE_VARIANTS]
+    return [ext for ext in formats() if all(field.storage.exists(name) for name in names(ext))]
+
+def enqueue(instance):
+    """
+    The function leaves the generation of the variants of a new image to the generate_images worker, so
+    saving an image costs no encoding. A pending job of the same instance is started over, as the image
+    it was made for has been replaced.
+
+    :param instance: The instance parameter is the Profile, Post, Offer or Message whose image changed
+    :return: the ImageJob of the instance.
+    """
+    job, created = ImageJob.objects.update_or_create(
+        model=instance._meta.label_lower, object_id=instance.pk,
+        defaults={'attempts': 0, 'locked': None, 'is_dead': False, 'timestamp': timezone.now()},
+    )
+    return job
+
+def claim():
+    """
+    The function takes the oldest job that no other worker is running. A job locked for longer than the
+    `IMAGE_TIMEOUT` setting belongs to a worker that died or failed, and is taken again.
+
+    :return: the ImageJob claimed, or None if there is nothing to do.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.IMAGE_TIMEOUT)
+    free = Q(locked=None) | Q(locked__lt=stale)
+    for pk in ImageJob.objects.filter(free, is_dead=False).values_list('id', flat=True)[:10]:
+        if ImageJob.objects.filter(free, pk=pk).update(locked=now):
+            return ImageJob.objects.get(pk=pk)
+    return None
+
+def run(job):
+    """
+    The function generates the variants of the current image of the instance of a job and records the
+    formats they exist in on the instance, whose version is bumped so its cached cards show them. The
+    job is deleted unless it was started over for a newer image in the meantime.
+
+    :param job: The job parameter is the ImageJob claimed by the worker
+    :return: the number of files written.
+    """
+    model = apps.get_model(job.model)
+    instance = model.objects.filter(pk=job.object_id).only('image').first()
+    written = 0
+    if instance and instance.image:
+        written = generate(instance.image)
+        changes = {'image_formats': ' '.join(available(instance.image))}
+        if any(field.name == 'version' for field in model._meta.fields):
+            changes['version'] = F('version') + 1
+        model.objects.filter(pk=instance.pk, image=instance.image.name).update(**changes)
+    ImageJob.objects.filter(pk=job.pk, locked=job.locked).delete()
+    return written
+
+def work(limit=None):
+    """
+    The function runs the pending jobs one after the other. A job that fails stays locked, so it is
+    tried again once the `IMAGE_TIMEOUT` setting has passed, and is given up on after
+    `IMAGE_MAX_ATTEMPTS` failures. The images of the jobs given up on are shown without variants.
+
+    :param limit: The limit parameter is the maximum number of jobs to run, None for every pending job
+    :return: a tuple with the number of jobs run, the number of files written, the number of jobs that
+    failed and the number of those given up on.
+    """
+    jobs = written = failed = dead = 0
+    while limit is None or jobs + failed < limit:
+        job = claim()
+        if job is None:
+            break
+        try:
+            written += run(job)
+            jobs += 1
+        except Exception:
+            attempts = job.attempts + 1
+            is_dead = attempts >= settings.IMAGE_MAX_ATTEMPTS
+            ImageJob.objects.filter(pk=job.pk, locked=job.locked)\
+                .update(locked=timezone.now(), attempts=attempts, is_dead=is_dead)
+            failed += 1
+            dead += is_dead
+    return jobs, written, failed, dead
+
+def url(field, variant, ext='jpg'):
+    """
+    The function returns the URL of a variant of an image in the best available format, falling back
+    to JPEG and then to the original image when the variant has not been generated. The formats
+    generated are read from the `image_formats` field of the instance, without looking for the files.
+
+    :param field: The field parameter is the ImageFieldFile of a Profile, Post, Offer or Message
+    :param variant: The variant parameter is the name of the variant, such as 'avatar', 'card' or 'full'
+    :param ext: The ext parameter is the extension of the format accepted by the client, as returned by
+    `negotiate`
+    :return: the URL of the variant, or an empty string if there is no image.
+    """
+    if not field:
+        return ''
+    generated = field.instance.image_formats.split()
+    for candidate in dict.fromkeys([ext, 'jpg']):
+        if candidate in generated:
+            return field.storage.url(variant_name(field.name, variant, candidate))
+    return field.url
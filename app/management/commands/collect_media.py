@@ -0,0 +1,124 @@
+import os
+import re
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from app import images
+from app.models import Blob
+from post.models import Post, Offer
+
+# The files of a shard directory: a blob, named after its hash, or a variant of a blob, named after the
+# hash of the blob followed by the name of the variant.
+SHARDED = re.compile(r'^([0-9a-f]{64})(_\w+)?\.\w+$')
+SHARD = re.compile(r'^[0-9a-f]{2}$')
+
+# This command removes the media nobody can see any more: the images of deleted posts and offers, the
+# blobs without references and their variants, and the files of the shard directories that no blob
+# accounts for, such as uploads whose instance was never saved. Only files older than the MEDIA_GRACE
+# setting are removed, so uploads in progress are never touched.
+class Command(BaseCommand):
+    help = 'Removes the media of deleted content and the blobs without references'
+
+    def add_arguments(self, parser):
+        """
+        This function adds the option to report what would be removed without removing anything.
+        """
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be removed')
+
+    def handle(self, *args, **options):
+        """
+        This function releases the images of deleted content, removes the unreferenced blobs and the
+        orphaned files, and reports how many files and bytes were reclaimed.
+        """
+        dry_run = options['dry_run']
+        cleared = 0
+        for model in (Post, Offer):
+            for item in model.objects.filter(is_delete=True).exclude(image='').exclude(image=None).iterator():
+                cleared += 1
+                if not dry_run:
+                    item.image = None
+                    item.save(update_fields=['image'])
+        self.stdout.write(f'Released the images of {cleared} deleted posts and offers')
+
+        cutoff = timezone.now() - timedelta(seconds=settings.MEDIA_GRACE)
+        files = size = 0
+        blobs = Blob.objects.filter(refs__lte=0, timestamp__lt=cutoff)
+        for blob in blobs.iterator():
+            if dry_run:
+                files, size = files + 1, size + blob.size
+                continue
+            # The row and the files go in one transaction, which holds the write lock of the database
+            # until the files are gone, so an upload of the same content registering the blob meanwhile
+            # either keeps the row alive or waits and writes the file again
+            with transaction.atomic():
+                if not Blob.objects.filter(pk=blob.pk, refs__lte=0, timestamp__lt=cutoff).delete()[0]:
+                    continue
+                for name in [blob.name] + self.variants(blob.name):
+                    removed = self.remove(name)
+                    files, size = files + bool(removed), size + removed
+        self.stdout.write(f'Removed {files} files of unreferenced blobs, {size} bytes')
+
+        files = size = 0
+        for directory in self.shards():
+            known = {
+                os.path.basename(name).split('.')[0]
+                for name in Blob.objects.filter(name__startswith=directory + '/').values_list('name', flat=True)
+            }
+            for filename in default_storage.listdir(directory)[1]:
+                match = SHARDED.match(filename)
+                name = f'{directory}/{filename}'
+                if not match or match.group(1) in known or default_storage.get_modified_time(name) >= cutoff:
+                    continue
+                if dry_run:
+                    files, size = files + 1, size + default_storage.size(name)
+                    continue
+                with transaction.atomic():
+                    # The update takes the write lock and tells whether an upload registered the blob
+                    # since the directory was listed
+                    blob = f'{directory}/{match.group(1)}'
+                    if Blob.objects.filter(name__startswith=blob + '.').update(timestamp=F('timestamp')):
+                        continue
+                    removed = self.remove(name)
+                    files, size = files + bool(removed), size + removed
+        self.stdout.write(f'Removed {files} orphaned files, {size} bytes')
+
+    def variants(self, name):
+        """
+        This function lists the names every variant of a blob may have.
+
+        :param name: The name parameter is the name of the blob
+        :return: a list with the name of the blob for every variant and format.
+        """
+        return [
+            images.variant_name(name, variant, ext)
+            for variant in settings.IMAGE_VARIANTS for ext in images.FORMATS
+        ]
+
+    def remove(self, name):
+        """
+        This function deletes a file from the storage if it exists.
+
+        :param name: The name parameter is the name of the file
+        :return: the number of bytes removed, 0 if the file did not exist.
+        """
+        if not default_storage.exists(name):
+            return 0
+        size = default_storage.size(name)
+        default_storage.delete(name)
+        return size
+
+    def shards(self):
+        """
+        This function lists the shard directories of the storage.
+
+        :return: a generator of the names of the directories, such as "ab/cd".
+        """
+        for first in default_storage.listdir('')[0]:
+            if SHARD.match(first):
+                for second in default_storage.listdir(first)[0]:
+                    if SHARD.match(second):
+                        yield f'{first}/{second}'
@@ -0,0 +1,43 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from app import images
+from app.models import Profile, ImageJob
+from post.models import Post, Offer
+from chat.models import Message
+
+# This command is the worker that generates the variants of the new images. It runs forever, waiting
+# IMAGE_SLEEP seconds whenever there is nothing to do, unless --once is given. With --all, every image
+# is queued first, for the images uploaded before the variants existed or after the IMAGE_VARIANTS
+# setting has changed. Variants that already exist are kept.
+class Command(BaseCommand):
+    help = 'Generates the variants of the uploaded images'
+
+    def add_arguments(self, parser):
+        """
+        This function adds the options to queue every image and to run the pending jobs once and exit.
+        """
+        parser.add_argument('--all', action='store_true', help='Queue every image first')
+        parser.add_argument('--once', action='store_true', help='Run the pending jobs and exit')
+
+    def handle(self, *args, **options):
+        """
+        This function queues every image if asked to, then runs the pending jobs, reporting every
+        batch, and waits for new ones.
+        """
+        if options['all']:
+            for model in (Profile, Post, Offer, Message):
+                ids = model.objects.exclude(image='').exclude(image=None).values_list('pk', flat=True)
+                ImageJob.objects.bulk_create(
+                    [ImageJob(model=model._meta.label_lower, object_id=pk) for pk in ids.iterator()],
+                    batch_size=500, ignore_conflicts=True,
+                )
+                self.stdout.write(f'Queued the images of the {model._meta.verbose_name_plural}')
+        while True:
+            jobs, written, failed, dead = images.work()
+            if jobs or failed:
+                self.stdout.write(f'Ran {jobs} jobs writing {written} variants, {failed} failed, '
+                    f'{dead} given up on')
+            if options['once']:
+                break
+            time.sleep(settings.IMAGE_SLEEP)
@@ -0,0 +1,20 @@
+from django.utils.cache import patch_vary_headers
+
+# The VaryAcceptMiddleware class marks the responses whose image URLs were chosen from the Accept
+# header of the request, so shared caches keep one copy per image format.
+class VaryAcceptMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """
+        This function adds Accept to the Vary header of the response when the image format has been
+        negotiated while handling the request.
+
+        :param request: The request parameter is the HttpRequest being handled
+        :return: the response of the view, with the Vary header patched when needed.
+        """
+        response = self.get_response(request)
+        if hasattr(request, 'image_format'):
+            patch_vary_headers(response, ['Accept'])
+        return response
@@ -0,0 +1,28 @@
+# Generated by Django 4.1.5 on 2026-10-18 10:54
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_profile_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('refs', models.IntegerField(default=0)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='blob',
+            index=models.Index(fields=['refs', 'timestamp'], name='blob_refs_idx'),
+        ),
+    ]
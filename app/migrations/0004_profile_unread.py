@@ -0,0 +1,18 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='unread',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:10
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_followers(apps, schema_editor):
+    Profile = apps.get_model('app', 'Profile')
+    Relationship = apps.get_model('app', 'Relationship')
+    followers = Relationship.objects.filter(to_user=OuterRef('user'), is_follow=True)\
+        .values('to_user').annotate(total=Count('id')).values('total')
+    Profile.objects.update(follower_count=Coalesce(Subquery(followers), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_profile_unread'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_followers, migrations.RunPython.noop),
+    ]
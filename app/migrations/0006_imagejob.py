@@ -0,0 +1,37 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:39
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_profile_follower_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=32)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('locked', models.DateTimeField(blank=True, null=True)),
+                ('is_dead', models.BooleanField(default=False)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['timestamp', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='imagejob',
+            index=models.Index(condition=models.Q(('is_dead', False)), fields=['timestamp', 'id'], name='imagejob_due_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='imagejob',
+            constraint=models.UniqueConstraint(fields=('model', 'object_id'), name='imagejob_unique'),
+        ),
+    ]
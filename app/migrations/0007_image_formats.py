@@ -0,0 +1,28 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:41
+
+from django.db import migrations, models
+
+
+def queue_images(apps, schema_editor):
+    ImageJob = apps.get_model('app', 'ImageJob')
+    for label in ['app.profile']:
+        model = apps.get_model(*label.split('.'))
+        ids = model.objects.exclude(image='').exclude(image=None).values_list('pk', flat=True)
+        ImageJob.objects.bulk_create([ImageJob(model=label, object_id=pk) for pk in ids],
+            batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_imagejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='image_formats',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.RunPython(queue_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:46
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_image_formats'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='profile',
+            name='mails',
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import User
 import uuid
 from django.utils import timezone
@@ -53,12 +54,15 @@ class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     bio = models.CharField(max_length=100, blank=True, null=True)
     image = models.ImageField(default='default.png', upload_to=rename_image)
+    image_formats = models.CharField(max_length=50, blank=True, default='')
     business = models.BooleanField(default=False)
     domain = models.URLField(default='https://example.com')
     strikes = models.IntegerField(default=0)
     strike_date = models.DateTimeField(default=timezone.now)
     cv = models.FileField(default='default.pdf', upload_to=rename_document)
-    mails = models.IntegerField(default=0)
+    version = models.PositiveIntegerField(default=0)
+    unread = models.PositiveIntegerField(default=0)
+    follower_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         """
@@ -68,6 +72,18 @@ class Profile(models.Model):
         """
         return f"{self.user.username}'s profile"
 
+    def save(self, *args, **kwargs):
+        """
+        This function saves the profile and bumps its version in the same statement when it already
+        exists, so a stale copy never writes back an older version.
+        """
+        bump = not self._state.adding and kwargs.get('update_fields') is None
+        if bump:
+            self.version = F('version') + 1
+        super().save(*args, **kwargs)
+        if bump:
+            self.refresh_from_db(fields=['version'])
+
     def following(self):
         """
         This function returns a queryset of users that the current user is following.
@@ -117,6 +133,19 @@ class Profile(models.Model):
             .values_list('from_user_id', flat=True)
         return User.objects.filter(id__in=user_ids)
 
+    def blocks(self, user):
+        """
+        This function checks whether the current user has blocked another user, without loading the
+        whole list of blocked users.
+        :param user: The user parameter is the User that may have been blocked. Anonymous users are
+        never blocked
+        :return: True if a relationship from the current user to the given user with `is_block` set to
+        True exists, False otherwise.
+        """
+        if not user.is_authenticated:
+            return False
+        return Relationship.objects.filter(from_user=self.user, to_user=user, is_block=True).exists()
+
 # The `Relationship` class defines a model with fields for a relationship between two `User`
 # instances, including whether they are following each other or if one has been blocked by the other.
 class Relationship(models.Model):
@@ -162,3 +191,93 @@ class Client(models.Model):
         :return: A string representation of the object's name attribute.
         """
         return f'{self.name}'
+
+# The BlobQuerySet class counts the references to the blobs of the content-addressed storage, with one
+# statement per blob so concurrent uploads of the same file never lose a reference.
+class BlobQuerySet(models.QuerySet):
+    def register(self, name, size):
+        """
+        This function records that a blob is being stored, before its file is looked for, so the
+        `collect_media` command does not remove the file meanwhile. The statement waits for a command
+        removing the same blob to finish, in which case the blob is registered again.
+
+        :param name: The name parameter is the name of the blob
+        :param size: The size parameter is the size of the content in bytes
+        """
+        if not self.filter(name=name).update(timestamp=timezone.now()):
+            self.get_or_create(name=name, defaults={'size': size})
+
+    def retain(self, names, storage):
+        """
+        This function adds a reference to every blob in a list, registering the blobs seen for the
+        first time.
+
+        :param names: The names parameter is a list with the names of the blobs now stored in a field
+        :param storage: The storage parameter is the storage of the field, used to read the size of the
+        new blobs
+        """
+        for name in names:
+            if not self.filter(name=name).update(refs=F('refs') + 1, timestamp=timezone.now()):
+                self.create(name=name, refs=1, size=storage.size(name) if storage.exists(name) else 0)
+
+    def release(self, names):
+        """
+        This function removes a reference from every blob in a list. Blobs left without references are
+        deleted by the `collect_media` command.
+
+        :param names: The names parameter is a list with the names of the blobs no longer stored in a
+        field
+        """
+        for name in names:
+            self.filter(name=name).update(refs=F('refs') - 1, timestamp=timezone.now())
+
+# The Blob class records a file of the content-addressed storage, with the number of fields that store
+# it and the time that number last changed.
+class Blob(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    refs = models.IntegerField(default=0)
+    size = models.PositiveBigIntegerField(default=0)
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    objects = BlobQuerySet.as_manager()
+
+    # This class sets the index used to find the blobs without references.
+    class Meta:
+        indexes = [
+            models.Index(fields=['refs', 'timestamp'], name='blob_refs_idx'),
+        ]
+
+    def __str__(self):
+        """
+        This function returns a string representation of a blob.
+        :return: A string with the name of the blob and its number of references.
+        """
+        return f'{self.name} ({self.refs})'
+
+# The ImageJob class is a pending generation of the variants of the image of a Profile, Post, Offer or
+# Message, carried out by the generate_images worker instead of the request that saved the image.
+class ImageJob(models.Model):
+    model = models.CharField(max_length=32)
+    object_id = models.PositiveBigIntegerField()
+    attempts = models.PositiveIntegerField(default=0)
+    locked = models.DateTimeField(blank=True, null=True)
+    is_dead = models.BooleanField(default=False)
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    # This class sets the order the jobs are carried out in, the key that keeps a single job for every
+    # image field and the index used to find the pending jobs, which leaves out the jobs given up on.
+    class Meta:
+        ordering = ['timestamp', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'object_id'], name='imagejob_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='imagejob_due_idx', condition=models.Q(is_dead=False)),
+        ]
+
+    def __str__(self):
+        """
+        This function returns a string representation of a job.
+        :return: A string with the model and the id of the instance whose image is processed.
+        """
+        return f'{self.model} {self.object_id}'
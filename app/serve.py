@@ -0,0 +1,225 @@
+import mimetypes
+import os
+import re
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse, FileResponse, StreamingHttpResponse
+from django.urls import re_path
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# Files whose name changes with their content, which can be cached forever: the blobs of the
+# content-addressed storage and their variants, and the static files named with the hash of their
+# content by the manifest.
+IMMUTABLE = [
+    re.compile(r'(^|/)[0-9a-f]{64}(_\w+)?\.\w+$'),
+    re.compile(r'\.[0-9a-f]{12}\.\w+$'),
+]
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# The precompressed siblings written by collectstatic, best first, with their content coding.
+PRECOMPRESSED = [('.br', 'br'), ('.gz', 'gzip')]
+CHUNK_SIZE = 64 * 1024
+
+def is_immutable(path):
+    """
+    The function checks whether a file is named after its content, so its URL always serves the same
+    bytes.
+
+    :param path: The path parameter is the path of the file relative to its root
+    :return: True if the name of the file contains the hash of its content.
+    """
+    return any(pattern.search(path) for pattern in IMMUTABLE)
+
+def accepted(header):
+    """
+    The function parses the Accept-Encoding header of a request.
+
+    :param header: The header parameter is the value of the Accept-Encoding header
+    :return: a set with the content codings the client accepts, leaving out those with a quality of 0.
+    """
+    codings = set()
+    for part in header.split(','):
+        coding, *params = [value.strip() for value in part.split(';')]
+        quality = next((param[2:] for param in params if param.startswith('q=')), '1')
+        try:
+            if float(quality) > 0:
+                codings.add(coding.lower())
+        except ValueError:
+            pass
+    return codings
+
+def precompressed(request, fullpath):
+    """
+    The function picks the precompressed sibling of a file accepted by the client, if any.
+
+    :param request: The request parameter is the HttpRequest for the file
+    :param fullpath: The fullpath parameter is the absolute path of the file
+    :return: a tuple with the extension of the sibling and its content coding, None if the client
+    accepts none of the siblings, or False if the file has no sibling at all, so the response does not
+    depend on the Accept-Encoding header.
+    """
+    siblings = [(ext, coding) for ext, coding in PRECOMPRESSED if os.path.isfile(fullpath + ext)]
+    if not siblings:
+        return False
+    codings = accepted(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    return next(((ext, coding) for ext, coding in siblings if coding in codings), None)
+
+def byte_range(header, size):
+    """
+    The function parses the Range header of a request. Only a single range of bytes is supported, as it
+    is what browsers send to read PDF documents and resume downloads.
+
+    :param header: The header parameter is the value of the Range header
+    :param size: The size parameter is the size of the file in bytes
+    :return: a tuple with the first and the last byte requested, None if the header is missing or not
+    supported so the whole file is sent, or False if the range cannot be satisfied.
+    """
+    match = RANGE.match(header.replace(' ', '')) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+def read(path, start, length):
+    """
+    The function reads part of a file in chunks, so large ranges are streamed instead of loaded in
+    memory.
+
+    :param path: The path parameter is the absolute path of the file
+    :param start: The start parameter is the first byte to read
+    :param length: The length parameter is the number of bytes to read
+    :return: a generator of the chunks of the range.
+    """
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+def not_modified(request, etag, mtime):
+    """
+    The function checks the conditional headers of a request against the version of a file. The
+    If-None-Match header is used when present, as it is more precise than If-Modified-Since.
+
+    :param request: The request parameter is the HttpRequest for the file
+    :param etag: The etag parameter is the entity tag of the file
+    :param mtime: The mtime parameter is the time the file was last modified, in seconds
+    :return: True if the client already has the file.
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return etag in parse_etags(if_none_match)
+    since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE'))
+    return since is not None and int(mtime) <= since
+
+def offload(response, path, url):
+    """
+    The function hands the sending of a file over to the front proxy, as set by the `SERVE_OFFLOAD`
+    setting, which also handles the ranges of the request.
+
+    :param response: The response parameter is the HttpResponse with the headers of the file
+    :param path: The path parameter is the absolute path of the file, sent to servers using X-Sendfile
+    :param url: The url parameter is the path of the request, sent to nginx after the
+    `SERVE_ACCEL_PREFIX` setting, which names an internal location of the proxy
+    :return: the response, without a body.
+    """
+    if settings.SERVE_OFFLOAD == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = settings.SERVE_ACCEL_PREFIX + url
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+@require_safe
+def serve(request, path, document_root):
+    """
+    This function serves a media or static file in production, with long-lived caching for the files
+    named after their content, entity tags, single byte ranges and the offload of the bytes to the
+    front proxy. The precompressed sibling of the file is sent instead when the client accepts it.
+
+    :param request: The request parameter is the HttpRequest for the file
+    :param path: The path parameter is the path of the file relative to the document root
+    :param document_root: The document_root parameter is the directory the files are served from,
+    `MEDIA_ROOT` or `STATIC_ROOT`
+    :return: the file, part of it, a 304 response if the client has it, as told by its entity tag or its
+    date, or a 416 response if the range cannot be satisfied.
+    """
+    try:
+        fullpath = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404('File not found')
+    if not os.path.isfile(fullpath):
+        raise Http404('File not found')
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    filename = os.path.basename(fullpath)
+    sibling = precompressed(request, fullpath)
+    url = request.path
+    if sibling:
+        fullpath, url, encoding = fullpath + sibling[0], url + sibling[0], sibling[1]
+    stat = os.stat(fullpath)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': (
+            f'public, max-age={settings.SERVE_MAX_AGE}, immutable' if is_immutable(path)
+            else f'public, max-age={settings.SERVE_REVALIDATE_AGE}'
+        ),
+    }
+
+    if sibling is not False:
+        headers['Vary'] = 'Accept-Encoding'
+    if encoding:
+        headers['Content-Encoding'] = encoding
+
+    if not_modified(request, etag, stat.st_mtime):
+        return HttpResponse(status=304, headers=headers)
+
+    content_type = content_type or 'application/octet-stream'
+    if settings.SERVE_OFFLOAD:
+        response = HttpResponse(content_type=content_type, headers=headers)
+        return offload(response, fullpath, url)
+
+    requested = byte_range(request.META.get('HTTP_RANGE'), stat.st_size)
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if requested is None or (if_range and if_range != etag):
+        # The name of the file is given, as the precompressed sibling would be named otherwise
+        response = FileResponse(open(fullpath, 'rb'), filename=filename, content_type=content_type,
+            headers=headers)
+    elif requested is False:
+        response = HttpResponse(status=416, headers=headers)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+    else:
+        start, end = requested
+        response = StreamingHttpResponse(
+            read(fullpath, start, end - start + 1), status=206, content_type=content_type, headers=headers
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = end - start + 1
+    return response
+
+def urls(prefix, document_root):
+    """
+    The function returns the URL pattern that serves the files of a directory with `serve`, like the
+    `static` helper of Django does in development.
+
+    :param prefix: The prefix parameter is the URL the files are served under, `MEDIA_URL` or
+    `STATIC_URL`
+    :param document_root: The document_root parameter is the directory the files are served from
+    :return: a list with the URL pattern, empty if the prefix is an external URL.
+    """
+    if not prefix or '://' in prefix:
+        return []
+    return [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(prefix.lstrip('/')), serve, {'document_root': document_root}),
+    ]
@@ -1,9 +1,92 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save, post_delete
+from django.db.models import F
 from django.contrib.auth.models import User
-from .models import Profile
+from .models import Profile, Relationship, Blob
+from post.models import Post, Offer
+from chat.models import Message
+from . import images
 from django.dispatch import receiver
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
+
+@receiver(post_save, sender=Relationship)
+@receiver(post_delete, sender=Relationship)
+def touch_relationship(sender, instance, **kwargs):
+    Profile.objects.filter(user__in=[instance.from_user_id, instance.to_user_id])\
+        .update(version=F('version') + 1)
+
+@receiver(post_init, sender=Relationship)
+def remember_follow(sender, instance, **kwargs):
+    instance._follow = instance.__dict__.get('is_follow', False)
+
+@receiver(post_save, sender=Relationship)
+def count_follow(sender, instance, created, **kwargs):
+    delta = instance.is_follow - (False if created else instance._follow)
+    if delta:
+        Profile.objects.filter(user=instance.to_user_id).update(follower_count=F('follower_count') + delta)
+    instance._follow = instance.is_follow
+
+@receiver(post_delete, sender=Relationship)
+def count_unfollow(sender, instance, **kwargs):
+    if instance._follow:
+        Profile.objects.filter(user=instance.to_user_id).update(follower_count=F('follower_count') - 1)
+
+# The file fields of every model, whose blobs are reference counted
+FILES = {Profile: ('image', 'cv'), Post: ('image',), Offer: ('image',), Message: ('image',)}
+
+def stored_files(sender, instance):
+    # Deferred fields are left out, as saving the instance does not write them
+    return {field: str(instance.__dict__[field] or '') for field in FILES[sender] if field in instance.__dict__}
+
+def changed_files(sender, instance, created):
+    # The fields whose file differs from the one the instance was loaded or last saved with
+    old = {} if created else instance._files
+    new = stored_files(sender, instance)
+    return old, new, [field for field in new if (created or field in old) and new[field] != old.get(field)]
+
+def blob_names(storage, names):
+    return [name for name in names if getattr(storage, 'is_blob', lambda name: False)(name)]
+
+@receiver(post_init, sender=Profile)
+@receiver(post_init, sender=Post)
+@receiver(post_init, sender=Offer)
+@receiver(post_init, sender=Message)
+def remember_files(sender, instance, **kwargs):
+    instance._files = stored_files(sender, instance)
+
+@receiver(post_save, sender=Profile)
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Offer)
+@receiver(post_save, sender=Message)
+def count_files(sender, instance, created, **kwargs):
+    old, new, changed = changed_files(sender, instance, created)
+    storage = instance._meta.get_field(FILES[sender][0]).storage
+    Blob.objects.retain(blob_names(storage, [new[field] for field in changed]), storage)
+    Blob.objects.release(blob_names(storage, [old[field] for field in changed if field in old]))
+    instance._files.update(new)
+    instance._changed = changed
+
+# Connected after count_files, which records the fields whose file changed, so the variants are only
+# queued for a new image and not on every save. They are generated by the generate_images worker, and
+# the new image is shown as uploaded until then
+@receiver(post_save, sender=Profile)
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Offer)
+@receiver(post_save, sender=Message)
+def generate_images(sender, instance, **kwargs):
+    if 'image' in instance._changed and instance.image_formats:
+        instance.image_formats = ''
+        sender.objects.filter(pk=instance.pk).update(image_formats='')
+    if instance.image and 'image' in instance._changed:
+        images.enqueue(instance)
+
+@receiver(post_delete, sender=Profile)
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Offer)
+@receiver(post_delete, sender=Message)
+def release_files(sender, instance, **kwargs):
+    storage = instance._meta.get_field(FILES[sender][0]).storage
+    Blob.objects.release(blob_names(storage, instance._files.values()))
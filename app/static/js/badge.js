@@ -0,0 +1,17 @@
+let badge = document.getElementById("badge");
+
+if (badge) {
+  fetch(badge.dataset.api, {
+    headers: { Accept: "application/json" },
+    credentials: "same-origin",
+  })
+    .then(function (response) {
+      return response.json();
+    })
+    .then(function (counts) {
+      if (counts.unread) {
+        badge.textContent = counts.unread > 99 ? "99+" : counts.unread;
+        badge.style.display = "inline";
+      }
+    });
+}
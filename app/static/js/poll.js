@@ -0,0 +1,38 @@
+let fresh = document.getElementById("fresh");
+
+function poll() {
+  let url = new URL(fresh.dataset.api, location.href);
+  url.searchParams.set("since", fresh.dataset.since);
+  fetch(url, {
+    headers: { Accept: "application/json" },
+    credentials: "same-origin",
+  })
+    .then(function (response) {
+      return response.json();
+    })
+    .then(function (news) {
+      if (news.count) {
+        fresh.querySelector("span").textContent = news.count + " new";
+        fresh.style.display = "block";
+      }
+      schedule(news.interval);
+    })
+    .catch(function () {
+      schedule();
+    });
+}
+
+function schedule(interval) {
+  setTimeout(function () {
+    if (document.hidden) {
+      schedule(interval);
+    } else {
+      poll();
+    }
+  }, (interval || 15) * 1000);
+}
+
+if (fresh) {
+  fresh.querySelector("a").href = location.pathname + location.search;
+  schedule();
+}
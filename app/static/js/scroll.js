@@ -0,0 +1,144 @@
+let more = document.getElementById("more");
+let loading = false;
+
+function element(tag, className, text) {
+  let node = document.createElement(tag);
+  if (className) {
+    node.className = className;
+  }
+  if (text) {
+    node.textContent = text;
+  }
+  return node;
+}
+
+function icon(name) {
+  return element("i", "uil " + name + " button__icon");
+}
+
+function buildCard(item) {
+  let badges = {
+    superuser: "uil-polygon",
+    staff: "uil-wrench",
+    business: "uil-check-circle",
+  };
+  let card = element("div", "project__bg");
+  card.id = item.id;
+  let container = element("div", "project__container container grid");
+  card.appendChild(container);
+
+  let data = element("div", "project__data");
+  let author = element("a", "button button--flex button--white");
+  author.href = item.author.url + "#" + item.id;
+  let avatar = element("img", "testimonial__img");
+  avatar.src = item.author.avatar;
+  avatar.alt = "";
+  author.appendChild(avatar);
+  let name = element("div", "button__icon", "@" + item.author.username + " ");
+  if (item.author.badge) {
+    name.appendChild(element("i", "uil " + badges[item.author.badge]));
+  }
+  author.appendChild(name);
+  data.appendChild(author);
+  container.appendChild(data);
+
+  let time = element("time", "project__description");
+  time.appendChild(element("i", "uil uil-clock"));
+  time.appendChild(
+    document.createTextNode(" " + new Date(item.timestamp).toLocaleString())
+  );
+  container.appendChild(time);
+
+  if (item.head) {
+    container.appendChild(element("div", "project__title", item.head));
+    container.appendChild(element("br"));
+  }
+
+  let body = element("p", "project__description", item.text);
+  body.appendChild(element("br"));
+  if (item.image) {
+    let image = element("img", "project__img");
+    image.src = item.image;
+    image.alt = "";
+    image.loading = "lazy";
+    body.appendChild(image);
+  }
+  body.appendChild(element("br"));
+
+  let like = element("a", "button button--flex button--white", item.likes + " ");
+  like.href = item.like_url;
+  like.style.fontSize = "1.25rem";
+  like.appendChild(icon(item.liked_by_me ? "uil-heart-break" : "uil-heart-alt"));
+  body.appendChild(like);
+
+  if (item.comments !== undefined) {
+    let comments = element(
+      "a",
+      "button button--flex button--white",
+      item.comments + " "
+    );
+    comments.href = item.url + "#comments";
+    comments.style.fontSize = "1.25rem";
+    comments.appendChild(icon("uil-comments"));
+    body.appendChild(comments);
+  }
+
+  if (item.topics.length) {
+    body.appendChild(element("br"));
+    body.appendChild(element("br"));
+    body.appendChild(document.createTextNode("Topics: "));
+    item.topics.forEach(function (topic) {
+      let link = element(
+        "a",
+        "button button--flex button--white",
+        "#" + topic.name
+      );
+      link.href = topic.url;
+      body.appendChild(link);
+    });
+  }
+  container.appendChild(body);
+  return card;
+}
+
+function loadMore() {
+  if (loading || !more.dataset.cursor) {
+    return;
+  }
+  loading = true;
+  let query = new URLSearchParams(location.search);
+  query.set("cursor", more.dataset.cursor);
+  fetch(more.dataset.api + "?" + query.toString(), {
+    headers: { Accept: "application/json" },
+    credentials: "same-origin",
+  })
+    .then(function (response) {
+      return response.json();
+    })
+    .then(function (page) {
+      page.results.forEach(function (item) {
+        more.parentNode.insertBefore(buildCard(item), more);
+        more.parentNode.insertBefore(element("br"), more);
+      });
+      if (page.next) {
+        more.dataset.cursor = page.next;
+        query.set("cursor", page.next);
+        more.querySelector("a").href = "?" + query.toString();
+      } else {
+        delete more.dataset.cursor;
+        more.style.display = "none";
+      }
+      loading = false;
+    })
+    .catch(function () {
+      loading = false;
+    });
+}
+
+if (more && more.dataset.api && "IntersectionObserver" in window) {
+  new IntersectionObserver(function (entries) {
+    if (entries[0].isIntersecting) {
+      loadMore();
+    }
+  }, { rootMargin: "600px" }).observe(more);
+}
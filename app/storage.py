@@ -0,0 +1,135 @@
+import gzip
+import hashlib
+import os
+import re
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from .models import Blob
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# A blob is a file stored under the SHA-256 of its content, in two levels of directories named after
+# the first four hexadecimal digits of the hash, such as "ab/cd/abcd...ef.jpg".
+BLOB = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.\w+$')
+
+# The static files worth compressing, and the size under which compressing them saves nothing.
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.xml', '.map', '.ico')
+COMPRESS_MIN_SIZE = 256
+
+# The ContentStorage class stores every upload once, under a name derived from its content, so
+# identical files uploaded again share the same blob, and spreads the blobs over 65536 directories.
+class ContentStorage(FileSystemStorage):
+    def hashed_name(self, name, content):
+        """
+        This function computes the name of the blob of a file from the hash of its content.
+
+        :param name: The name parameter is the name given to the upload by the `upload_to` function of
+        the field, from which only the extension is kept
+        :param content: The content parameter is the File being saved
+        :return: the sharded name of the blob.
+        """
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        digest = digest.hexdigest()
+        ext = os.path.splitext(name)[1].lower()
+        return f'{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+    def save(self, name, content, max_length=None):
+        """
+        This function saves an upload as a blob, skipping the write when a blob with the same content
+        already exists. The blob is registered first, so a file found here is not removed before the
+        field holding it is saved.
+
+        :param name: The name parameter is the name given to the upload by its field
+        :param content: The content parameter is the File being saved
+        :param max_length: The max_length parameter is the maximum length of the name
+        :return: the name of the blob, to be stored in the field.
+        """
+        name = self.hashed_name(name, content)
+        Blob.objects.register(name, content.size)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+    def store(self, name, content):
+        """
+        This function saves a file derived from a blob, such as a variant of an image, under the exact
+        name given instead of the hash of its content.
+
+        :param name: The name parameter is the name of the derived file
+        :param content: The content parameter is the File being saved
+        :return: the name of the file.
+        """
+        if self.exists(name):
+            self.delete(name)
+        return super().save(name, content)
+
+    def is_blob(self, name):
+        """
+        This function checks whether a name is the name of a blob, as opposed to a default file or a
+        file uploaded before the storage was content-addressed.
+
+        :param name: The name parameter is the name stored in a file field
+        :return: True if the name is the sharded name of a blob.
+        """
+        return bool(name and BLOB.match(name))
+
+# The CompressedManifestStaticFilesStorage class names every static file after the hash of its content
+# when running collectstatic, and writes a gzip and, when the brotli package is installed, a brotli
+# sibling of the text files, which are sent instead of the file to the clients that accept them.
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        """
+        This function hashes the collected files, then compresses the hashed copies of the text files.
+
+        :param paths: The paths parameter is a dictionary with the collected files
+        :param dry_run: The dry_run parameter tells whether collectstatic is only reporting its work
+        :return: a generator of tuples with the original name, the processed name and whether it was
+        processed, for every hashed and every compressed file.
+        """
+        hashed = []
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed.append(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in hashed:
+            for compressed in self.compress(name):
+                yield compressed, compressed, True
+
+    def compress(self, name):
+        """
+        This function writes the precompressed siblings of a static file, keeping only those smaller
+        than the file.
+
+        :param name: The name parameter is the hashed name of the file
+        :return: a list with the names of the siblings written.
+        """
+        if not name.endswith(COMPRESSIBLE):
+            return []
+        with self.open(name) as file:
+            content = file.read()
+        if len(content) < COMPRESS_MIN_SIZE:
+            return []
+        encoders = [('.gz', lambda data: gzip.compress(data, 9, mtime=0))]
+        if brotli is not None:
+            encoders.append(('.br', lambda data: brotli.compress(data, quality=11)))
+        written = []
+        for ext, encode in encoders:
+            data = encode(content)
+            if len(data) < len(content):
+                if self.exists(name + ext):
+                    self.delete(name + ext)
+                self._save(name + ext, ContentFile(data))
+                written.append(name + ext)
+        return written
@@ -0,0 +1,13 @@
+from django import template
+from app import images
+
+register = template.Library()
+
+@register.simple_tag(takes_context=True)
+def media(context, field, variant):
+    request = context.get('request')
+    return images.url(field, variant, images.negotiate(request) if request else 'jpg')
+
+@register.filter
+def image_format(request):
+    return images.negotiate(request)
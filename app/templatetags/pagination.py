@@ -0,0 +1,23 @@
+from django import template
+from django.urls import reverse, NoReverseMatch
+from post.pagination import encode_cursor
+
+register = template.Library()
+
+@register.simple_tag(takes_context=True)
+def cursor_url(context, cursor):
+    query = context['request'].GET.copy()
+    query['cursor'] = cursor
+    return '?' + query.urlencode()
+
+@register.simple_tag(takes_context=True)
+def api_url(context):
+    match = context['request'].resolver_match
+    try:
+        return reverse('post:api_' + match.url_name, kwargs=match.kwargs)
+    except NoReverseMatch:
+        return ''
+
+@register.filter
+def cursor(item):
+    return encode_cursor(item)
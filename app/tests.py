@@ -1,3 +1,398 @@
-from django.test import TestCase
+import gzip
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from post.models import Post
+from .models import Blob, ImageJob
+from . import images, serve, storage
 
-# Create your tests here.
+def picture(color):
+    """
+    The function creates a small JPEG image.
+
+    :param color: The color parameter is the color the image is filled with, so different colors give
+    different blobs
+    :return: a ContentFile with the JPEG.
+    """
+    buffer = BytesIO()
+    Image.new('RGB', (40, 30), color).save(buffer, 'JPEG')
+    return ContentFile(buffer.getvalue(), name='upload.jpg')
+
+# The BlobTests class checks the reference counts of the blobs of the content-addressed storage, kept by
+# the signals of the models with files, and the removal of the blobs nobody uses.
+class BlobTests(TestCase):
+    def setUp(self):
+        """
+        This function stores the media of the test in a temporary directory.
+        """
+        self.media = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media)
+        self.override.enable()
+        self.user = User.objects.create_user('uploader', 'uploader@udg.mx', 'password')
+
+    def tearDown(self):
+        """
+        This function removes the temporary media directory.
+        """
+        self.override.disable()
+        shutil.rmtree(self.media, ignore_errors=True)
+
+    def post(self, color):
+        """
+        This function creates a post with an image.
+
+        :param color: The color parameter is the color of the image
+        :return: the Post created.
+        """
+        post = Post(user=self.user, content=color)
+        post.image.save('upload.jpg', picture(color), save=False)
+        post.save()
+        return post
+
+    def refs(self, name):
+        """
+        This function reads the number of references of a blob.
+
+        :param name: The name parameter is the name of the blob
+        :return: the number of references, or None if the blob is not registered.
+        """
+        return Blob.objects.filter(name=name).values_list('refs', flat=True).first()
+
+    def test_shared(self):
+        """
+        This function checks that identical uploads are stored once and counted twice.
+        """
+        first, second = self.post('red'), self.post('red')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(self.refs(first.image.name), 2)
+
+    def test_unchanged(self):
+        """
+        This function checks that saving an instance again, or only some of its fields, keeps the count.
+        """
+        post = self.post('red')
+        post.content = 'edited'
+        post.save()
+        post.save(update_fields=['like_count'])
+        Post.objects.defer('image').get(pk=post.pk).save()
+        self.assertEqual(self.refs(post.image.name), 1)
+
+    def test_replaced(self):
+        """
+        This function checks that replacing an image moves the reference from the old blob to the new.
+        """
+        post = self.post('red')
+        old = post.image.name
+        post.image.save('upload.jpg', picture('blue'))
+        self.assertEqual((self.refs(old), self.refs(post.image.name)), (0, 1))
+
+    def test_deleted(self):
+        """
+        This function checks that deleting an instance releases its blob.
+        """
+        post = self.post('red')
+        post.delete()
+        self.assertEqual(self.refs(post.image.name), 0)
+
+    def test_collect(self):
+        """
+        This function checks that the blobs without references are removed with their variants once
+        they are older than `MEDIA_GRACE`, and that the same content uploaded again is written again.
+        """
+        post = self.post('red')
+        name = post.image.name
+        post.delete()
+        call_command('collect_media', stdout=StringIO())
+        self.assertTrue(default_storage.exists(name))
+        Blob.objects.filter(name=name).update(timestamp=timezone.now() - timedelta(days=30))
+        call_command('collect_media', stdout=StringIO())
+        self.assertFalse(default_storage.exists(name))
+        self.assertIsNone(self.refs(name))
+        again = self.post('red')
+        self.assertEqual(again.image.name, name)
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(self.refs(name), 1)
+
+# The ImageTests class checks the generation of the variants of the images by the generate_images
+# worker, out of the requests that save the images.
+@override_settings(IMAGE_FORMATS=[], IMAGE_MAX_ATTEMPTS=2)
+class ImageTests(TestCase):
+    def setUp(self):
+        """
+        This function stores the media of the test in a temporary directory.
+        """
+        self.media = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media)
+        self.override.enable()
+        self.user = User.objects.create_user('uploader', 'uploader@udg.mx', 'password')
+        ImageJob.objects.all().delete()
+
+    def tearDown(self):
+        """
+        This function removes the temporary media directory.
+        """
+        self.override.disable()
+        shutil.rmtree(self.media, ignore_errors=True)
+
+    def post(self, color):
+        """
+        This function creates a post with an image.
+
+        :param color: The color parameter is the color of the image
+        :return: the Post created.
+        """
+        post = Post(user=self.user, content=color)
+        post.image.save('upload.jpg', picture(color), save=False)
+        post.save()
+        return post
+
+    def variants(self, post):
+        """
+        This function lists the variants of the image of a post found in the storage.
+
+        :param post: The post parameter is the Post whose variants are looked for
+        :return: a list with the names of the variants that exist.
+        """
+        names = [images.variant_name(post.image.name, variant) for variant in settings.IMAGE_VARIANTS]
+        return [name for name in names if default_storage.exists(name)]
+
+    def test_queued(self):
+        """
+        This function checks that saving an image writes no variant and queues a single job, which the
+        worker carries out.
+        """
+        post = self.post('red')
+        post.content = 'edited'
+        post.save()
+        self.assertEqual(self.variants(post), [])
+        self.assertEqual(ImageJob.objects.count(), 1)
+        self.assertEqual(images.work(), (1, len(settings.IMAGE_VARIANTS), 0, 0))
+        self.assertEqual(len(self.variants(post)), len(settings.IMAGE_VARIANTS))
+        self.assertFalse(ImageJob.objects.exists())
+
+    def test_replaced(self):
+        """
+        This function checks that the job of an image replaced while the job runs is kept, to be run
+        again for the new image.
+        """
+        post = self.post('red')
+        job = images.claim()
+        post.image.save('upload.jpg', picture('blue'))
+        images.run(job)
+        self.assertTrue(ImageJob.objects.filter(locked=None).exists())
+        self.assertEqual(images.work(), (1, 0, 0, 0))
+        self.assertEqual(len(self.variants(post)), len(settings.IMAGE_VARIANTS))
+
+    def test_dead(self):
+        """
+        This function checks that a job failing `IMAGE_MAX_ATTEMPTS` times is given up on.
+        """
+        self.post('red')
+        with mock.patch.object(images, 'generate', side_effect=OSError('Disk full')):
+            self.assertEqual(images.work(), (0, 0, 1, 0))
+            ImageJob.objects.update(locked=None)
+            self.assertEqual(images.work(), (0, 0, 1, 1))
+        self.assertIsNone(images.claim())
+        self.assertTrue(ImageJob.objects.get().is_dead)
+
+    def test_formats(self):
+        """
+        This function checks that the variants are shown once the worker has recorded them, without
+        looking for their files while rendering.
+        """
+        post = self.post('red')
+        self.assertEqual(images.url(post.image, 'card'), post.image.url)
+        images.work()
+        post.refresh_from_db()
+        self.assertEqual(post.image_formats, 'jpg')
+        self.assertEqual(post.version, 1)
+        with mock.patch.object(default_storage, 'exists', side_effect=AssertionError):
+            self.assertEqual(images.url(post.image, 'card', 'webp'),
+                default_storage.url(images.variant_name(post.image.name, 'card')))
+        post.image.save('upload.jpg', picture('blue'))
+        self.assertEqual(Post.objects.get(pk=post.pk).image_formats, '')
+
+    def test_negotiate(self):
+        """
+        This function checks that the format is chosen from the qualities of the media types the client
+        accepts by name.
+        """
+        headers = {
+            'image/avif,image/webp,*/*;q=0.8': 'avif',
+            'image/avif;q=0, image/webp': 'webp',
+            'image/avif;q=0.5,image/webp;q=0.9': 'webp',
+            'image/webp;q=0.5,image/avif;q=0.5': 'avif',
+            'IMAGE/AVIF': 'avif',
+            'image/*,*/*': 'jpg',
+            '': 'jpg',
+        }
+        factory = RequestFactory()
+        with mock.patch.object(images, 'formats', return_value=['avif', 'webp', 'jpg']):
+            for header, ext in headers.items():
+                self.assertEqual(images.negotiate(factory.get('/', HTTP_ACCEPT=header)), ext, header)
+
+    def test_bomb(self):
+        """
+        This function checks that an image Pillow refuses to open for its number of pixels is reported
+        as too large rather than as an invalid image.
+        """
+        buffer = BytesIO()
+        Image.new('L', (10, 10)).save(buffer, 'PNG')
+        data = bytearray(buffer.getvalue())
+        # The dimensions in the IHDR chunk of the PNG are replaced by those of a 400 megapixel image
+        data[16:24] = struct.pack('>II', 20000, 20000)
+        data[29:33] = struct.pack('>I', zlib.crc32(bytes(data[12:29])))
+        upload = SimpleUploadedFile('bomb.png', bytes(data), 'image/png')
+        with self.assertRaisesMessage(ValidationError, 'megapixels'):
+            images.inspect(upload, 'post')
+        with self.assertRaisesMessage(ValidationError, 'valid image'):
+            images.inspect(SimpleUploadedFile('text.png', b'not an image', 'image/png'), 'post')
+
+# The ServeTests class checks the responses of the view that serves the media and static files in
+# production: caching, conditional requests, ranges and precompressed siblings.
+class ServeTests(TestCase):
+    def setUp(self):
+        """
+        This function writes a stylesheet named after its content, with a gzip sibling, and a document.
+        """
+        self.root = tempfile.mkdtemp()
+        self.css = 'site.0123456789ab.css'
+        with open(os.path.join(self.root, self.css), 'wb') as file:
+            file.write(b'body { color: red; }' * 100)
+        with open(os.path.join(self.root, self.css + '.gz'), 'wb') as file:
+            file.write(gzip.compress(b'body { color: red; }' * 100))
+        with open(os.path.join(self.root, 'cv.pdf'), 'wb') as file:
+            file.write(bytes(range(100)))
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        """
+        This function removes the temporary directory of the files.
+        """
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def get(self, path, **headers):
+        """
+        This function requests a file from the view.
+
+        :param path: The path parameter is the path of the file relative to the temporary directory
+        :return: the response of the view.
+        """
+        return serve.serve(self.factory.get('/static/' + path, **headers), path, self.root)
+
+    def test_cache(self):
+        """
+        This function checks that files named after their content are cached forever and the others
+        revalidated.
+        """
+        self.assertIn('immutable', self.get(self.css)['Cache-Control'])
+        self.assertNotIn('immutable', self.get('cv.pdf')['Cache-Control'])
+        with self.assertRaises(Http404):
+            self.get('../secret.txt')
+
+    def test_not_modified(self):
+        """
+        This function checks that a client with the current version of a file, as told by its entity
+        tag or by its date, gets a 304 response, and that the entity tag takes precedence.
+        """
+        response = self.get('cv.pdf')
+        etag, modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.get('cv.pdf', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.get('cv.pdf', HTTP_IF_MODIFIED_SINCE=modified).status_code, 304)
+        self.assertEqual(self.get('cv.pdf', HTTP_IF_MODIFIED_SINCE='Sat, 01 Jan 2000 00:00:00 GMT')
+            .status_code, 200)
+        self.assertEqual(self.get('cv.pdf', HTTP_IF_MODIFIED_SINCE='yesterday').status_code, 200)
+        response = self.get('cv.pdf', HTTP_IF_NONE_MATCH='"other"', HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(response.status_code, 200)
+
+    def test_range(self):
+        """
+        This function checks that single byte ranges are sent as partial content, and that ranges out of
+        the file are refused.
+        """
+        response = self.get('cv.pdf', HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+        response = self.get('cv.pdf', HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(95, 100)))
+        self.assertEqual(self.get('cv.pdf', HTTP_RANGE='bytes=200-').status_code, 416)
+        response = self.get('cv.pdf', HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_precompressed(self):
+        """
+        This function checks that the gzip sibling is sent to the clients that accept it, under the
+        name of the original file.
+        """
+        response = self.get(self.css, HTTP_ACCEPT_ENCODING='br;q=0, gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn(f'filename="{self.css}"', response['Content-Disposition'])
+        content = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(content, b'body { color: red; }' * 100)
+        response = self.get(self.css, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', response)
+        response.close()
+
+# The StaticTests class checks that collectstatic names the static files after their content and writes
+# the precompressed siblings of the text files worth compressing.
+class StaticTests(TestCase):
+    def setUp(self):
+        """
+        This function writes a stylesheet, a tiny script and an image to collect, in a temporary
+        directory, and the directory they are collected to.
+        """
+        self.source, self.root = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.css = b'body { color: red; }\n' * 100
+        files = {'site.css': self.css, 'tiny.js': b'var a;', 'logo.png': bytes(1000)}
+        for name, content in files.items():
+            with open(os.path.join(self.source, name), 'wb') as file:
+                file.write(content)
+        self.override = override_settings(STATICFILES_DIRS=[self.source], STATIC_ROOT=self.root,
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STATICFILES_STORAGE='app.storage.CompressedManifestStaticFilesStorage')
+        self.override.enable()
+
+    def tearDown(self):
+        """
+        This function removes the temporary directories.
+        """
+        self.override.disable()
+        shutil.rmtree(self.source, ignore_errors=True)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_collect(self):
+        """
+        This function checks that the hashed stylesheet gets a smaller gzip sibling with the same
+        content, and that the tiny script and the image get none.
+        """
+        call_command('collectstatic', interactive=False, verbosity=0)
+        css = staticfiles_storage.stored_name('site.css')
+        self.assertRegex(css, r'^site\.[0-9a-f]{12}\.css$')
+        with open(os.path.join(self.root, css + '.gz'), 'rb') as file:
+            self.assertEqual(gzip.decompress(file.read()), self.css)
+        for name in ['tiny.js', 'logo.png']:
+            sibling = staticfiles_storage.stored_name(name) + '.gz'
+            self.assertFalse(os.path.exists(os.path.join(self.root, sibling)))
+        brotli = os.path.exists(os.path.join(self.root, css + '.br'))
+        self.assertEqual(brotli, storage.brotli is not None)
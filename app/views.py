@@ -3,6 +3,8 @@ from .models import Relationship
 from .forms import UserRegisterForm, ProfileUpdateForm, BusRegisterForm, BusProfileForm
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from staff.models import ReUser, FoBusiness, FoStaff
 from notifications.views import mail_verification, follower
 from notifications.views import strike as snotify
@@ -10,6 +12,7 @@ from django.utils import timezone
 from datetime import timedelta
 from post.models import Post, Offer
 from chat.views import send
+from post import timeline, conditional, pages
 
 def home(request):
     """
@@ -95,6 +98,8 @@ def startb(request):
     context = {'form':form}
     return render(request, 'app/startB.html', context)
 
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=conditional.bus)
 def bus(request, username):
     """
     This function displays a business profile page with offers if the user is a business and not blocked
@@ -114,17 +119,19 @@ def bus(request, username):
     """
     user = User.objects.get(username=username)
     if user.profile.business:
-        if request.user in user.profile.blocking():
+        if user.profile.blocks(request.user):
             return redirect('bus', request.user)
-        elif request.user not in user.profile.blocked():
-            offers = user.offers.filter(is_delete=False)
-            context = {'user':user, 'offers':offers}
+        elif not request.user.is_authenticated or not request.user.profile.blocks(user):
+            offers, cursor = pages.owned(request, user, 'offers')
+            context = {'user':user, 'offers':offers, 'cursor':cursor}
         else:
             context = {'user':user}
         return render(request, 'app/bus.html', context)
     else:
         return redirect('profile', user)
 
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=conditional.profile)
 def profile(request, username):
     """
     This function retrieves a user's profile and their posts, and checks if the requesting user is
@@ -142,11 +149,11 @@ def profile(request, username):
     see the profile information without any posts.
     """
     user = User.objects.get(username=username)
-    if request.user in user.profile.blocking():
+    if user.profile.blocks(request.user):
         return redirect('bus', request.user)
-    elif request.user not in user.profile.blocked():
-        posts = user.posts.filter(is_delete=False)
-        context = {'user':user, 'posts':posts}
+    elif not request.user.is_authenticated or not request.user.profile.blocks(user):
+        posts, cursor = pages.owned(request, user, 'posts')
+        context = {'user':user, 'posts':posts, 'cursor':cursor}
     else:
         context = {'user':user}
     return render(request, 'app/profile.html', context)
@@ -193,13 +200,16 @@ def follow(request, username):
         if rel.is_follow:
             rel.is_follow = False
             rel.save()
+            timeline.unfollow(current_user, to_user)
         else:
             rel.is_follow = True
             rel.save()
+            timeline.follow(current_user, to_user)
             follower(request, to_user)
     else:
         rel = Relationship(from_user=current_user, to_user=to_user, is_follow=True)
         rel.save()
+        timeline.follow(current_user, to_user)
         follower(request, to_user)
     return redirect('bus', username)
 
@@ -12,6 +12,7 @@ class Message(models.Model):
     is_read = models.BooleanField(default=False)
     is_system = models.BooleanField(default=False)
     image = models.ImageField(blank=True, null=True, upload_to=rename_image)
+    image_formats = models.CharField(max_length=50, blank=True, default='')
 
     def __str__(self):
         """
@@ -6,6 +6,8 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from staff.models import ReChat
 from notifications.views import message as notify
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
+from app import images
 
 INBOX = 'chat:inbox'
 
@@ -91,8 +93,9 @@ class InboxView(LoginRequiredMixin, DetailView):
         such as the user making the request, the HTTP method used, and any data submitted with the
         request
         :return: The view is returning a redirect to the `INBOX` view with the `username` parameter set
-        to the `username` of the `recipient` user object. If the user is not authenticated, the view is
-        rendering the `login.html` template.
+        to the `username` of the `recipient` user object. If the image is rejected, nothing is sent and
+        the inbox is rendered again with the reason in `error`. If the user is not authenticated, the
+        view is rendering the `login.html` template.
         """
         sender = User.objects.get(pk=request.POST.get('you'))
         recipient = User.objects.get(pk=request.POST.get('recipient'))
@@ -100,6 +103,13 @@ class InboxView(LoginRequiredMixin, DetailView):
         image = request.FILES.get('img')
         if request.user.is_authenticated:
             if request.method == 'POST':
+                if image:
+                    try:
+                        image = images.sanitize(image, 'message')
+                    except ValidationError as error:
+                        self.object = self.get_object()
+                        context = self.get_context_data(object=self.object, error=error.messages[0])
+                        return self.render_to_response(context, status=400)
                 mkpost(request, sender, recipient, message, image)
             return redirect(INBOX, username=recipient.username)
         else:
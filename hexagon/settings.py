@@ -59,6 +59,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'app.middleware.VaryAcceptMiddleware',
 ]
 
 ROOT_URLCONF = 'hexagon.urls'
@@ -88,7 +89,7 @@ WSGI_APPLICATION = 'hexagon.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('DATABASE_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
@@ -128,6 +129,12 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.1/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+
+# collectstatic names every static file after the hash of its content, records the names in a manifest
+# read by the static tag, and writes precompressed .gz and .br siblings of the text files
+
+STATICFILES_STORAGE = 'app.storage.CompressedManifestStaticFilesStorage'
 
 
 LOGIN_REDIRECT_URL = 'post:feed'
@@ -136,8 +143,121 @@ LOGOUT_REDIRECT_URL = 'login'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'app', 'media')
 MEDIA_URL = 'media/'
 
+# Uploads are stored once under the hash of their content, in directories sharded by its first digits.
+# Files without references are removed by the collect_media command once they are MEDIA_GRACE seconds old
+
+DEFAULT_FILE_STORAGE = 'app.storage.ContentStorage'
+MEDIA_GRACE = 24 * 3600
+
+# Without DEBUG, media and static files are served by app.serve. Files named after their content are
+# cached for SERVE_MAX_AGE seconds and the others for SERVE_REVALIDATE_AGE seconds. SERVE_OFFLOAD hands
+# the bytes over to the front proxy with 'x-accel-redirect', to the internal location named by
+# SERVE_ACCEL_PREFIX, or with 'x-sendfile'
+
+SERVE_MAX_AGE = 365 * 24 * 3600
+SERVE_REVALIDATE_AGE = 3600
+SERVE_OFFLOAD = None
+SERVE_ACCEL_PREFIX = '/protected'
+
 LOGIN_URL = 'login'
 
+# Number of posts or offers rendered per page of a timeline
+
+PAGE_SIZE = 20
+
+# Home timelines keep the newest TIMELINE_SIZE entries of each user, and accounts with more than
+# FANOUT_LIMIT followers are read from the posts table instead of being copied to every follower
+
+TIMELINE_SIZE = 800
+FANOUT_LIMIT = 5000
+
+# New posts and offers are delivered to the followers by the fanout worker, FANOUT_CHUNK followers per
+# transaction. The worker looks for new jobs every FANOUT_SLEEP seconds, a job locked for
+# FANOUT_TIMEOUT seconds is taken again by another worker, and a job that failed FANOUT_MAX_ATTEMPTS
+# times is given up on
+
+FANOUT_CHUNK = 500
+FANOUT_SLEEP = 1
+FANOUT_TIMEOUT = 300
+FANOUT_MAX_ATTEMPTS = 5
+
+# Number of topic ids kept in memory by each process to resolve the topics of new posts
+
+TOPIC_CACHE_SIZE = 1024
+
+# Trending topics are counted in buckets of TRENDING_BUCKET seconds over a window of TRENDING_WINDOW
+# seconds, where counts lose half of their weight every TRENDING_HALF_LIFE seconds. The list is computed
+# again every TRENDING_REFRESH seconds
+
+TRENDING_BUCKET = 3600
+TRENDING_WINDOW = 48 * 3600
+TRENDING_HALF_LIFE = 6 * 3600
+TRENDING_REFRESH = 300
+TRENDING_SIZE = 10
+
+# Comment threads are loaded up to COMMENT_DEPTH levels of replies and COMMENT_LIMIT comments
+
+COMMENT_DEPTH = 4
+COMMENT_LIMIT = 200
+
+# Clients polling for new posts or offers are told about POLL_LIMIT new items at most, every
+# POLL_INTERVAL seconds. Each process caches the newest item for POLL_CACHE seconds, which bounds how
+# late it sees the items created by the other processes
+
+POLL_LIMIT = 99
+POLL_INTERVAL = 15
+POLL_CACHE = 5
+
+# Uploaded images are encoded again as JPEG variants whose longest side is at most the given number
+# of pixels, used by the templates instead of the original
+
+IMAGE_VARIANTS = {
+    'avatar': 160,
+    'card': 800,
+    'full': 1600,
+}
+IMAGE_QUALITY = 85
+
+# The variants are generated by the generate_images worker, which looks for new images every
+# IMAGE_SLEEP seconds. A job locked for IMAGE_TIMEOUT seconds is taken again by another worker, and a
+# job that failed IMAGE_MAX_ATTEMPTS times is given up on
+
+IMAGE_SLEEP = 1
+IMAGE_TIMEOUT = 300
+IMAGE_MAX_ATTEMPTS = 5
+
+# Besides JPEG, the variants are encoded in these formats when Pillow supports them, best first, and
+# every client gets the best one it accepts
+
+IMAGE_FORMATS = ['avif', 'webp']
+
+# Uploaded images are checked from their headers against a budget of pixels and bytes per field before
+# being decoded, then stored as a JPEG whose longest side is at most IMAGE_MAX_EDGE pixels. Pillow
+# refuses to open any image with more than IMAGE_MAX_PIXELS pixels
+
+IMAGE_BUDGETS = {
+    'profile': (12 * 10 ** 6, 5 * 2 ** 20),
+    'post': (40 * 10 ** 6, 15 * 2 ** 20),
+    'offer': (40 * 10 ** 6, 15 * 2 ** 20),
+    'message': (24 * 10 ** 6, 10 * 2 ** 20),
+}
+IMAGE_MAX_EDGE = 3200
+IMAGE_MAX_PIXELS = 50 * 10 ** 6
+
+# The rendered content of the cards is cached in its own cache, keyed by the id and the version of
+# every post or offer, so stale fragments are never served and only the memory used is bounded
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'cards': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'cards',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
@@ -156,4 +276,33 @@ EMAIL_HOST_PASSWORD = 'password123'
 
 DEFAULT_FROM_EMAIL = 'hexagon<hexagon@rahcode.com>'
 
+# Emails are queued in the outbox and delivered by the sendmail worker in batches of MAIL_BATCH over one
+# connection. A failed email is tried again after MAIL_RETRY_BASE seconds, doubling up to MAIL_RETRY_MAX,
+# at most MAIL_MAX_ATTEMPTS times. A batch locked for MAIL_TIMEOUT seconds is taken by another worker
+
+MAIL_BATCH = 100
+MAIL_SLEEP = 5
+MAIL_RETRY_BASE = 60
+MAIL_RETRY_MAX = 3600
+MAIL_MAX_ATTEMPTS = 8
+MAIL_TIMEOUT = 600
+
+# Notifications are mailed in one digest per user, once the oldest one not mailed is DIGEST_WINDOW seconds
+# old, listing the newest DIGEST_ITEMS of them. Digests are queued DIGEST_BATCH users per transaction
+
+DIGEST_WINDOW = 6 * 3600
+DIGEST_ITEMS = 10
+DIGEST_BATCH = 500
+
+# Events of the same kind about the same target are folded into the notification a user got for them
+# during the last NOTIFICATION_WINDOW seconds, while it has not been read or mailed
+
+NOTIFICATION_WINDOW = 3600
+
+# Read notifications older than NOTIFICATION_TTL seconds are deleted by the prune_notifications command,
+# NOTIFICATION_PURGE_CHUNK per transaction
+
+NOTIFICATION_TTL = 90 * 24 * 3600
+NOTIFICATION_PURGE_CHUNK = 1000
+
 EXPIRE_AFTER = "10m"
@@ -17,6 +17,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from app import serve
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -26,5 +27,11 @@ urlpatterns = [
     path('staff/', include('staff.urls')),
     path('verification/', include('verify_email.urls')),
     path('notifications/', include('notifications.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT) \
-    + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+]
+
+if settings.DEBUG:
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT) \
+        + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+else:
+    urlpatterns += serve.urls(settings.MEDIA_URL, settings.MEDIA_ROOT) \
+        + serve.urls(settings.STATIC_URL, settings.STATIC_ROOT)
@@ -0,0 +1,65 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from .models import Notification
+from .views import send_mail
+
+def recipients(now):
+    """
+    The function selects the users due for a digest with a single query over the partial index of the
+    notifications not mailed yet. A user is due once their oldest notification not mailed is older than
+    the `DIGEST_WINDOW` setting, so nobody gets more than one digest per window.
+
+    :param now: The now parameter is the time the digests are sent at
+    :return: a queryset of dictionaries with the id and the email of every user due and the number of
+    notifications not mailed.
+    """
+    cutoff = now - timedelta(seconds=settings.DIGEST_WINDOW)
+    return Notification.objects.filter(mailed=False, timestamp__lte=now).order_by()\
+        .values('user', 'user__email').annotate(total=Count('id'), first=Min('timestamp'))\
+        .filter(first__lte=cutoff)
+
+def compose(total, notifications):
+    """
+    The function writes the summary of the notifications of a user.
+
+    :param total: The total parameter is the number of notifications not mailed
+    :param notifications: The notifications parameter is a list with the newest of them, at most
+    `DIGEST_ITEMS`
+    :return: a tuple with the subject and the body of the email.
+    """
+    head = f'You have {total} new notification' + ('s' if total != 1 else '')
+    lines = [f'- {notification.title}: {notification.content}' for notification in notifications]
+    if total > len(notifications):
+        lines.append(f'... and {total - len(notifications)} more')
+    return head, '\n'.join(lines) + '\n'
+
+def send(now=None):
+    """
+    The function queues one digest email for every user due and marks their notifications as mailed,
+    `DIGEST_BATCH` users at a time. Users without an email address have their notifications marked
+    without being mailed.
+
+    :param now: The now parameter is the time the digests are sent at, the current time by default
+    :return: a tuple with the number of digests queued and the number of notifications they cover.
+    """
+    now = now or timezone.now()
+    due = list(recipients(now))
+    digests = covered = 0
+    for start in range(0, len(due), settings.DIGEST_BATCH):
+        batch = due[start:start + settings.DIGEST_BATCH]
+        with transaction.atomic():
+            for row in batch:
+                if not row['user__email']:
+                    continue
+                notifications = list(Notification.objects.filter(user=row['user'], mailed=False,
+                    timestamp__lte=now).only('title', 'content').order_by('-timestamp')[:settings.DIGEST_ITEMS])
+                head, body = compose(row['total'], notifications)
+                send_mail(head, body, [row['user__email']])
+                digests += 1
+                covered += row['total']
+            Notification.objects.filter(user__in=[row['user'] for row in batch], mailed=False,
+                timestamp__lte=now).update(mailed=True)
+    return digests, covered
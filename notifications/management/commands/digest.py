@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from notifications import digest
+
+# This command queues a digest email for every user whose oldest notification not mailed is older than
+# DIGEST_WINDOW. It is meant to be run periodically, for example from cron, more often than the window.
+class Command(BaseCommand):
+    help = 'Queues the notification digests of the users due'
+
+    def handle(self, *args, **options):
+        """
+        This function queues the digests and reports how many were queued.
+        """
+        digests, covered = digest.send()
+        self.stdout.write(f'Queued {digests} digests covering {covered} notifications')
@@ -0,0 +1,53 @@
+import threading
+import time
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from notifications import outbox
+from notifications.models import Outbox
+from notifications.smtp import SinkServer
+
+# This command measures the throughput of the sendmail worker against a local SMTP sink, compared with
+# sending every email over its own connection as the requests used to. The emails it adds to the outbox
+# are the only ones delivered, and none is left behind.
+class Command(BaseCommand):
+    help = 'Measures the email throughput of the outbox against a local SMTP sink'
+
+    def add_arguments(self, parser):
+        """
+        This function adds the options for the number of emails and the delays of the sink.
+        """
+        parser.add_argument('--count', type=int, default=200)
+        parser.add_argument('--connect-delay', type=float, default=0.05, help='Seconds to wait before greeting')
+        parser.add_argument('--message-delay', type=float, default=0.005, help='Seconds to wait for every email')
+
+    def handle(self, *args, **options):
+        """
+        This function sends the emails both ways through the sink and reports the emails per second.
+        """
+        count = options['count']
+        server = SinkServer(('127.0.0.1', 0), options['connect_delay'], options['message_delay'])
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address
+
+        def connect():
+            return get_connection('django.core.mail.backends.smtp.EmailBackend', host=host, port=port,
+                username='', password='', use_tls=False, use_ssl=False)
+
+        try:
+            start = time.perf_counter()
+            for i in range(count):
+                EmailMessage('Benchmark', 'Body', to=['bench@example.com'], connection=connect()).send()
+            inline = time.perf_counter() - start
+
+            ids = [outbox.enqueue('Benchmark', 'Body', ['bench@example.com']).pk for i in range(count)]
+            start = time.perf_counter()
+            delivered, failed, dead = outbox.work(Outbox.objects.filter(pk__in=ids), connect())
+            batched = time.perf_counter() - start
+            Outbox.objects.filter(pk__in=ids).delete()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.stdout.write(f'One connection per email: {count / inline:.1f} emails/s')
+        self.stdout.write(f'Outbox worker: {delivered / batched:.1f} emails/s, {failed} failed')
+        self.stdout.write(f'Sink got {server.counts["messages"]} emails over {server.counts["connections"]} connections')
@@ -0,0 +1,38 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from notifications import retention
+
+# This command deletes the read notifications older than NOTIFICATION_TTL, optionally moving them to the
+# archive table, and reports the rows and bytes reclaimed. It is meant to be run periodically, for example from
+# cron. Deleted rows leave free pages in the SQLite file, which --vacuum gives back to the system.
+class Command(BaseCommand):
+    help = 'Deletes or archives the old read notifications'
+
+    def add_arguments(self, parser):
+        """
+        This function adds the options for the time to live, the chunks, the archive and the vacuum.
+        """
+        parser.add_argument('--days', type=float, help='Age in days of the notifications deleted')
+        parser.add_argument('--chunk', type=int, help='Notifications deleted per transaction')
+        parser.add_argument('--pause', type=float, default=0.05, help='Seconds to wait between chunks')
+        parser.add_argument('--archive', action='store_true', help='Copy the notifications to the archive table')
+        parser.add_argument('--vacuum', action='store_true', help='Shrink the SQLite file afterwards')
+
+    def handle(self, *args, **options):
+        """
+        This function purges the notifications and reports the rows deleted and the bytes freed.
+        """
+        ttl = options['days'] * 86400 if options['days'] is not None else None
+        deleted, freed = retention.purge(ttl, options['chunk'], options['archive'], options['pause'])
+        action = 'Archived and deleted' if options['archive'] else 'Deleted'
+        self.stdout.write(f'{action} {deleted} notifications')
+        if freed is not None:
+            self.stdout.write(f'Freed {freed} bytes in the database')
+        if options['vacuum'] and connection.vendor == 'sqlite':
+            name = settings.DATABASES['default']['NAME']
+            size = os.path.getsize(name)
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM')
+            self.stdout.write(f'Vacuum shrank the database by {size - os.path.getsize(name)} bytes')
@@ -0,0 +1,29 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from notifications import outbox
+
+# This command is the worker that delivers the emails of the outbox, in batches sent over a single
+# connection to the mail server. It runs forever, waiting MAIL_SLEEP seconds whenever there is nothing
+# to send, unless --once is given. The emails given up on stay in the outbox as dead letters, with
+# their last error.
+class Command(BaseCommand):
+    help = 'Delivers the emails of the outbox'
+
+    def add_arguments(self, parser):
+        """
+        This function adds the option to deliver the emails due once and exit.
+        """
+        parser.add_argument('--once', action='store_true', help='Deliver the emails due and exit')
+
+    def handle(self, *args, **options):
+        """
+        This function delivers the emails due, reporting every round, and waits for new ones.
+        """
+        while True:
+            delivered, failed, dead = outbox.work()
+            if delivered or failed:
+                self.stdout.write(f'Delivered {delivered} emails, {failed} failed, {dead} given up on')
+            if options['once']:
+                break
+            time.sleep(settings.MAIL_SLEEP)
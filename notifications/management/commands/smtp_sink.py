@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from notifications.smtp import SinkServer
+
+# This command runs a local SMTP server that accepts every email and throws it away, to try the sendmail
+# worker against a slow mail server by pointing EMAIL_HOST and EMAIL_PORT to it with EMAIL_USE_TLS off.
+class Command(BaseCommand):
+    help = 'Runs a local SMTP server that discards every email'
+
+    def add_arguments(self, parser):
+        """
+        This function adds the options for the address and the delays of the server.
+        """
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=1025)
+        parser.add_argument('--connect-delay', type=float, default=0, help='Seconds to wait before greeting')
+        parser.add_argument('--message-delay', type=float, default=0, help='Seconds to wait for every email')
+
+    def handle(self, *args, **options):
+        """
+        This function serves until interrupted and reports how many connections and emails it got.
+        """
+        server = SinkServer((options['host'], options['port']), options['connect_delay'], options['message_delay'])
+        self.stdout.write(f'Listening on {options["host"]}:{options["port"]}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        self.stdout.write(f'Got {server.counts["messages"]} emails over {server.counts["connections"]} connections')
@@ -0,0 +1,36 @@
+# Generated by Django 4.1.5 on 2026-10-18 10:59
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Outbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255)),
+                ('body', models.TextField()),
+                ('to', models.TextField()),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('next_attempt', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked', models.DateTimeField(blank=True, null=True)),
+                ('worker', models.CharField(blank=True, max_length=32)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['next_attempt', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outbox',
+            index=models.Index(fields=['next_attempt', 'id'], name='outbox_due_idx'),
+        ),
+    ]
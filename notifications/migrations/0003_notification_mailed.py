@@ -0,0 +1,28 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_outbox'),
+    ]
+
+    operations = [
+        # The notifications that existed before the digests are not mailed
+        migrations.AddField(
+            model_name='notification',
+            name='mailed',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='mailed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('mailed', False)), fields=['user', 'timestamp'], name='notification_unmailed_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_notification_read'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='kind',
+            field=models.CharField(blank=True, choices=[('follower', 'Follower'), ('post', 'Post'), ('offer', 'Offer'), ('comment', 'Comment'), ('message', 'Message'), ('strike', 'Strike')], max_length=20),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='target',
+            field=models.CharField(blank=True, max_length=150),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False), ('mailed', False)), fields=['user', 'kind', 'target', 'timestamp'], name='notification_open_idx'),
+        ),
+    ]
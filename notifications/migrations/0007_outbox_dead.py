@@ -0,0 +1,33 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def bury(apps, schema_editor):
+    Outbox = apps.get_model('notifications', 'Outbox')
+    Outbox.objects.filter(attempts__gte=settings.MAIL_MAX_ATTEMPTS).update(is_dead=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_notification_retention'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='outbox',
+            name='outbox_due_idx',
+        ),
+        migrations.AddField(
+            model_name='outbox',
+            name='is_dead',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(bury, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='outbox',
+            index=models.Index(condition=models.Q(('is_dead', False)), fields=['next_attempt', 'id'], name='outbox_due_idx'),
+        ),
+    ]
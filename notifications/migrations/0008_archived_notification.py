@@ -0,0 +1,32 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notifications', '0007_outbox_dead'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(blank=True, choices=[('follower', 'Follower'), ('post', 'Post'), ('offer', 'Offer'), ('comment', 'Comment'), ('message', 'Message'), ('strike', 'Strike')], max_length=20)),
+                ('target', models.CharField(blank=True, max_length=150)),
+                ('count', models.PositiveIntegerField(default=1)),
+                ('title', models.CharField(max_length=100)),
+                ('content', models.TextField()),
+                ('more', models.URLField(blank=True, null=True)),
+                ('timestamp', models.DateTimeField()),
+                ('archived', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -1,20 +1,156 @@
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Cast, Concat, Greatest
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.core.mail import EmailMessage
+from app.models import Profile
+
+# The NotificationQuerySet class creates notifications and marks them as read, keeping the unread
+# counter of the profile of every user in sync so the badge never has to count the notifications.
+class NotificationQuerySet(models.QuerySet):
+    def notify(self, notifications):
+        """
+        This function inserts notifications and adds them to the unread counters of their users, with
+        one statement for the notifications and one for every distinct number of notifications per user.
+
+        :param notifications: The notifications parameter is a list with the unsaved Notification
+        instances
+        :return: the list of notifications created.
+        """
+        created = self.bulk_create(notifications, batch_size=500)
+        counts = Counter(notification.user_id for notification in notifications if not notification.is_read)
+        for count in set(counts.values()):
+            Profile.objects.filter(user__in=[pk for pk in counts if counts[pk] == count])\
+                .update(unread=F('unread') + count)
+        return created
+
+    def coalesce(self, users, kind, target, title, content, many, url):
+        """
+        This function notifies users of an event, folding it into the notification of the same kind and
+        target each user received during the last `NOTIFICATION_WINDOW` seconds, as long as it has not
+        been read or mailed. The notifications folded into are updated in a single statement that
+        counts the event and rewrites their text, and only the users without one get a new row.
+
+        :param users: The users parameter is a list with the User instances that receive the
+        notification
+        :param kind: The kind parameter is the kind of the event, one of the keys of `KINDS`
+        :param target: The target parameter identifies what the event is about, such as the username of
+        the sender of a message, so only events about the same target are folded together
+        :param title: The title parameter is the title of the notification
+        :param content: The content parameter is the text of a notification about a single event
+        :param many: The many parameter is the text of a notification about several events, where
+        '{count}' stands for their number
+        :param url: The url parameter is the URL of the latest event
+        :return: the number of notifications folded into.
+        """
+        now = timezone.now()
+        since = now - timedelta(seconds=settings.NOTIFICATION_WINDOW)
+        before, after = many.split('{count}')
+        folded = self.filter(user__in=users, kind=kind, target=target, is_read=False, mailed=False,
+            timestamp__gte=since, timestamp__lt=now).update(
+            count=F('count') + 1,
+            content=Concat(Value(before), Cast(F('count') + 1, models.TextField()), Value(after)),
+            more=url,
+            timestamp=now,
+        )
+        if folded and len(users) == 1:
+            users = []
+        elif folded:
+            done = set(self.filter(user__in=users, kind=kind, target=target, timestamp=now)
+                .values_list('user_id', flat=True))
+            users = [user for user in users if user.pk not in done]
+        self.notify([
+            Notification(user=user, kind=kind, target=target, title=title, content=content, more=url,
+                timestamp=now)
+            for user in users
+        ])
+        return folded
+
+    def mark_read(self, user, ids=None):
+        """
+        This function marks the notifications of a user as read and takes them out of the unread counter
+        of the user.
+
+        :param user: The user parameter is the User whose notifications are read
+        :param ids: The ids parameter is a list with the ids of the notifications read, None for every
+        notification of the user
+        :return: the number of notifications marked as read.
+        """
+        queryset = self.filter(user=user, is_read=False)
+        if ids is not None:
+            queryset = queryset.filter(pk__in=ids)
+        read = queryset.update(is_read=True)
+        if read:
+            Profile.objects.filter(user=user).update(unread=Greatest(F('unread') - read, 0))
+        return read
+
+# The kinds of the events notified, which are folded together when they share a target
+KINDS = [
+    ('follower', 'Follower'),
+    ('post', 'Post'),
+    ('offer', 'Offer'),
+    ('comment', 'Comment'),
+    ('message', 'Message'),
+    ('strike', 'Strike'),
+]
 
 # The Notification class is a model that represents a notification with a user, title, content,
-# optional URL, and timestamp.
+# optional URL, and timestamp. A notification can stand for several events of the same kind and target,
+# whose number is kept in count.
 class Notification(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20, choices=KINDS, blank=True)
+    target = models.CharField(max_length=150, blank=True)
+    count = models.PositiveIntegerField(default=1)
     title = models.CharField(max_length=100)
     content = models.TextField()
     more = models.URLField(blank=True, null=True)
     timestamp = models.DateTimeField(default=timezone.now)
+    mailed = models.BooleanField(default=False)
+    is_read = models.BooleanField(default=False)
+
+    objects = NotificationQuerySet.as_manager()
 
     # This class sets the default ordering for a model to be based on the timestamp field in
-    # descending order.
+    # descending order, with the index that serves the keyset pagination of the notifications of a
+    # user, a partial index over the notifications not mailed yet, which is what the digests read, a
+    # partial index over the notifications events can still be folded into, and a partial index over
+    # the read notifications, oldest first, which is what the retention job deletes.
     class Meta:
-        ordering = ['-timestamp']
+        ordering = ['-timestamp', '-id']
+        indexes = [
+            models.Index(fields=['user', '-timestamp', '-id'], name='notification_user_idx'),
+            models.Index(fields=['user', 'timestamp'], condition=models.Q(mailed=False),
+                name='notification_unmailed_idx'),
+            models.Index(fields=['user', 'kind', 'target', 'timestamp'],
+                condition=models.Q(is_read=False, mailed=False), name='notification_open_idx'),
+            models.Index(fields=['timestamp'], condition=models.Q(is_read=True), name='notification_read_idx'),
+        ]
+
+    def __str__(self):
+        """
+        This function returns the title of an object as a string.
+        :return: The `__str__` method is returning the `title` attribute of the object.
+        """
+        return self.title
+
+# The ArchivedNotification class is a notification deleted by the retention job, kept under the id it
+# had so archiving the same notification twice keeps a single copy.
+class ArchivedNotification(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    kind = models.CharField(max_length=20, choices=KINDS, blank=True)
+    target = models.CharField(max_length=150, blank=True)
+    count = models.PositiveIntegerField(default=1)
+    title = models.CharField(max_length=100)
+    content = models.TextField()
+    more = models.URLField(blank=True, null=True)
+    timestamp = models.DateTimeField()
+    archived = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
         """
@@ -22,3 +158,41 @@ class Notification(models.Model):
         :return: The `__str__` method is returning the `title` attribute of the object.
         """
         return self.title
+
+# The Outbox class is an email waiting to be delivered by the sendmail worker, so no request waits for
+# the mail server. Delivered emails are deleted, and the failed ones are tried again later, until they
+# have been tried MAIL_MAX_ATTEMPTS times and are kept as dead letters, with their last error.
+class Outbox(models.Model):
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    to = models.TextField()
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    locked = models.DateTimeField(blank=True, null=True)
+    worker = models.CharField(max_length=32, blank=True)
+    is_dead = models.BooleanField(default=False)
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    # This class sets the order the emails are delivered in and the index used to find the emails due,
+    # which leaves out the emails given up on.
+    class Meta:
+        ordering = ['next_attempt', 'id']
+        indexes = [
+            models.Index(fields=['next_attempt', 'id'], name='outbox_due_idx', condition=models.Q(is_dead=False)),
+        ]
+
+    def __str__(self):
+        """
+        This function returns a string representation of an email.
+        :return: A string with the subject and the recipients of the email.
+        """
+        return f'{self.subject} to {self.to}'
+
+    def message(self, connection=None):
+        """
+        This function builds the email to be sent.
+        :param connection: The connection parameter is the connection the email is sent through
+        :return: An EmailMessage with the subject, the body and the recipients of the email.
+        """
+        return EmailMessage(self.subject, self.body, to=self.to.split(','), connection=connection)
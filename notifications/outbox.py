@@ -0,0 +1,122 @@
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db.models import Q
+from django.utils import timezone
+from .models import Outbox
+
+def enqueue(head, body, to):
+    """
+    The function adds an email to the outbox, to be delivered by the sendmail worker.
+
+    :param head: The head parameter is the subject of the email
+    :param body: The body parameter is the text of the email
+    :param to: The to parameter is a list with the email addresses of the recipients
+    :return: the Outbox row of the email.
+    """
+    return Outbox.objects.create(subject=head[:255], body=body, to=','.join(to))
+
+def backoff(attempts):
+    """
+    The function computes how long to wait before trying to deliver an email again, doubling the wait
+    after every failed attempt.
+
+    :param attempts: The attempts parameter is the number of failed attempts so far
+    :return: a timedelta between the `MAIL_RETRY_BASE` and the `MAIL_RETRY_MAX` settings.
+    """
+    return timedelta(seconds=min(settings.MAIL_RETRY_BASE * 2 ** (attempts - 1), settings.MAIL_RETRY_MAX))
+
+def claim(queryset=None):
+    """
+    The function takes the next batch of emails due that no other worker is delivering. A batch locked
+    for longer than the `MAIL_TIMEOUT` setting belongs to a worker that died, and is taken again.
+
+    :param queryset: The queryset parameter restricts the emails that can be claimed, every email of the
+    outbox by default
+    :return: a list with at most `MAIL_BATCH` Outbox rows.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.MAIL_TIMEOUT)
+    queryset = Outbox.objects.all() if queryset is None else queryset
+    due = queryset.filter(Q(locked=None) | Q(locked__lt=stale), next_attempt__lte=now, is_dead=False)
+    ids = list(due.values_list('id', flat=True)[:settings.MAIL_BATCH])
+    if not ids:
+        return []
+    worker = uuid.uuid4().hex
+    due.filter(pk__in=ids).update(locked=now, worker=worker)
+    return list(Outbox.objects.filter(worker=worker, locked=now))
+
+def retry(mail, error):
+    """
+    The function records a failed attempt to deliver an email and schedules the next one, or gives up
+    on the email once it has been tried `MAIL_MAX_ATTEMPTS` times. The emails given up on are kept as
+    dead letters, out of the index of the emails due.
+
+    :param mail: The mail parameter is the Outbox row that could not be delivered
+    :param error: The error parameter is the exception raised by the mail server
+    :return: True if the email has been given up on.
+    """
+    mail.attempts += 1
+    mail.error = repr(error)
+    mail.next_attempt = timezone.now() + backoff(mail.attempts)
+    mail.locked = None
+    mail.is_dead = mail.attempts >= settings.MAIL_MAX_ATTEMPTS
+    mail.save(update_fields=['attempts', 'error', 'next_attempt', 'locked', 'is_dead'])
+    return mail.is_dead
+
+def deliver(batch, connection):
+    """
+    The function sends a batch of emails over a single connection to the mail server, opened once for
+    the whole batch instead of once for every email. The connection is opened again after an email
+    fails, as the server may have dropped it.
+
+    :param batch: The batch parameter is a list with the Outbox rows claimed by the worker
+    :param connection: The connection parameter is the email backend used to send the batch
+    :return: a tuple with the number of emails delivered, the number of emails that failed and the
+    number of those given up on.
+    """
+    try:
+        connection.open()
+    except Exception as error:
+        return 0, len(batch), sum(retry(mail, error) for mail in batch)
+    delivered = []
+    failed = dead = 0
+    try:
+        for mail in batch:
+            try:
+                connection.send_messages([mail.message(connection)])
+                delivered.append(mail.pk)
+            except Exception as error:
+                dead += retry(mail, error)
+                failed += 1
+                connection.close()
+                connection.open()
+    except Exception as error:
+        for mail in batch[len(delivered) + failed:]:
+            dead += retry(mail, error)
+            failed += 1
+    finally:
+        connection.close()
+        Outbox.objects.filter(pk__in=delivered).delete()
+    return len(delivered), failed, dead
+
+def work(queryset=None, connection=None):
+    """
+    The function delivers the emails due, batch after batch, until none is left.
+
+    :param queryset: The queryset parameter restricts the emails delivered, as in `claim`
+    :param connection: The connection parameter is the email backend used, the one of the
+    `EMAIL_BACKEND` setting by default
+    :return: a tuple with the number of emails delivered, the number of emails that failed and the
+    number of those given up on.
+    """
+    connection = connection or get_connection()
+    delivered = failed = dead = 0
+    while True:
+        batch = claim(queryset)
+        if not batch:
+            break
+        sent, lost, buried = deliver(batch, connection)
+        delivered, failed, dead = delivered + sent, failed + lost, dead + buried
+    return delivered, failed, dead
@@ -0,0 +1,66 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Notification, ArchivedNotification
+
+# The fields of the notifications copied to the archive
+ARCHIVED = ['id', 'user_id', 'kind', 'target', 'count', 'title', 'content', 'more', 'timestamp']
+
+def free_bytes():
+    """
+    The function returns the space of the SQLite database that is free for new rows, which grows as
+    rows are deleted.
+
+    :return: the number of free bytes in the database file, or None if the database is not SQLite.
+    """
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA freelist_count')
+        pages = cursor.fetchone()[0]
+        cursor.execute('PRAGMA page_size')
+        return pages * cursor.fetchone()[0]
+
+def purge(ttl=None, chunk=None, archive=False, pause=0):
+    """
+    The function deletes the read notifications older than a time to live, oldest first, in chunks
+    deleted by short transactions so the database is never locked for long. The unread notifications
+    are kept, so the unread counters stay exact.
+
+    :param ttl: The ttl parameter is the age in seconds after which a read notification is deleted,
+    the `NOTIFICATION_TTL` setting by default
+    :param chunk: The chunk parameter is the number of notifications deleted per transaction, the
+    `NOTIFICATION_PURGE_CHUNK` setting by default
+    :param archive: The archive parameter tells whether the notifications are copied to the archive
+    table in the transaction that deletes them. The copies keep the id of the notification, so a purge
+    run again after a failure never archives a notification twice
+    :param pause: The pause parameter is the number of seconds to wait between chunks, to let other
+    writers in
+    :return: a tuple with the number of notifications deleted and the number of bytes freed in the
+    database, which is None if the database is not SQLite.
+    """
+    ttl = settings.NOTIFICATION_TTL if ttl is None else ttl
+    chunk = chunk or settings.NOTIFICATION_PURGE_CHUNK
+    cutoff = timezone.now() - timedelta(seconds=ttl)
+    expired = Notification.objects.filter(is_read=True, timestamp__lt=cutoff).order_by('timestamp', 'id')
+    before = free_bytes()
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            if archive:
+                rows = list(expired.values(*ARCHIVED)[:chunk])
+                ids = [row['id'] for row in rows]
+                ArchivedNotification.objects.bulk_create(
+                    [ArchivedNotification(**row) for row in rows], ignore_conflicts=True)
+            else:
+                ids = list(expired.values_list('id', flat=True)[:chunk])
+            if not ids:
+                break
+            Notification.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+        if pause:
+            time.sleep(pause)
+    after = free_bytes()
+    return deleted, None if before is None else after - before
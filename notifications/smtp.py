@@ -0,0 +1,68 @@
+import socketserver
+import threading
+import time
+
+# The SinkHandler class speaks just enough SMTP to accept emails and throw them away, waiting the
+# delays of its server to behave like a slow mail server.
+class SinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        """
+        This function sends a reply line to the client.
+
+        :param line: The line parameter is the reply, with its status code
+        """
+        self.wfile.write(line.encode() + b'\r\n')
+        self.wfile.flush()
+
+    def handle(self):
+        """
+        This function greets the client after the connection delay of the server and answers its
+        commands until it quits, counting every email received.
+        """
+        server = self.server
+        time.sleep(server.connect_delay)
+        self.reply('220 localhost SMTP sink')
+        server.count('connections')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith('EHLO'):
+                self.reply('250-localhost')
+                self.reply('250 8BITMIME')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b'.\n', b''):
+                    pass
+                time.sleep(server.message_delay)
+                server.count('messages')
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+# The SinkServer class is a local stand-in for the mail server, used to try the delivery of the outbox
+# without sending real emails. The connect_delay and message_delay stand for the TLS handshake and the
+# time the server takes to accept an email.
+class SinkServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, connect_delay=0, message_delay=0):
+        super().__init__(address, SinkHandler)
+        self.connect_delay = connect_delay
+        self.message_delay = message_delay
+        self.counts = {'connections': 0, 'messages': 0}
+        self.lock = threading.Lock()
+
+    def count(self, key):
+        """
+        This function counts a connection or a message received by the server.
+
+        :param key: The key parameter is either 'connections' or 'messages'
+        """
+        with self.lock:
+            self.counts[key] += 1
@@ -1,3 +1,355 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from app.models import Profile
+from .models import ArchivedNotification, Notification, Outbox
+from . import digest, outbox, retention
 
-# Create your tests here.
+# The files uploaded by the tests are written here
+MEDIA_ROOT = tempfile.mkdtemp()
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+# The BrokenConnection class is a mail backend whose server is down, or drops the emails to some
+# recipients.
+class BrokenConnection:
+    def __init__(self, down=True, refused=()):
+        self.down = down
+        self.refused = refused
+
+    def open(self):
+        """
+        This function connects to the server, failing if it is down.
+        """
+        if self.down:
+            raise OSError('Connection refused')
+
+    def close(self):
+        """
+        This function closes the connection.
+        """
+
+    def send_messages(self, messages):
+        """
+        This function sends emails, failing for the refused recipients.
+
+        :param messages: The messages parameter is a list of EmailMessage
+        :return: the number of emails sent.
+        """
+        for message in messages:
+            if set(message.to) & set(self.refused):
+                raise OSError('Recipient refused')
+        return len(messages)
+
+# The OutboxTests class checks the claim of the emails due by the sendmail worker, their delivery over
+# one connection and the retries of the emails that fail.
+@override_settings(MAIL_BATCH=2, MAIL_MAX_ATTEMPTS=3, MAIL_RETRY_BASE=60, MAIL_RETRY_MAX=600)
+class OutboxTests(TestCase):
+    def due(self):
+        """
+        This function makes every email of the outbox due now.
+        """
+        Outbox.objects.update(next_attempt=timezone.now() - timedelta(seconds=1))
+
+    def test_claim(self):
+        """
+        This function checks that a claim takes one batch of emails and that claimed emails are not
+        taken again until their lock is stale.
+        """
+        for i in range(3):
+            outbox.enqueue('Subject', 'Body', [f'user{i}@udg.mx'])
+        first = outbox.claim()
+        second = outbox.claim()
+        self.assertEqual((len(first), len(second)), (2, 1))
+        self.assertFalse({mail.pk for mail in first} & {mail.pk for mail in second})
+        self.assertEqual(outbox.claim(), [])
+        Outbox.objects.update(locked=timezone.now() - timedelta(days=1))
+        self.assertEqual(len(outbox.claim()), 2)
+
+    def test_deliver(self):
+        """
+        This function checks that delivered emails are sent and leave the outbox.
+        """
+        for i in range(5):
+            outbox.enqueue('Subject', 'Body', [f'user{i}@udg.mx'])
+        connection = get_connection('django.core.mail.backends.locmem.EmailBackend')
+        self.assertEqual(outbox.work(connection=connection), (5, 0, 0))
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(Outbox.objects.exists())
+
+    def test_retry(self):
+        """
+        This function checks that a failed email is kept with its error and tried again later, waiting
+        twice as long after every failure.
+        """
+        outbox.enqueue('Subject', 'Body', ['user@udg.mx'])
+        self.assertEqual(outbox.work(connection=BrokenConnection()), (0, 1, 0))
+        failed = Outbox.objects.get()
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn('Connection refused', failed.error)
+        self.assertIsNone(failed.locked)
+        self.assertEqual(outbox.work(connection=BrokenConnection()), (0, 0, 0))
+        self.assertEqual([outbox.backoff(n).total_seconds() for n in range(1, 6)], [60, 120, 240, 480, 600])
+
+    def test_partial(self):
+        """
+        This function checks that an email refused by the server does not stop the rest of the batch.
+        """
+        for address in ['good@udg.mx', 'bad@udg.mx']:
+            outbox.enqueue('Subject', 'Body', [address])
+        connection = BrokenConnection(down=False, refused=['bad@udg.mx'])
+        self.assertEqual(outbox.work(connection=connection), (1, 1, 0))
+        self.assertEqual(Outbox.objects.get().to, 'bad@udg.mx')
+
+    def test_dead_letter(self):
+        """
+        This function checks that an email is given up on after `MAIL_MAX_ATTEMPTS` failures and never
+        claimed again.
+        """
+        outbox.enqueue('Subject', 'Body', ['user@udg.mx'])
+        results = []
+        for attempt in range(3):
+            self.due()
+            results.append(outbox.work(connection=BrokenConnection()))
+        self.assertEqual(results, [(0, 1, 0), (0, 1, 0), (0, 1, 1)])
+        self.due()
+        self.assertEqual(outbox.claim(), [])
+        self.assertTrue(Outbox.objects.get().is_dead)
+
+# The UnreadTests class checks the unread counters kept on the profiles as notifications are created and
+# read, and the pages that read them. The pages are rendered without the manifest of collectstatic.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT,
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class UnreadTests(TestCase):
+    def setUp(self):
+        """
+        This function creates two users with some notifications.
+        """
+        self.user = User.objects.create_user('reader', 'reader@udg.mx', 'password')
+        self.other = User.objects.create_user('other', 'other@udg.mx', 'password')
+        Notification.objects.notify(
+            [Notification(user=self.user, title='Title', content=f'Content {i}') for i in range(3)]
+            + [Notification(user=self.other, title='Title', content='Content')]
+            + [Notification(user=self.other, title='Title', content='Read', is_read=True)]
+        )
+
+    def unread(self, user):
+        """
+        This function reads the unread counter of a user.
+
+        :param user: The user parameter is the User whose counter is read
+        :return: the number of unread notifications of the user.
+        """
+        return Profile.objects.get(user=user).unread
+
+    def test_notify(self):
+        """
+        This function checks that the counters only count the unread notifications of every user.
+        """
+        self.assertEqual((self.unread(self.user), self.unread(self.other)), (3, 1))
+
+    def test_mark_read(self):
+        """
+        This function checks that reading notifications takes them out of the counter once.
+        """
+        first = Notification.objects.filter(user=self.user).first()
+        self.assertEqual(Notification.objects.mark_read(self.user, [first.pk]), 1)
+        self.assertEqual(Notification.objects.mark_read(self.user, [first.pk]), 0)
+        self.assertEqual(self.unread(self.user), 2)
+        self.assertEqual(Notification.objects.mark_read(self.user), 2)
+        self.assertEqual((self.unread(self.user), self.unread(self.other)), (0, 1))
+
+    def test_badge(self):
+        """
+        This function checks that the badge reads the counter.
+        """
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('notifications:badge')).json(), {'unread': 3})
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('notifications:badge')).json(), {'unread': 0})
+
+    @override_settings(PAGE_SIZE=2)
+    def test_pages(self):
+        """
+        This function checks that showing a page of notifications reads only that page, and that the
+        notifications can all be read at once.
+        """
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('notifications:list'))
+        self.assertEqual(len(response.context['notifications']), 2)
+        self.assertEqual(self.unread(self.user), 1)
+        self.client.get(reverse('notifications:list'), {'cursor': response.context['cursor']})
+        self.assertEqual(self.unread(self.user), 0)
+        Notification.objects.notify([Notification(user=self.user, title='Title', content='New')])
+        self.client.post(reverse('notifications:read'))
+        self.assertEqual(self.unread(self.user), 0)
+        self.assertFalse(Notification.objects.filter(user=self.user, is_read=False).exists())
+
+# The CoalesceTests class checks that bursts of events are folded into one notification per kind and
+# target, and that the unread counters count notifications rather than events.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, NOTIFICATION_WINDOW=3600)
+class CoalesceTests(TestCase):
+    def setUp(self):
+        """
+        This function creates the users that receive the notifications.
+        """
+        self.users = [User.objects.create_user(f'user{i}', f'user{i}@udg.mx', 'password') for i in range(3)]
+
+    def event(self, users, target='carol'):
+        """
+        This function notifies some users of a new message.
+
+        :param users: The users parameter is a list with the User instances notified
+        :param target: The target parameter is the username of the sender of the message
+        :return: the number of notifications folded into.
+        """
+        return Notification.objects.coalesce(users, 'message', target, 'New message',
+            f'{target} has sended you a message', target + ' has sended you {count} messages', '/chat/')
+
+    def test_fold(self):
+        """
+        This function checks that repeated events about the same target make a single notification
+        counting them.
+        """
+        for i in range(4):
+            self.event(self.users[:1])
+        notification = Notification.objects.get(user=self.users[0])
+        self.assertEqual(notification.count, 4)
+        self.assertEqual(notification.content, 'carol has sended you 4 messages')
+        self.assertEqual(Profile.objects.get(user=self.users[0]).unread, 1)
+
+    def test_single_query(self):
+        """
+        This function checks that folding an event for one user costs a single statement.
+        """
+        self.event(self.users[:1])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.event(self.users[:1]), 1)
+
+    def test_targets(self):
+        """
+        This function checks that events about different targets are kept apart.
+        """
+        self.event(self.users[:1], 'carol')
+        self.event(self.users[:1], 'dave')
+        self.assertEqual(Notification.objects.filter(user=self.users[0], count=1).count(), 2)
+
+    def test_read(self):
+        """
+        This function checks that an event is not folded into a notification that has been read, or
+        that is older than `NOTIFICATION_WINDOW`.
+        """
+        self.event(self.users[:1])
+        Notification.objects.mark_read(self.users[0])
+        self.event(self.users[:1])
+        Notification.objects.filter(user=self.users[0]).update(timestamp=timezone.now() - timedelta(hours=2))
+        self.event(self.users[:1])
+        self.assertEqual(Notification.objects.filter(user=self.users[0], count=1).count(), 3)
+        self.assertEqual(Profile.objects.get(user=self.users[0]).unread, 2)
+
+    def test_mixed(self):
+        """
+        This function checks that in a chunk of users, those with a notification get it updated and the
+        others get a new one.
+        """
+        self.event(self.users[:1])
+        self.assertEqual(self.event(self.users), 1)
+        counts = dict(Notification.objects.values_list('user', 'count'))
+        self.assertEqual(counts, {self.users[0].pk: 2, self.users[1].pk: 1, self.users[2].pk: 1})
+        self.assertEqual([profile.unread for profile in Profile.objects.order_by('user')], [1, 1, 1])
+
+# The DigestTests class checks that the notifications not mailed are summed up in one email per user
+# and window, queued in the outbox.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, DIGEST_WINDOW=3600, DIGEST_ITEMS=2)
+class DigestTests(TestCase):
+    def setUp(self):
+        """
+        This function creates a user with old notifications, one with recent notifications only and one
+        without an email address.
+        """
+        self.old = User.objects.create_user('old', 'old@udg.mx', 'password')
+        self.recent = User.objects.create_user('recent', 'recent@udg.mx', 'password')
+        self.anonymous = User.objects.create_user('anonymous', '', 'password')
+        Notification.objects.notify(
+            [Notification(user=self.old, title='Title', content=f'Content {i}') for i in range(3)]
+            + [Notification(user=self.recent, title='Title', content='Content')]
+            + [Notification(user=self.anonymous, title='Title', content='Content')]
+        )
+        old = timezone.now() - timedelta(hours=2)
+        Notification.objects.exclude(user=self.recent).update(timestamp=old)
+
+    def test_send(self):
+        """
+        This function checks that only the users due get a digest, listing the newest notifications,
+        and that their notifications are not mailed again.
+        """
+        self.assertEqual(digest.send(), (1, 3))
+        mail = Outbox.objects.get()
+        self.assertEqual((mail.to, mail.subject), ('old@udg.mx', 'You have 3 new notifications'))
+        self.assertIn('... and 1 more', mail.body)
+        self.assertEqual(set(Notification.objects.filter(mailed=False).values_list('user', flat=True)),
+            {self.recent.pk})
+        self.assertEqual(digest.send(), (0, 0))
+
+# The RetentionTests class checks the purge of the old read notifications, in chunks, with or without
+# the archive.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, NOTIFICATION_TTL=86400)
+class RetentionTests(TestCase):
+    def setUp(self):
+        """
+        This function creates old read notifications, an old unread one and a recent read one.
+        """
+        self.user = User.objects.create_user('reader', 'reader@udg.mx', 'password')
+        Notification.objects.notify(
+            [Notification(user=self.user, title='Title', content=f'Old {i}', is_read=True)
+                for i in range(5)]
+            + [Notification(user=self.user, title='Title', content='Unread')]
+        )
+        old = timezone.now() - timedelta(days=2)
+        Notification.objects.update(timestamp=old)
+        Notification.objects.notify(
+            [Notification(user=self.user, title='Title', content='Recent', is_read=True)])
+
+    def kept(self):
+        """
+        This function lists the notifications left.
+
+        :return: a set with the contents of the notifications.
+        """
+        return set(Notification.objects.values_list('content', flat=True))
+
+    def test_purge(self):
+        """
+        This function checks that only the old read notifications are deleted, whatever the size of the
+        chunks, and that the unread counter is kept.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            deleted, _ = retention.purge(chunk=2)
+        self.assertEqual(deleted, 5)
+        self.assertEqual(sum(query['sql'].startswith('DELETE') for query in queries), 3)
+        self.assertEqual(self.kept(), {'Unread', 'Recent'})
+        self.assertEqual(Profile.objects.get(user=self.user).unread, 1)
+        self.assertEqual(retention.purge(chunk=2)[0], 0)
+
+    def test_archive(self):
+        """
+        This function checks that the archived notifications keep their id and content, and are archived
+        once when the purge is run again.
+        """
+        ids = set(Notification.objects.filter(content__startswith='Old').values_list('id', flat=True))
+        call_command('prune_notifications', archive=True, chunk=3, pause=0, stdout=StringIO())
+        self.assertEqual(set(ArchivedNotification.objects.values_list('id', flat=True)), ids)
+        self.assertEqual(self.kept(), {'Unread', 'Recent'})
+        call_command('prune_notifications', archive=True, pause=0, stdout=StringIO())
+        self.assertEqual(ArchivedNotification.objects.count(), 5)
@@ -7,4 +7,6 @@ urlpatterns = [
     path('mailverify/', views.mailverify, name='mailverify'),
     path('', views.notifications, name='list'),
     path('strikes/', views.strikes, name='strikes'),
+    path('read/', views.read, name='read'),
+    path('badge/', views.badge, name='badge'),
 ]
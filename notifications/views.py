@@ -1,9 +1,14 @@
 from django.shortcuts import render, redirect
 from verify_email.email_handler import send_verification_email
 from .models import Notification
-from django.core.mail import EmailMessage
+from . import outbox
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_GET, require_POST
+from app.models import Profile
+from post.pagination import paginate
 
 def mail_verification(request,form):
     """
@@ -38,22 +43,53 @@ def mailverify(request):
 @login_required
 def notifications(request):
     """
-    This function retrieves notifications for a specific user and renders them in a list on a web page.
+    This function retrieves one page of the notifications of the current user, newest first, renders
+    them in a list on a web page and marks them as read.
     
     :param request: The request parameter is an object that represents the current HTTP request. It
     contains information about the user making the request, the requested URL, any submitted data, and
-    other metadata related to the request. In this case, the function is using the request object to
-    filter notifications for the current user and pass them
+    other metadata related to the request. The 'cursor' parameter selects the page
     :return: a rendered HTML template 'notifications/list.html' with a context dictionary containing the
-    notifications for the current user.
+    notifications of the page, which still show whether they were unread, and the cursor of the next
+    page.
     """
-    notifications = Notification.objects.filter(user=request.user)
-    context = {'notifications':notifications}
+    queryset = Notification.objects.filter(user=request.user)
+    notifications, cursor = paginate(queryset, request.GET.get('cursor'))
+    Notification.objects.mark_read(request.user, [n.pk for n in notifications if not n.is_read])
+    context = {'notifications':notifications, 'cursor':cursor}
     return render(request, 'notifications/list.html', context)
 
+@login_required
+@require_POST
+def read(request):
+    """
+    This function marks every notification of the current user as read.
+
+    :param request: The request parameter is the HttpRequest of the form of the notifications page
+    :return: a redirect to the notifications page.
+    """
+    Notification.objects.mark_read(request.user)
+    return redirect('notifications:list')
+
+@require_GET
+@cache_control(private=True, no_cache=True)
+def badge(request):
+    """
+    This function returns the number of unread notifications of the current user as JSON, read from the
+    counter of the profile, for the badge of the navigation bar.
+
+    :param request: The request parameter is the HttpRequest of the badge
+    :return: a JsonResponse with the number of unread notifications in 'unread', 0 for anonymous users.
+    """
+    unread = 0
+    if request.user.is_authenticated:
+        unread = Profile.objects.filter(user=request.user).values_list('unread', flat=True).first() or 0
+    return JsonResponse({'unread': unread})
+
 def send_mail(head, body, to):
     """
-    The function sends an email message with a given subject, body, and recipient.
+    The function adds an email with a given subject, body, and recipient to the outbox, from which the
+    sendmail worker delivers it, so the request never waits for the mail server.
     
     :param head: The subject of the email that will be sent
     :param body: The body of the email message that will be sent. It is a string containing the main
@@ -61,37 +97,12 @@ def send_mail(head, body, to):
     :param to: The email address of the recipient(s) to whom the email will be sent
     """
     body += "\nHexagon - Notifications"
-    email = EmailMessage(head, body, to=to)
-    email.send()
-
-def notify_mail(request, head, body, to):
-    """
-    The function sends an email notification and resets the mail count for a user's profile if it
-    exceeds 10.
-    
-    :param request: The request object represents the current HTTP request that is being processed by
-    the server. It contains information about the client making the request, the requested URL, and any
-    data that was sent along with the request. In this case, the request object is being used to access
-    the user object associated with the current
-    :param head: The subject of the email that will be sent
-    :param body: The body parameter in the notify_mail function is a string that represents the content
-    of the email that will be sent. It typically includes the message that the sender wants to convey to
-    the recipient(s)
-    :param to: The "to" parameter is the email address of the recipient who will receive the email
-    notification
-    """
-    user = request.user.profile
-    if user.mails >= 10:
-        send_mail(head, body, to)
-        user.mails = 0
-        user.save()
-    else:
-        user.mails += 1
-        user.save()
+    outbox.enqueue(head, body, to)
 
 def follower(request, user):
     """
-    This function creates a notification and sends an email to a user when they receive a new follower.
+    This function creates a notification for a user when they receive a new follower, which is also
+    mailed in the next digest of the user.
     
     :param request: The request object represents the current HTTP request that the user has made to the
     server. It contains information about the user's request, such as the HTTP method used (GET, POST,
@@ -101,54 +112,42 @@ def follower(request, user):
     """
     title = "New follower"
     content = request.user.username + " has followed you"
+    many = "{count} users have followed you"
     url = redirect('bus', request.user).url
-    notify = Notification(user=user, title=title, content=content, more=url)
-    notify.save()
-    notify_mail(request, title, content, [user.email])
+    Notification.objects.coalesce([user], 'follower', '', title, content, many, url)
 
-def post(request, user, post):
+def post(author, users, post):
     """
-    This function creates a notification and sends an email to a user when a new post is made.
-    
-    :param request: The request object represents the current HTTP request that the user has made to the
-    server. It contains information about the user's request, such as the HTTP method used (GET, POST,
-    etc.), the URL requested, any data submitted in the request, and more
-    :param user: The user parameter is the user who will receive the notification
-    :param post: The "post" parameter is a variable that represents a specific post object. It is likely
-    being used to retrieve information about the post or to perform some action related to the post,
-    such as displaying it on a webpage or updating its content
+    This function notifies a chunk of the followers of a user about a new post.
+
+    :param author: The author parameter is the User who made the post
+    :param users: The users parameter is a list with the followers that receive the notification
+    :param post: The post parameter is the id of the new post, used in the URL of the notification
     """
     title = "New post"
-    content = request.user.username + " has made a new post"
+    content = author.username + " has made a new post"
+    many = author.username + " has made {count} new posts"
     url = redirect('post:post', post).url
-    notify = Notification(user=user, title=title, content=content, more=url)
-    notify.save()
-    notify_mail(request, title, content, [user.email])
+    Notification.objects.coalesce(users, 'post', author.username, title, content, many, url)
 
-def offer(request, user, offer):
+def offer(author, users, offer):
     """
-    This function creates a notification and sends an email to a user about a new offer made by another
-    user.
-    
-    :param request: The request object represents the current HTTP request that the user has made to the
-    server. It contains information about the user's request, such as the HTTP method used, the URL
-    requested, and any data submitted in the request
-    :param user: The user parameter is an instance of the User model representing the user who will
-    receive the notification
-    :param offer: The "offer" parameter is likely an object or identifier representing a specific offer
-    being made by the user. It is used in the URL redirect to the offer page
+    This function notifies a chunk of the followers of a user about a new offer.
+
+    :param author: The author parameter is the User who made the offer
+    :param users: The users parameter is a list with the followers that receive the notification
+    :param offer: The offer parameter is the id of the new offer, used in the URL of the notification
     """
     title = "New offer"
-    content = request.user.username + " has made a new offer"
+    content = author.username + " has made a new offer"
+    many = author.username + " has made {count} new offers"
     url = redirect('post:offer', offer).url
-    notify = Notification(user=user, title=title, content=content, more=url)
-    notify.save()
-    notify_mail(request, title, content, [user.email])
+    Notification.objects.coalesce(users, 'offer', author.username, title, content, many, url)
 
 def comment(request, user, comment):
     """
-    This function creates a notification and sends an email to a user when they receive a new comment on
-    their post.
+    This function creates a notification for a user when they receive a new comment on their post, which
+    is also mailed in the next digest of the user.
     
     :param request: The request object represents the current HTTP request that the user has made to the
     server. It contains information about the user's request, such as the URL being accessed, any data
@@ -160,14 +159,14 @@ def comment(request, user, comment):
     """
     title = "New comment"
     content = request.user.username + " has commented your post"
+    many = "Your posts have {count} new comments"
     url = redirect('post:post', comment).url
-    notify = Notification(user=user, title=title, content=content, more=url)
-    notify.save()
-    notify_mail(request, title, content, [user.email])
+    Notification.objects.coalesce([user], 'comment', '', title, content, many, url)
 
 def message(request, user):
     """
-    This function creates a notification and sends an email to a user with a message from another user.
+    This function creates a notification for a user with a message from another user, which is also
+    mailed in the next digest of the user.
     
     :param request: The request object represents the current HTTP request that the user has made to the
     server. It contains information about the user's request, such as the URL, headers, and any data
@@ -177,10 +176,9 @@ def message(request, user):
     """
     title = "New message"
     content = request.user.username + " has sended you a message"
+    many = request.user.username + " has sended you {count} messages"
     url = redirect('chat:inbox', request.user).url
-    notify = Notification(user=user, title=title, content=content, more=url)
-    notify.save()
-    notify_mail(request, title, content, [user.email])
+    Notification.objects.coalesce([user], 'message', request.user.username, title, content, many, url)
 
 def strike(user):
     """
@@ -196,8 +194,8 @@ def strike(user):
         title = "ALERT"
         content = "You have been permanently suspended"
     url = redirect('notifications:strikes').url
-    notify = Notification(user=user, title=title, content=content, more=url)
-    notify.save()
+    notify = Notification(user=user, kind='strike', title=title, content=content, more=url, mailed=True)
+    Notification.objects.notify([notify])
     send_mail(title, content, [user.email])
 
 @login_required
@@ -0,0 +1,181 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
+from app import images
+from .models import Post, Offer
+from .pagination import decode_cursor
+from . import timeline, conditional, pages
+
+def author(user, ext, route):
+    """
+    The function returns the summary of the author of a card.
+
+    :param user: The user parameter is the User who created the post or offer, with its profile
+    already loaded
+    :param ext: The ext parameter is the image format accepted by the client
+    :param route: The route parameter is the name of the page of the author the card links to, 'profile'
+    for posts and 'bus' for offers, as on the cards rendered by the server
+    :return: a dictionary with the username, the URL of the avatar and of the profile, and the badge of
+    the author, which is 'superuser', 'staff', 'business' or None.
+    """
+    if user.is_superuser:
+        badge = 'superuser'
+    elif user.is_staff:
+        badge = 'staff'
+    elif user.profile.business:
+        badge = 'business'
+    else:
+        badge = None
+    return {
+        'username': user.username,
+        'avatar': images.url(user.profile.image, 'avatar', ext),
+        'url': reverse(route, args=[user.username]),
+        'badge': badge,
+    }
+
+def card(item, ext):
+    """
+    The function turns a post or an offer loaded with `FeedQuerySet.cards` into the fields sent to the
+    clients.
+
+    :param item: The item parameter is the Post or Offer to serialize
+    :param ext: The ext parameter is the image format accepted by the client
+    :return: a dictionary with the fields of the card.
+    """
+    is_post = isinstance(item, Post)
+    topic_url = 'post:topic' if is_post else 'post:otopic'
+    fields = {
+        'id': item.pk,
+        'url': reverse('post:post' if is_post else 'post:offer', args=[item.pk]),
+        'author': author(item.user, ext, 'profile' if is_post else 'bus'),
+        'timestamp': item.timestamp.isoformat(),
+        'text': item.content,
+        'image': images.url(item.image, 'card', ext) or None,
+        'likes': item.like_count,
+        'liked_by_me': item.liked_by_me,
+        'like_url': reverse('post:like' if is_post else 'post:olike', args=[item.pk]),
+        'topics': [
+            {'name': topic.name, 'url': reverse(topic_url, args=[topic.name])}
+            for topic in item.topics.all()
+        ],
+    }
+    if is_post:
+        fields['comments'] = item.comment_count
+    else:
+        fields['head'] = item.head
+    return fields
+
+def page(request, loaded):
+    """
+    The function returns one page of a timeline as JSON, with keyset pagination and sparse fields.
+
+    :param request: The request parameter is the HttpRequest of the endpoint. The 'cursor' parameter
+    selects the page and the optional 'fields' parameter, a comma separated list, selects the fields of
+    every card. The id is always included
+    :param loaded: The loaded parameter is the tuple with the cards of the page and the cursor of the
+    next page, as loaded by `pages`
+    :return: a JsonResponse with the cards of the page in 'results' and the cursor of the next page in
+    'next'.
+    """
+    items, cursor = loaded
+    ext = images.negotiate(request)
+    results = [card(item, ext) for item in items]
+    fields = request.GET.get('fields')
+    if fields:
+        wanted = set(fields.split(',')) | {'id'}
+        results = [{key: value for key, value in result.items() if key in wanted} for result in results]
+    return JsonResponse({'results': results, 'next': cursor})
+
+@require_GET
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=conditional.social)
+def social(request):
+    """
+    This function returns a page of the posts of the social page as JSON.
+    """
+    return page(request, pages.home(request, Post))
+
+@require_GET
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=conditional.feed)
+def feed(request):
+    """
+    This function returns a page of the offers of the feed page as JSON.
+    """
+    return page(request, pages.home(request, Offer))
+
+@require_GET
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=conditional.topics)
+def topics(request, name):
+    """
+    This function returns a page of the posts of a topic as JSON.
+    """
+    return page(request, pages.tagged(request, Post, name))
+
+@require_GET
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=conditional.otopics)
+def otopics(request, name):
+    """
+    This function returns a page of the offers of a topic as JSON.
+    """
+    return page(request, pages.tagged(request, Offer, name))
+
+@require_GET
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=conditional.profile)
+def profile(request, username):
+    """
+    This function returns a page of the posts of a user as JSON. The posts are empty when the user and
+    the viewer have a blocking relationship.
+    """
+    user = get_object_or_404(User, username=username)
+    return page(request, pages.owned(request, user, 'posts'))
+
+def fresh(request, model):
+    """
+    The function counts the items of the social or the feed timeline that are newer than the newest item
+    a client has. When the client is up to date the answer comes from the cached newest item without
+    querying the timeline.
+
+    :param request: The request parameter is the HttpRequest of the endpoint. The 'since' parameter is
+    the cursor of the newest item the client has, and the 'following' parameter selects the home
+    timeline of the viewer
+    :param model: The model parameter is either Post or Offer
+    :return: a JsonResponse with the number of new items in 'count', capped to the `POLL_LIMIT`
+    setting, their ids in 'ids', newest first, and the seconds to wait before polling again in
+    'interval'.
+    """
+    position = decode_cursor(request.GET.get('since'))
+    top = conditional.latest(model)
+    if position is None or top is None or top <= position:
+        return JsonResponse({'count': 0, 'ids': [], 'interval': settings.POLL_INTERVAL})
+    if request.user.is_authenticated and 'following' in request.GET:
+        ids = timeline.since(request.user, model, position, settings.POLL_LIMIT)
+        shown = set(model.objects.filter(pk__in=ids, is_delete=False).visible(request.user)
+            .values_list('id', flat=True))
+        ids = [pk for pk in ids if pk in shown]
+    else:
+        queryset = model.objects.filter(timeline.newer(position, 'id'), is_delete=False)\
+            .visible(request.user).order_by('-timestamp', '-id')
+        ids = list(queryset.values_list('id', flat=True)[:settings.POLL_LIMIT])
+    return JsonResponse({'count': len(ids), 'ids': ids, 'interval': settings.POLL_INTERVAL})
+
+@require_GET
+def social_new(request):
+    """
+    This function returns the number of posts newer than the 'since' cursor as JSON.
+    """
+    return fresh(request, Post)
+
+@require_GET
+def feed_new(request):
+    """
+    This function returns the number of offers newer than the 'since' cursor as JSON.
+    """
+    return fresh(request, Offer)
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from .models import Post
+
+def recount(pk):
+    """
+    The function updates the denormalized number of comments of a post with a single statement that
+    counts its direct comments that are not deleted.
+
+    :param pk: The pk parameter is the primary key of the post whose comments have changed
+    """
+    comments = Post.objects.filter(comment=OuterRef('pk'), is_delete=False)\
+        .values('comment').annotate(total=Count('id')).values('total')
+    Post.objects.filter(pk=pk).update(comment_count=Coalesce(Subquery(comments), 0))
+
+def tree(post):
+    """
+    The function returns the SQL of a recursive query that walks down the comments of a post, level by
+    level, up to `COMMENT_DEPTH` levels and `COMMENT_LIMIT` comments.
+
+    :param post: The post parameter is the Post whose comments are loaded
+    :return: a RawSQL expression with the ids of the comments, to be used in an `in` lookup.
+    """
+    table = Post._meta.db_table
+    sql = (
+        f'WITH RECURSIVE tree(id, depth) AS ('
+        f'SELECT id, 1 FROM {table} WHERE comment_id = %s AND NOT is_delete '
+        f'UNION ALL '
+        f'SELECT child.id, tree.depth + 1 FROM {table} child JOIN tree ON child.comment_id = tree.id '
+        f'WHERE NOT child.is_delete AND tree.depth < %s'
+        f') SELECT id FROM tree LIMIT %s'
+    )
+    return RawSQL(sql, [post.pk, settings.COMMENT_DEPTH, settings.COMMENT_LIMIT])
+
+def thread(post, viewer):
+    """
+    The function loads the comments of a post and the replies to those comments in a single query,
+    with their authors and profiles, and returns them in the order they are displayed.
+
+    :param post: The post parameter is the Post whose comments are loaded
+    :param viewer: The viewer parameter is the User reading the comments. Comments of users with a
+    blocking relationship with the viewer are hidden, and so are the replies to them
+    :return: a list of comments, newest first at every level, where every reply follows the comment it
+    answers. Every comment has a `depth` attribute starting at 1 for the direct comments.
+    """
+    comments = Post.objects.filter(pk__in=tree(post)).visible(viewer).cards(viewer)
+    children = {}
+    for comment in comments:
+        children.setdefault(comment.comment_id, []).append(comment)
+    ordered = []
+    stack = [(comment, 1) for comment in reversed(children.get(post.pk, []))]
+    while stack:
+        comment, depth = stack.pop()
+        comment.depth = depth
+        ordered.append(comment)
+        stack.extend((reply, depth + 1) for reply in reversed(children.get(comment.pk, [])))
+    return ordered
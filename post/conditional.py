@@ -0,0 +1,183 @@
+import hashlib
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from app import images
+from app.models import Profile
+from .models import Post, Offer
+from . import pages, trending
+
+LATEST_KEY = 'post:latest:%s'
+
+def latest(model):
+    """
+    The function returns the position of the newest post or offer that is not deleted, from the cache
+    when possible, so polling clients that are up to date cost no query. The cache is local to the
+    process, so the position is kept for the `POLL_CACHE` setting only and the items created or deleted
+    by the other processes are seen after that delay at most.
+
+    :param model: The model parameter is either Post or Offer
+    :return: a tuple with the timestamp and the id of the newest item, or None if there is none.
+    """
+    key = LATEST_KEY % model._meta.model_name
+    position = cache.get(key)
+    if position is None:
+        position = newest(model.objects.filter(is_delete=False))
+        if position is not None:
+            cache.set(key, position, settings.POLL_CACHE)
+    return position
+
+def advance(item):
+    """
+    The function records a new post or offer as the newest one of its model.
+
+    :param item: The item parameter is the Post or Offer that has just been created
+    """
+    key = LATEST_KEY % item._meta.model_name
+    position = cache.get(key)
+    if position is None or position < (item.timestamp, item.pk):
+        cache.set(key, (item.timestamp, item.pk), settings.POLL_CACHE)
+
+def reset(model):
+    """
+    The function forgets the newest post or offer of a model once an item has been deleted, as it may
+    have been the newest one.
+
+    :param model: The model parameter is either Post or Offer
+    """
+    cache.delete(LATEST_KEY % model._meta.model_name)
+
+def newest(queryset):
+    """
+    The function returns the position of the newest item of a timeline with an indexed lookup.
+
+    :param queryset: The queryset parameter is the timeline of posts or offers shown on the page
+    :return: a tuple with the timestamp and the id of the newest item, or None if the timeline is
+    empty.
+    """
+    return queryset.order_by('-timestamp', '-id').values_list('timestamp', 'id').first()
+
+def validators(items):
+    """
+    The function returns what the cards of a page show that can change: the version of the item, which
+    changes when it is edited, deleted or tagged, its counters, the like state of the viewer and the
+    version of the profile of the author.
+
+    :param items: The items parameter is the list of Post or Offer loaded with `FeedQuerySet.cards`
+    :return: a list with a tuple of validators for every card.
+    """
+    return [
+        (item.pk, item.version, item.like_count, getattr(item, 'comment_count', None), item.liked_by_me,
+            item.user.profile.version)
+        for item in items
+    ]
+
+def etag(request, items, *parts):
+    """
+    The function computes the entity tag of a page from the viewer, the version of the relationships of
+    the viewer, the CSRF secret of the session, the query string, the image format accepted by the
+    client and the validators of the cards of the page, without rendering anything. The CSRF secret
+    changes when the viewer logs in again, so a page whose forms carry the token of an older session is
+    never revalidated, and a signed in viewer without the CSRF cookie always gets the page with a fresh
+    token.
+
+    :param request: The request parameter is the HttpRequest of the page. Only GET and HEAD requests
+    are validated
+    :param items: The items parameter is the list of cards of the page, as loaded by `pages`
+    :param parts: The parts parameter are other values the page depends on, such as the owner of a
+    profile
+    :return: the entity tag, or None for other methods and signed in viewers without the CSRF cookie,
+    so the page is always rendered.
+    """
+    viewer = request.user
+    secret = request.META.get('CSRF_COOKIE')
+    if request.method not in ('GET', 'HEAD') or (secret is None and viewer.is_authenticated):
+        return None
+    version = None
+    if viewer.is_authenticated:
+        version = Profile.objects.filter(user=viewer).values_list('version', flat=True).first()
+    key = [viewer.pk, viewer.is_staff, version, secret, request.GET.urlencode()]
+    key += [images.negotiate(request), validators(items)] + list(parts)
+    return hashlib.md5(repr(key).encode()).hexdigest()
+
+def home(request, model):
+    """
+    The function computes the entity tag of the social or the feed page, whose timeline is either every
+    item or the home timeline of the viewer.
+
+    :param request: The request parameter is the HttpRequest of the page
+    :param model: The model parameter is either Post or Offer, depending on the page
+    :return: the entity tag of the page.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    items, cursor = pages.home(request, model)
+    return etag(request, items, cursor, [topic.pk for topic in trending.trending()])
+
+def social(request):
+    """
+    The function computes the entity tag of the social page.
+    """
+    return home(request, Post)
+
+def feed(request):
+    """
+    The function computes the entity tag of the feed page.
+    """
+    return home(request, Offer)
+
+def tagged(request, model, name):
+    """
+    The function computes the entity tag of the page of a topic.
+
+    :param request: The request parameter is the HttpRequest of the page
+    :param model: The model parameter is either Post or Offer, depending on the page
+    :param name: The name parameter is the name of the topic in the URL
+    :return: the entity tag of the page.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    items, cursor = pages.tagged(request, model, name)
+    return etag(request, items, cursor)
+
+def topics(request, name):
+    """
+    The function computes the entity tag of the page of a topic of posts.
+    """
+    return tagged(request, Post, name)
+
+def otopics(request, name):
+    """
+    The function computes the entity tag of the page of a topic of offers.
+    """
+    return tagged(request, Offer, name)
+
+def owned(request, username, field):
+    """
+    The function computes the entity tag of the profile or the business page of a user, which also
+    depends on the profile of the owner.
+
+    :param request: The request parameter is the HttpRequest of the page
+    :param username: The username parameter is the username of the owner of the page
+    :param field: The field parameter is the related name of the items listed, 'posts' or 'offers'
+    :return: the entity tag of the page, or None if the user does not exist.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    user = User.objects.filter(username=username).select_related('profile').first()
+    if user is None:
+        return None
+    items, cursor = pages.owned(request, user, field)
+    return etag(request, items, cursor, user.pk, user.profile.version, user.profile.follower_count)
+
+def profile(request, username):
+    """
+    The function computes the entity tag of the profile page of a user.
+    """
+    return owned(request, username, 'posts')
+
+def bus(request, username):
+    """
+    The function computes the entity tag of the business page of a user.
+    """
+    return owned(request, username, 'offers')
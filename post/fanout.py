@@ -0,0 +1,111 @@
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from app.models import Relationship
+from notifications.views import post as notify, offer as onotify
+from .models import Post, Fanout
+from . import timeline
+
+def enqueue(item):
+    """
+    The function writes a new post or offer to the home timeline of its author and leaves the delivery
+    to the followers to the fanout worker, so creating an item costs the same for every author.
+
+    :param item: The item parameter is the Post or Offer that has just been saved
+    :return: the Fanout job created.
+    """
+    timeline.deliver(item, [item.user_id])
+    field = 'post' if isinstance(item, Post) else 'offer'
+    return Fanout.objects.create(author_id=item.user_id, **{field: item})
+
+def claim():
+    """
+    The function takes the oldest job that no other worker is running. A job locked for longer than the
+    `FANOUT_TIMEOUT` setting belongs to a worker that died, and is taken again from its cursor.
+
+    :return: the Fanout job claimed, or None if there is nothing to do.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.FANOUT_TIMEOUT)
+    free = Q(locked=None) | Q(locked__lt=stale)
+    for pk in Fanout.objects.filter(free, is_dead=False).values_list('id', flat=True)[:10]:
+        if Fanout.objects.filter(free, pk=pk).update(locked=now):
+            return Fanout.objects.select_related('author', 'post', 'offer').get(pk=pk)
+    return None
+
+def step(job, push):
+    """
+    The function delivers a job to the next chunk of followers of the author, in a single transaction
+    that also moves the cursor of the job, so a chunk is never delivered twice.
+
+    :param job: The job parameter is the Fanout job claimed by the worker
+    :param push: The push parameter tells whether the item is written to the home timelines of the
+    followers, which is not the case for the authors whose content is pulled at read time
+    :return: the number of followers served, 0 once the job is finished.
+    """
+    ids = list(Relationship.objects.filter(to_user=job.author, is_follow=True, from_user_id__gt=job.cursor)
+        .order_by('from_user_id').values_list('from_user_id', flat=True)[:settings.FANOUT_CHUNK])
+    if not ids:
+        return 0
+    users = list(User.objects.filter(pk__in=ids).only('id', 'email').order_by('id'))
+    with transaction.atomic():
+        if push:
+            timeline.deliver(job.item, ids)
+        if job.post_id:
+            notify(job.author, users, job.post_id)
+        else:
+            onotify(job.author, users, job.offer_id)
+        job.cursor = ids[-1]
+        job.locked = timezone.now()
+        job.save(update_fields=['cursor', 'locked'])
+    return len(ids)
+
+def run(job):
+    """
+    The function carries out a job chunk by chunk and deletes it once every follower has been served.
+    Jobs of items deleted in the meantime are dropped.
+
+    :param job: The job parameter is the Fanout job claimed by the worker
+    :return: the number of followers served.
+    """
+    served = 0
+    if not job.item.is_delete:
+        push = timeline.pushed(job.author)
+        while True:
+            count = step(job, push)
+            if not count:
+                break
+            served += count
+    job.delete()
+    return served
+
+def work(limit=None):
+    """
+    The function runs the pending jobs one after the other. A job that fails keeps the chunks it
+    already delivered and stays locked, so it is tried again from its cursor once the `FANOUT_TIMEOUT`
+    setting has passed. A job that failed `FANOUT_MAX_ATTEMPTS` times is given up on and kept as a dead
+    job, which is never claimed again.
+
+    :param limit: The limit parameter is the maximum number of jobs to run, None for every pending job
+    :return: a tuple with the number of jobs run, the number of followers served, the number of jobs
+    that failed and the number of those given up on.
+    """
+    jobs = served = failed = dead = 0
+    while limit is None or jobs + failed < limit:
+        job = claim()
+        if job is None:
+            break
+        try:
+            served += run(job)
+            jobs += 1
+        except Exception:
+            attempts = job.attempts + 1
+            is_dead = attempts >= settings.FANOUT_MAX_ATTEMPTS
+            Fanout.objects.filter(pk=job.pk)\
+                .update(locked=timezone.now(), attempts=attempts, is_dead=is_dead)
+            failed += 1
+            dead += is_dead
+    return jobs, served, failed, dead
@@ -1,5 +1,7 @@
 from django import forms
-from .models import Post, Offer, Topic
+from django.core.files.uploadedfile import UploadedFile
+from app import images
+from .models import Post, Offer
 
 # This is a Django form class for creating an Offer object with fields for head, content, and image.
 class OfferForm(forms.ModelForm):
@@ -28,6 +30,17 @@ class OfferForm(forms.ModelForm):
         model = Offer
         fields = ['head', 'content', 'image']
 
+    def clean_image(self):
+        """
+        This function checks the uploaded image against the budget of offers before decoding it and
+        replaces it with a bounded JPEG without metadata.
+        :return: the sanitized image, or the current image if no file has been uploaded.
+        """
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            image = images.sanitize(image, 'offer')
+        return image
+
 # The `PostForm` class is a Django ModelForm that includes fields for `content` and `image`, with
 # corresponding widgets and attributes.
 class PostForm(forms.ModelForm):
@@ -50,9 +63,20 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ['content', 'image']
 
-# This is a Django form class for creating or updating a Topic model instance with a single field for
-# the name attribute, which is a CharField with optional input validation and a placeholder text.
-class TopicForm(forms.ModelForm):
+    def clean_image(self):
+        """
+        This function checks the uploaded image against the budget of posts before decoding it and
+        replaces it with a bounded JPEG without metadata.
+        :return: the sanitized image, or the current image if no file has been uploaded.
+        """
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            image = images.sanitize(image, 'post')
+        return image
+
+# This is a Django form class with a single optional field for the names of the topics of a post or an
+# offer, which are resolved in bulk instead of being saved as a Topic instance.
+class TopicForm(forms.Form):
     name = forms.CharField(
         required=False,
         widget=forms.TextInput(attrs={
@@ -60,8 +84,3 @@ class TopicForm(forms.ModelForm):
             'placeholder':"topic1 topic2"
         })
     )
-
-    # This class defines the model and fields for a Topic in Python.
-    class Meta:
-        model = Topic
-        fields = ['name']
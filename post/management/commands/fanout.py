@@ -0,0 +1,28 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from post import fanout
+
+# This command is the worker that delivers new posts and offers to the followers of their authors. It
+# runs forever, waiting FANOUT_SLEEP seconds whenever there is nothing to do, unless --once is given.
+class Command(BaseCommand):
+    help = 'Delivers new posts and offers to the timelines and notifications of the followers'
+
+    def add_arguments(self, parser):
+        """
+        This function adds the option to run the pending jobs once and exit.
+        """
+        parser.add_argument('--once', action='store_true', help='Run the pending jobs and exit')
+
+    def handle(self, *args, **options):
+        """
+        This function runs the pending jobs, reporting every batch, and waits for new ones.
+        """
+        while True:
+            jobs, served, failed, dead = fanout.work()
+            if jobs or failed:
+                self.stdout.write(f'Ran {jobs} jobs for {served} followers, {failed} failed, '
+                    f'{dead} given up on')
+            if options['once']:
+                break
+            time.sleep(settings.FANOUT_SLEEP)
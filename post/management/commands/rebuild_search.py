@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from post import search
+
+# This command rebuilds the full-text search tables from the posts and offers that are not deleted,
+# for example after restoring a backup or changing the indexed fields.
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index of posts and offers'
+
+    def handle(self, *args, **options):
+        """
+        This function rebuilds the search tables and reports the number of rows indexed.
+        """
+        if not search.supported():
+            self.stdout.write('The database does not support full-text search')
+            return
+        for name, total in search.rebuild().items():
+            self.stdout.write(f'Indexed {total} {name}s')
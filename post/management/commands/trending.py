@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from post import trending
+
+# This command deletes the topic counters that are out of the trending window and reports the trending
+# topics of the current window. It is meant to be run periodically, for example from cron. The list
+# shown by the pages is computed by every web process and cached for TRENDING_REFRESH seconds.
+class Command(BaseCommand):
+    help = 'Prunes old topic counters and reports the trending topics'
+
+    def handle(self, *args, **options):
+        """
+        This function prunes the counters and reports what was done and the topics trending now.
+        """
+        deleted = trending.prune()
+        self.stdout.write(f'Pruned {deleted} counters')
+        for topic in trending.compute():
+            self.stdout.write(f'#{topic.name} {topic.score:.2f}')
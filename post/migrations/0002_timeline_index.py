@@ -0,0 +1,37 @@
+# Generated by Django 4.1.5 on 2026-10-18 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='offer',
+            options={'ordering': ['-timestamp', '-id']},
+        ),
+        migrations.AlterModelOptions(
+            name='post',
+            options={'ordering': ['-timestamp', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(fields=['is_delete', '-timestamp', '-id'], name='offer_timeline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(fields=['user', 'is_delete', '-timestamp', '-id'], name='offer_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['is_delete', '-timestamp', '-id'], name='post_timeline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['user', 'is_delete', '-timestamp', '-id'], name='post_author_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.1.5 on 2026-10-18 10:37
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_likes(apps, schema_editor):
+    for name in ['Post', 'Offer']:
+        model = apps.get_model('post', name)
+        likes = model.likes.through.objects.filter(**{name.lower(): OuterRef('pk')})\
+            .values(name.lower()).annotate(total=Count('id')).values('total')
+        model.objects.update(like_count=Coalesce(Subquery(likes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0003_timeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offer',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_likes, migrations.RunPython.noop),
+    ]
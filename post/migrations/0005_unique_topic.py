@@ -0,0 +1,40 @@
+# Generated by Django 4.1.5 on 2026-10-18 10:38
+
+from django.db import migrations, models
+
+
+def merge_topics(apps, schema_editor):
+    Topic = apps.get_model('post', 'Topic')
+    links = [apps.get_model('post', name).topics.through for name in ['Post', 'Offer']]
+    kept = {}
+    for topic in Topic.objects.order_by('pk'):
+        name = ''.join(filter(str.isalnum, topic.name)).lower()[:255]
+        if name not in kept:
+            kept[name] = topic
+            if topic.name != name:
+                topic.name = name
+                topic.save()
+            continue
+        target = kept[name]
+        for through in links:
+            field = [f.name for f in through._meta.fields if f.name not in ('id', 'topic')][0]
+            linked = through.objects.filter(topic=target).values(field)
+            through.objects.filter(topic=topic, **{field + '__in': linked}).delete()
+            through.objects.filter(topic=topic).update(topic=target)
+        topic.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0004_like_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_topics, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='topic',
+            name='name',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.1.5 on 2026-10-18 10:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0005_unique_topic'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counts', to='post.topic')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='topiccount',
+            index=models.Index(fields=['bucket'], name='topiccount_bucket_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='topiccount',
+            constraint=models.UniqueConstraint(fields=('topic', 'bucket'), name='topiccount_unique'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+TABLES = [
+    ('post_post_search', 'post_post', ['content']),
+    ('post_offer_search', 'post_offer', ['head', 'content']),
+]
+
+
+def create_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, source, columns in TABLES:
+        schema_editor.execute(f'CREATE VIRTUAL TABLE {table} USING fts5({", ".join(columns)})')
+        schema_editor.execute(
+            f'INSERT INTO {table} (rowid, {", ".join(columns)}) '
+            f'SELECT id, {", ".join(columns)} FROM {source} WHERE NOT is_delete'
+        )
+
+
+def drop_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, source, columns in TABLES:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0006_topic_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search, drop_search),
+    ]
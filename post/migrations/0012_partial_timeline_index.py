@@ -0,0 +1,45 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0011_counter'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='offer',
+            name='offer_timeline_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='offer',
+            name='offer_author_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_timeline_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_author_idx',
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(condition=models.Q(('is_delete', False)), fields=['-timestamp', '-id'], name='offer_timeline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(condition=models.Q(('is_delete', False)), fields=['user', '-timestamp', '-id'], name='offer_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_delete', False)), fields=['-timestamp', '-id'], name='post_timeline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_delete', False)), fields=['user', '-timestamp', '-id'], name='post_author_idx'),
+        ),
+    ]
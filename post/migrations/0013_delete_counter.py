@@ -0,0 +1,16 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0012_partial_timeline_index'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='Counter',
+        ),
+    ]
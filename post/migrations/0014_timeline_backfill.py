@@ -0,0 +1,64 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_timelines(apps, schema_editor):
+    Profile = apps.get_model('app', 'Profile')
+    Relationship = apps.get_model('app', 'Relationship')
+    Post = apps.get_model('post', 'Post')
+    Offer = apps.get_model('post', 'Offer')
+    Timeline = apps.get_model('post', 'Timeline')
+    size = settings.PAGE_SIZE
+    pairs = [(pk, pk) for pk in Profile.objects.values_list('user', flat=True)]
+    pairs += Relationship.objects.filter(is_follow=True,
+        to_user__profile__follower_count__lte=settings.FANOUT_LIMIT).values_list('from_user', 'to_user')
+    latest = {}
+    for user, author in pairs:
+        if author not in latest:
+            posts = Post.objects.filter(user=author, is_delete=False, comment=None)\
+                .order_by('-timestamp', '-id').values_list('id', 'timestamp')[:size]
+            offers = Offer.objects.filter(user=author, is_delete=False)\
+                .order_by('-timestamp', '-id').values_list('id', 'timestamp')[:size]
+            latest[author] = [('post', *post) for post in posts] + [('offer', *offer) for offer in offers]
+        if not latest[author]:
+            continue
+        existing = set(Timeline.objects.filter(user=user, author=author).values_list('post', 'offer'))
+        Timeline.objects.bulk_create([
+            Timeline(user_id=user, author_id=author, timestamp=timestamp, **{field + '_id': pk})
+            for field, pk, timestamp in latest[author]
+            if ((pk, None) if field == 'post' else (None, pk)) not in existing
+        ], batch_size=500)
+    table = Timeline._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE id IN (SELECT id FROM (SELECT id, ROW_NUMBER() OVER '
+            f'(PARTITION BY user_id ORDER BY timestamp DESC, id DESC) AS position FROM {table}) '
+            f'WHERE position > %s)',
+            [settings.TIMELINE_SIZE],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_profile_follower_count'),
+        ('post', '0013_delete_counter'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='timeline',
+            name='timeline_user_idx',
+        ),
+        migrations.AddIndex(
+            model_name='timeline',
+            index=models.Index(condition=models.Q(('post__isnull', False)), fields=['user', '-timestamp', '-post'], name='timeline_post_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeline',
+            index=models.Index(condition=models.Q(('offer__isnull', False)), fields=['user', '-timestamp', '-offer'], name='timeline_offer_idx'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.1.5 on 2026-10-18 11:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0015_image_formats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fanout',
+            name='is_dead',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='fanout',
+            index=models.Index(condition=models.Q(('is_dead', False)), fields=['timestamp', 'id'], name='fanout_due_idx'),
+        ),
+    ]
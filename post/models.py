@@ -1,7 +1,71 @@
 from django.db import models
 from django.utils import timezone
 from django.contrib.auth.models import User
-from app.models import rename_image
+from django.db.models import Case, Exists, F, OuterRef, Q, Value, When
+from app.models import rename_image, Relationship
+
+# The FeedQuerySet class adds the filters shared by the timelines of posts and offers.
+class FeedQuerySet(models.QuerySet):
+    def visible(self, viewer):
+        """
+        This function excludes the content of the users who have blocked the viewer or who have been
+        blocked by the viewer, using a single subquery instead of checking every item in the template.
+
+        :param viewer: The viewer parameter is the User who is looking at the timeline. Anonymous users
+        see every item
+        :return: a queryset without the items whose author has a blocking relationship with the viewer.
+        """
+        if not viewer.is_authenticated:
+            return self
+        hidden = Relationship.objects.filter(Q(from_user=viewer) | Q(to_user=viewer), is_block=True)\
+            .annotate(other=Case(When(from_user=viewer, then=F('to_user')), default=F('from_user')))\
+            .values('other')
+        return self.exclude(user__in=hidden)
+
+    def with_likes(self, viewer):
+        """
+        This function annotates every item with whether the viewer has liked it, using one indexed
+        EXISTS subquery for the whole page instead of loading the likes of every item.
+
+        :param viewer: The viewer parameter is the User who is looking at the timeline. Anonymous users
+        have not liked anything
+        :return: a queryset whose items have a boolean `liked_by_me` attribute.
+        """
+        if not viewer.is_authenticated:
+            return self.annotate(liked_by_me=Value(False))
+        likes = self.model.likes.through.objects.filter(
+            **{self.model._meta.model_name: OuterRef('pk')}, user=viewer)
+        return self.annotate(liked_by_me=Exists(likes))
+
+    def cards(self, viewer):
+        """
+        This function loads everything a card needs in a fixed number of queries: the author and the
+        profile of the author are joined, the topics are prefetched for the whole page and the like
+        state of the viewer is annotated. The like and comment counts are columns of the item.
+
+        :param viewer: The viewer parameter is the User who is looking at the cards
+        :return: a queryset whose items can be rendered as cards without any further query.
+        """
+        return self.with_likes(viewer).select_related('user__profile').prefetch_related('topics')
+
+    def timeline(self, viewer):
+        """
+        This function returns the items that are not deleted and that the viewer is allowed to see,
+        ready to be rendered as cards.
+
+        :param viewer: The viewer parameter is the User who is looking at the timeline
+        :return: a queryset of cards that can be filtered further and paginated.
+        """
+        return self.filter(is_delete=False).visible(viewer).cards(viewer)
+
+    def touch(self):
+        """
+        This function bumps the version of the items, so the cached fragments of their cards are
+        rendered again the next time they are displayed.
+
+        :return: the number of items updated.
+        """
+        return self.update(version=F('version') + 1)
 
 # The Offer class defines a model for offers with various fields such as timestamp, head, content,
 # user, likes, image, and topics.
@@ -11,14 +75,26 @@ class Offer(models.Model):
     content = models.TextField()
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='offers')
     likes = models.ManyToManyField(User, blank=True, related_name='olikes')
+    like_count = models.PositiveIntegerField(default=0)
     is_delete = models.BooleanField(default=False)
     image = models.ImageField(blank=True, null=True, upload_to=rename_image)
+    image_formats = models.CharField(max_length=50, blank=True, default='')
     topics = models.ManyToManyField('Topic', blank=True)
+    version = models.PositiveIntegerField(default=0)
+
+    objects = FeedQuerySet.as_manager()
 
     # This class sets the default ordering for a model to be based on the timestamp field in
-    # descending order.
+    # descending order, with partial indexes over the items that are not deleted that serve the keyset
+    # pagination of the timelines without sorting.
     class Meta:
-        ordering = ['-timestamp']
+        ordering = ['-timestamp', '-id']
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], condition=Q(is_delete=False),
+                name='offer_timeline_idx'),
+            models.Index(fields=['user', '-timestamp', '-id'], condition=Q(is_delete=False),
+                name='offer_author_idx'),
+        ]
 
     def __str__(self):
         """
@@ -28,6 +104,18 @@ class Offer(models.Model):
         """
         return self.head
 
+    def save(self, *args, **kwargs):
+        """
+        This function saves the offer and bumps its version in the same statement when it already
+        exists, so a stale copy never writes back an older version.
+        """
+        bump = not self._state.adding and kwargs.get('update_fields') is None
+        if bump:
+            self.version = F('version') + 1
+        super().save(*args, **kwargs)
+        if bump:
+            self.refresh_from_db(fields=['version'])
+
 # This is a Django model class for a post that includes fields for timestamp, content, user, likes,
 # comments, deletion status, image, and topics.
 class Post(models.Model):
@@ -35,15 +123,28 @@ class Post(models.Model):
     content = models.TextField()
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     likes = models.ManyToManyField(User, blank=True, related_name='likes')
+    like_count = models.PositiveIntegerField(default=0)
     comment = models.ForeignKey('self', on_delete=models.CASCADE, blank=True, null=True)
+    comment_count = models.PositiveIntegerField(default=0)
     is_delete = models.BooleanField(default=False)
     image = models.ImageField(blank=True, null=True, upload_to=rename_image)
+    image_formats = models.CharField(max_length=50, blank=True, default='')
     topics = models.ManyToManyField('Topic', blank=True)
+    version = models.PositiveIntegerField(default=0)
+
+    objects = FeedQuerySet.as_manager()
 
     # This class sets the default ordering for a model to be based on the timestamp field in
-    # descending order.
+    # descending order, with partial indexes over the items that are not deleted that serve the keyset
+    # pagination of the timelines without sorting.
     class Meta:
-        ordering = ['-timestamp']
+        ordering = ['-timestamp', '-id']
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], condition=Q(is_delete=False),
+                name='post_timeline_idx'),
+            models.Index(fields=['user', '-timestamp', '-id'], condition=Q(is_delete=False),
+                name='post_author_idx'),
+        ]
 
     def __str__(self):
         """
@@ -52,9 +153,22 @@ class Post(models.Model):
         """
         return self.content
 
-# The Topic class defines a model with a name attribute that can be represented as a string.
+    def save(self, *args, **kwargs):
+        """
+        This function saves the post and bumps its version in the same statement when it already
+        exists, so a stale copy never writes back an older version.
+        """
+        bump = not self._state.adding and kwargs.get('update_fields') is None
+        if bump:
+            self.version = F('version') + 1
+        super().save(*args, **kwargs)
+        if bump:
+            self.refresh_from_db(fields=['version'])
+
+# The Topic class defines a model with a unique, normalized name attribute that can be represented as
+# a string.
 class Topic(models.Model):
-    name = models.CharField(max_length=255)
+    name = models.CharField(max_length=255, unique=True)
 
     def __str__(self):
         """
@@ -62,3 +176,89 @@ class Topic(models.Model):
         :return: The `__str__` method is returning the `name` attribute of the object.
         """
         return self.name
+
+# The Timeline class is the materialized home timeline of a user, with one row for every post or offer
+# made by an account the user follows, written when the post or offer is created.
+class Timeline(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, blank=True, null=True, related_name='+')
+    offer = models.ForeignKey(Offer, on_delete=models.CASCADE, blank=True, null=True, related_name='+')
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    # This class sets the ordering of the entries and the partial indexes used to read the posts and the
+    # offers of the timeline of a user in the order of the items.
+    class Meta:
+        ordering = ['-timestamp', '-id']
+        indexes = [
+            models.Index(fields=['user', '-timestamp', '-post'], condition=Q(post__isnull=False),
+                name='timeline_post_idx'),
+            models.Index(fields=['user', '-timestamp', '-offer'], condition=Q(offer__isnull=False),
+                name='timeline_offer_idx'),
+        ]
+
+    def __str__(self):
+        """
+        This function returns a string representation of a timeline entry.
+        :return: A string with the username of the owner of the timeline and the author of the entry.
+        """
+        return f'{self.author} to {self.user}'
+
+# The Fanout class is a pending delivery of a new post or offer to the followers of its author, written
+# in the request that creates the item and carried out by the fanout worker, chunk by chunk, so the
+# request does not depend on the number of followers. The cursor is the id of the last follower served.
+class Fanout(models.Model):
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, blank=True, null=True, related_name='+')
+    offer = models.ForeignKey(Offer, on_delete=models.CASCADE, blank=True, null=True, related_name='+')
+    cursor = models.BigIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    locked = models.DateTimeField(blank=True, null=True)
+    is_dead = models.BooleanField(default=False)
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    # This class sets the order the jobs are carried out in and the index used to find the pending jobs,
+    # which leaves out the jobs given up on.
+    class Meta:
+        ordering = ['timestamp', 'id']
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='fanout_due_idx', condition=models.Q(is_dead=False)),
+        ]
+
+    def __str__(self):
+        """
+        This function returns a string representation of a job.
+        :return: A string with the author and the item delivered.
+        """
+        return f'{self.author} {self.post or self.offer}'
+
+    @property
+    def item(self):
+        """
+        This function returns the post or offer delivered by the job.
+        :return: The Post or the Offer of the job.
+        """
+        return self.post or self.offer
+
+# The TopicCount class counts how many times a topic has been used during a time bucket, which is the
+# data the trending topics are computed from.
+class TopicCount(models.Model):
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='counts')
+    bucket = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+
+    # This class sets the unique key updated by the counters and the index used to read a time window.
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['topic', 'bucket'], name='topiccount_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket'], name='topiccount_bucket_idx'),
+        ]
+
+    def __str__(self):
+        """
+        This function returns a string representation of a counter.
+        :return: A string with the name of the topic, the start of the bucket and the count.
+        """
+        return f'{self.topic} at {self.bucket}: {self.count}'
@@ -0,0 +1,76 @@
+from .pagination import paginate
+from . import timeline, topics as topic_index
+
+def load(request, fetch, *args):
+    """
+    The function loads the page of cards shown by a request once, so the entity tag of the page and the
+    view that renders it share the same queries.
+
+    :param request: The request parameter is the HttpRequest of the page
+    :param fetch: The fetch parameter is the function that loads the page, called with the remaining
+    arguments the first time only
+    :return: a tuple with the list of cards of the page and the cursor of the next page.
+    """
+    if not hasattr(request, 'cards'):
+        request.cards = fetch(*args)
+    return request.cards
+
+def page(request, queryset):
+    """
+    The function loads the page of a timeline selected by the cursor of the request.
+
+    :param request: The request parameter is the HttpRequest of the page, whose 'cursor' parameter
+    selects the page
+    :param queryset: The queryset parameter is the timeline, loaded with `FeedQuerySet.timeline`
+    :return: a tuple with the list of cards of the page and the cursor of the next page.
+    """
+    return load(request, paginate, queryset, request.GET.get('cursor'))
+
+def home(request, model):
+    """
+    The function loads the page of the social or the feed page, whose timeline is either every item or
+    the home timeline of the viewer when the 'following' parameter is present.
+
+    :param request: The request parameter is the HttpRequest of the page
+    :param model: The model parameter is either Post or Offer, depending on the page
+    :return: a tuple with the list of cards of the page and the cursor of the next page.
+    """
+    if request.user.is_authenticated and 'following' in request.GET:
+        return load(request, followed, request, model)
+    return page(request, model.objects.timeline(request.user))
+
+def followed(request, model):
+    """
+    The function loads the page of the home timeline of the viewer, whose items are read by id.
+
+    :param request: The request parameter is the HttpRequest of the page, whose 'cursor' parameter
+    selects the page
+    :param model: The model parameter is either Post or Offer, depending on the page
+    :return: a tuple with the list of cards of the page and the cursor of the next page.
+    """
+    ids, cursor = timeline.home(request.user, model, request.GET.get('cursor'))
+    items = model.objects.filter(pk__in=ids).timeline(request.user).in_bulk()
+    return [items[pk] for pk in ids if pk in items], cursor
+
+def tagged(request, model, name):
+    """
+    The function loads the page of the items of a topic.
+
+    :param request: The request parameter is the HttpRequest of the page
+    :param model: The model parameter is either Post or Offer, depending on the page
+    :param name: The name parameter is the name of the topic in the URL
+    :return: a tuple with the list of cards of the page and the cursor of the next page.
+    """
+    queryset = model.objects.filter(topics__name=topic_index.normalize(name))
+    return page(request, queryset.timeline(request.user))
+
+def owned(request, user, field):
+    """
+    The function loads the page of the items of the profile or the business page of a user.
+
+    :param request: The request parameter is the HttpRequest of the page
+    :param user: The user parameter is the User who owns the page
+    :param field: The field parameter is the related name of the items listed, 'posts' or 'offers'
+    :return: a tuple with the list of cards of the page and the cursor of the next page.
+    """
+    return page(request, getattr(user, field).timeline(request.user))
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db.models import Q
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+def encode_position(timestamp, pk):
+    """
+    The function encodes a position in a timeline as an opaque cursor string.
+
+    :param timestamp: The timestamp parameter is the timestamp of the item at the position
+    :param pk: The pk parameter is the primary key of the item at the position
+    :return: a string made of the timestamp in microseconds since the epoch and the primary key,
+    separated by a dot.
+    """
+    micros = (timestamp - EPOCH) // timedelta(microseconds=1)
+    return f'{micros}.{pk}'
+
+def encode_cursor(item, key='pk'):
+    """
+    The function encodes the position of an item in a timeline as an opaque cursor string.
+
+    :param item: The item parameter is a model instance with a `timestamp` and a primary key, such as a
+    Post or an Offer. It is the last item of the page that was rendered
+    :param key: The key parameter is the attribute that holds the id of the item, which is not the
+    primary key for the entries of the home timelines
+    :return: a string made of the timestamp in microseconds since the epoch and the id of the item,
+    separated by a dot.
+    """
+    return encode_position(item.timestamp, getattr(item, key))
+
+def decode_cursor(cursor):
+    """
+    The function decodes a cursor string created by `encode_cursor` back into a timestamp and an id.
+
+    :param cursor: The cursor parameter is the string received in the query string of the request. It
+    may be missing or malformed, in which case the first page is returned
+    :return: a tuple with the timestamp and the primary key encoded in the cursor, or None if the cursor
+    is empty or invalid.
+    """
+    if not cursor:
+        return None
+    try:
+        micros, pk = cursor.split('.')
+        return EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (ValueError, OverflowError):
+        return None
+
+def paginate(queryset, cursor, size=None, key='id'):
+    """
+    The function returns one page of a queryset ordered by timestamp and id using keyset pagination, so
+    the cost of a page does not depend on how deep into the timeline the user has scrolled. The bound on
+    the timestamp alone lets the database seek into the index of the timeline instead of scanning it
+    from the newest item.
+
+    :param queryset: The queryset parameter is a queryset of a model with `timestamp` and `id` fields,
+    such as Post or Offer. It is ordered newest first before being sliced
+    :param cursor: The cursor parameter is the string returned as `next` by the previous page, or None
+    for the first page
+    :param size: The size parameter is the number of items per page. It defaults to the `PAGE_SIZE`
+    setting
+    :param key: The key parameter is the field that breaks the ties between items with the same
+    timestamp, which is the id of the item
+    :return: a tuple with the list of items of the page and the cursor of the next page, which is None
+    when there are no more items.
+    """
+    size = size or settings.PAGE_SIZE
+    position = decode_cursor(cursor)
+    queryset = queryset.order_by('-timestamp', '-' + key)
+    if position:
+        timestamp, pk = position
+        before = Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, **{key + '__lt': pk})
+        queryset = queryset.filter(before, timestamp__lte=timestamp)
+    items = list(queryset[:size + 1])
+    if len(items) > size:
+        items = items[:size]
+        return items, encode_cursor(items[-1], key)
+    return items, None
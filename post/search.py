@@ -0,0 +1,127 @@
+import re
+from functools import reduce
+from operator import or_
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from .models import Post, Offer
+from .pagination import paginate
+
+# The search tables are FTS5 virtual tables whose rowid is the primary key of the indexed item, with
+# one column per indexed field.
+TABLES = {
+    Post: ('post_post_search', ['content']),
+    Offer: ('post_offer_search', ['head', 'content']),
+}
+
+def supported():
+    """
+    The function checks whether the database supports the full-text search tables.
+    :return: True if the database is SQLite, which provides FTS5, False otherwise.
+    """
+    return connection.vendor == 'sqlite'
+
+def index(item):
+    """
+    The function adds a post or an offer to its search table, replacing the previous version, or
+    removes it if it has been deleted.
+
+    :param item: The item parameter is the Post or Offer that has just been saved
+    """
+    if not supported():
+        return
+    if item.is_delete:
+        unindex(item)
+        return
+    table, columns = TABLES[type(item)]
+    values = [getattr(item, column) for column in columns]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [item.pk])
+        cursor.execute(
+            f'INSERT INTO {table} (rowid, {", ".join(columns)}) '
+            f'VALUES (%s, {", ".join(["%s"] * len(columns))})',
+            [item.pk] + values,
+        )
+
+def unindex(item):
+    """
+    The function removes a post or an offer from its search table.
+    :param item: The item parameter is the Post or Offer that has been deleted
+    """
+    if not supported():
+        return
+    table, columns = TABLES[type(item)]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [item.pk])
+
+def rebuild():
+    """
+    The function empties the search tables and indexes again every post and offer that is not deleted.
+    :return: a dictionary with the number of rows indexed for each model.
+    """
+    total = {}
+    if not supported():
+        return total
+    with connection.cursor() as cursor:
+        for model, (table, columns) in TABLES.items():
+            cursor.execute(f'DELETE FROM {table}')
+            cursor.execute(
+                f'INSERT INTO {table} (rowid, {", ".join(columns)}) '
+                f'SELECT id, {", ".join(columns)} FROM {model._meta.db_table} WHERE NOT is_delete'
+            )
+            total[model._meta.model_name] = cursor.rowcount
+    return total
+
+def expression(query):
+    """
+    The function turns the text typed by a user into an FTS5 query where every word must appear, as a
+    whole word or as a prefix. Quoting the words keeps the FTS5 syntax out of the reach of the user.
+
+    :param query: The query parameter is the text typed by the user
+    :return: the FTS5 query, which is empty if the text has no words.
+    """
+    return ' '.join('"%s"*' % word for word in re.findall(r'\w+', query))
+
+def search(model, query, cursor=None, size=None):
+    """
+    The function searches the posts or offers matching a query, best matches first, with keyset
+    pagination on the rank and the id of the results.
+
+    :param model: The model parameter is either Post or Offer
+    :param query: The query parameter is the text typed by the user
+    :param cursor: The cursor parameter is the string returned as `next` by the previous page, or None
+    for the first page
+    :param size: The size parameter is the number of results per page. It defaults to the `PAGE_SIZE`
+    setting
+    :return: a tuple with the list of ids of the page, in order, and the cursor of the next page, which
+    is None when there are no more results. Without FTS5 the same fields are matched with LIKE and the
+    results are paginated newest first.
+    """
+    size = size or settings.PAGE_SIZE
+    match = expression(query)
+    if not match:
+        return [], None
+    table, columns = TABLES[model]
+    if not supported():
+        matches = reduce(or_, [Q(**{column + '__icontains': query}) for column in columns])
+        items, cursor = paginate(model.objects.filter(matches, is_delete=False).only('id', 'timestamp'),
+            cursor, size)
+        return [item.pk for item in items], cursor
+    sql = f'SELECT rowid, rank FROM {table} WHERE {table} MATCH %s'
+    params = [match]
+    if cursor:
+        try:
+            rank, pk = cursor.split('_')
+            params += [float(rank), float(rank), int(pk)]
+            sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+        except ValueError:
+            pass
+    sql += ' ORDER BY rank, rowid LIMIT %s'
+    params.append(size + 1)
+    with connection.cursor() as db:
+        db.execute(sql, params)
+        rows = db.fetchall()
+    if len(rows) > size:
+        rows = rows[:size]
+        return [pk for pk, rank in rows], f'{rows[-1][1]!r}_{rows[-1][0]}'
+    return [pk for pk, rank in rows], None
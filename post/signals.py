@@ -0,0 +1,39 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Post, Offer
+from . import search, comments, conditional, timeline
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Offer)
+def index_content(sender, instance, **kwargs):
+    search.index(instance)
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Offer)
+def unindex_content(sender, instance, **kwargs):
+    search.unindex(instance)
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def count_comments(sender, instance, **kwargs):
+    if instance.comment_id:
+        comments.recount(instance.comment_id)
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Offer)
+def forget_deleted(sender, instance, **kwargs):
+    if instance.is_delete:
+        timeline.forget(instance)
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Offer)
+def advance_latest(sender, instance, created, **kwargs):
+    if instance.is_delete:
+        conditional.reset(sender)
+    elif created:
+        conditional.advance(instance)
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Offer)
+def reset_latest(sender, instance, **kwargs):
+    conditional.reset(sender)
@@ -1,3 +1,861 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache, caches
+from django.db import IntegrityError, connection, transaction
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from app.models import Profile, Relationship
+from .models import Post, Offer, Fanout, Timeline, Topic, TopicCount
+from .pagination import encode_cursor, decode_cursor, paginate
+from .comments import thread
+from .views import toggle_like
+from . import conditional, search, timeline, fanout, trending, topics as topic_index
 
-# Create your tests here.
+# The files uploaded by the tests are written here
+MEDIA_ROOT = tempfile.mkdtemp()
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+# The PaginationTests class checks the keyset cursors of the timelines and the pages they select.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PaginationTests(TestCase):
+    def setUp(self):
+        """
+        This function creates an author with posts that share timestamps, so the pages have to be told
+        apart by the id of the posts.
+        """
+        self.user = User.objects.create_user('author', 'author@udg.mx', 'password')
+        now = timezone.now().replace(microsecond=123456)
+        self.posts = [
+            Post.objects.create(user=self.user, content=f'post {i}', timestamp=now - timedelta(seconds=i // 2))
+            for i in range(7)
+        ]
+
+    def test_cursor_round_trip(self):
+        """
+        This function checks that a cursor decodes to the exact timestamp and id it was made from.
+        """
+        post = self.posts[3]
+        self.assertEqual(decode_cursor(encode_cursor(post)), (post.timestamp, post.pk))
+
+    def test_invalid_cursor(self):
+        """
+        This function checks that empty and malformed cursors select the first page.
+        """
+        for cursor in [None, '', 'abc', '1.2.3', '12.x', '9' * 40 + '.1']:
+            self.assertIsNone(decode_cursor(cursor))
+
+    def test_pages_cover_timeline_once(self):
+        """
+        This function checks that following the cursors lists every post once, newest first, and that
+        the last page has no cursor.
+        """
+        seen, cursor = [], None
+        while True:
+            items, cursor = paginate(Post.objects.all(), cursor, size=3)
+            seen += items
+            if cursor is None:
+                break
+        expected = sorted(self.posts, key=lambda post: (post.timestamp, post.pk), reverse=True)
+        self.assertEqual([post.pk for post in seen], [post.pk for post in expected])
+
+    def test_exact_last_page(self):
+        """
+        This function checks that a page that ends the timeline has no cursor, so clients do not ask
+        for an empty page.
+        """
+        items, cursor = paginate(Post.objects.all(), None, size=7)
+        self.assertEqual(len(items), 7)
+        self.assertIsNone(cursor)
+
+    def plan(self, queryset, cursor):
+        """
+        This function reads the query plan of a page of a timeline.
+
+        :param queryset: The queryset parameter is the timeline paginated
+        :param cursor: The cursor parameter is the cursor of the page, None for the first page
+        :return: the query plan of the statement that selects the page, as a single string.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            paginate(queryset, cursor, size=3)
+        with connection.cursor() as db:
+            db.execute('EXPLAIN QUERY PLAN ' + queries[0]['sql'])
+            return '\n'.join(row[-1] for row in db.fetchall())
+
+    def test_index_plan(self):
+        """
+        This function checks that the pages of the timelines and of the profiles are read in order from
+        the partial indexes, without sorting the items, and that the next pages seek into the index.
+        """
+        cursor = encode_cursor(self.posts[3])
+        timelines = [
+            (Post.objects.timeline(self.user), 'post_timeline_idx'),
+            (self.user.posts.timeline(self.user), 'post_author_idx'),
+            (Offer.objects.timeline(self.user), 'offer_timeline_idx'),
+            (self.user.offers.timeline(self.user), 'offer_author_idx'),
+        ]
+        for queryset, index in timelines:
+            for page in [None, cursor]:
+                plan = self.plan(queryset, page)
+                self.assertIn(index, plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+        self.assertIn('(timestamp<?)', self.plan(Post.objects.timeline(self.user), cursor))
+
+# The SearchTests class checks the full-text search of posts and offers and its pagination, with and
+# without the FTS5 tables.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class SearchTests(TestCase):
+    def setUp(self):
+        """
+        This function creates posts and offers, some of them matching the searches.
+        """
+        self.user = User.objects.create_user('seller', 'seller@udg.mx', 'password')
+        self.posts = [
+            Post.objects.create(user=self.user, content=f'selling a guitar, number {i}') for i in range(5)
+        ]
+        Post.objects.create(user=self.user, content='nothing to see here')
+        Offer.objects.create(user=self.user, head='Guitar lessons', content='Every weekend')
+        Offer.objects.create(user=self.user, head='Piano', content='Bring your own guitar')
+        Offer.objects.create(user=self.user, head='Drums', content='Loud')
+
+    def collect(self, model, query, size):
+        """
+        This function follows the cursors of a search until the last page.
+
+        :param model: The model parameter is either Post or Offer
+        :param query: The query parameter is the text searched
+        :param size: The size parameter is the number of results per page
+        :return: a list with the ids of every result, in order.
+        """
+        ids, cursor = search.search(model, query, size=size)
+        while cursor:
+            page, cursor = search.search(model, query, cursor, size=size)
+            ids += page
+        return ids
+
+    def test_pages(self):
+        """
+        This function checks that the pages of a search list every match once.
+        """
+        ids = self.collect(Post, 'guit', 2)
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), {post.pk for post in self.posts})
+
+    def test_deleted(self):
+        """
+        This function checks that deleted posts leave the results.
+        """
+        self.posts[0].is_delete = True
+        self.posts[0].save()
+        self.assertNotIn(self.posts[0].pk, self.collect(Post, 'guitar', 10))
+
+    def test_offer_head(self):
+        """
+        This function checks that offers match on their head as well as on their content.
+        """
+        self.assertEqual(len(self.collect(Offer, 'guitar', 1)), 2)
+
+    def test_empty_query(self):
+        """
+        This function checks that a query without words returns nothing.
+        """
+        self.assertEqual(search.search(Post, '"*()'), ([], None))
+
+    def test_fallback(self):
+        """
+        This function checks that without FTS5 the same fields are matched and the pages still cover
+        every result.
+        """
+        with mock.patch.object(search, 'supported', return_value=False):
+            self.assertEqual(set(self.collect(Post, 'guitar', 2)), {post.pk for post in self.posts})
+            self.assertEqual(len(self.collect(Offer, 'guitar', 1)), 2)
+
+# The CommentTests class checks the loading of comment threads with the recursive query and the
+# denormalized number of comments of the posts.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class CommentTests(TestCase):
+    def setUp(self):
+        """
+        This function creates a post with two comments, a reply to the first one and a reply to that
+        reply.
+        """
+        self.user = User.objects.create_user('writer', 'writer@udg.mx', 'password')
+        self.reader = User.objects.create_user('reader', 'reader@udg.mx', 'password')
+        now = timezone.now()
+        self.post = Post.objects.create(user=self.user, content='post')
+        self.first = Post.objects.create(user=self.user, content='first', comment=self.post,
+            timestamp=now - timedelta(minutes=2))
+        self.second = Post.objects.create(user=self.user, content='second', comment=self.post,
+            timestamp=now - timedelta(minutes=1))
+        self.reply = Post.objects.create(user=self.user, content='reply', comment=self.first)
+        self.nested = Post.objects.create(user=self.user, content='nested', comment=self.reply)
+
+    def test_order(self):
+        """
+        This function checks that the comments come newest first at every level, each reply after the
+        comment it answers, with its depth.
+        """
+        comments = thread(self.post, self.reader)
+        self.assertEqual([comment.pk for comment in comments],
+            [self.second.pk, self.first.pk, self.reply.pk, self.nested.pk])
+        self.assertEqual([comment.depth for comment in comments], [1, 1, 2, 3])
+
+    def test_single_query(self):
+        """
+        This function checks that the whole thread is loaded in one query, besides the topics.
+        """
+        with self.assertNumQueries(2):
+            comments = thread(self.post, self.reader)
+            for comment in comments:
+                self.assertEqual(comment.user.profile.user_id, self.user.pk)
+                self.assertEqual(list(comment.topics.all()), [])
+
+    def test_depth_limit(self):
+        """
+        This function checks that the replies deeper than `COMMENT_DEPTH` are left out.
+        """
+        with self.settings(COMMENT_DEPTH=2):
+            self.assertNotIn(self.nested.pk, [comment.pk for comment in thread(self.post, self.reader)])
+
+    def test_deleted(self):
+        """
+        This function checks that a deleted comment hides its replies and leaves the count of its post.
+        """
+        self.first.is_delete = True
+        self.first.save()
+        self.assertEqual([comment.pk for comment in thread(self.post, self.reader)], [self.second.pk])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_count(self):
+        """
+        This function checks that the number of direct comments of a post is kept on the post.
+        """
+        self.post.refresh_from_db()
+        self.first.refresh_from_db()
+        self.assertEqual((self.post.comment_count, self.first.comment_count), (2, 1))
+        self.second.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+# The BlockTests class checks that the content of the users who blocked the viewer, or whom the viewer
+# blocked, is left out of the timelines and the comment threads by the queries. The pages are rendered
+# without the manifest of collectstatic.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT,
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class BlockTests(TestCase):
+    def setUp(self):
+        """
+        This function creates a viewer who blocked a troll and was blocked by a stranger, and a post of
+        every user with a comment of the troll.
+        """
+        self.viewer = User.objects.create_user('viewer', 'viewer@udg.mx', 'password')
+        troll = User.objects.create_user('troll', 'troll@udg.mx', 'password')
+        stranger = User.objects.create_user('stranger', 'stranger@udg.mx', 'password')
+        friend = User.objects.create_user('friend', 'friend@udg.mx', 'password')
+        Relationship.objects.create(from_user=self.viewer, to_user=troll, is_block=True)
+        Relationship.objects.create(from_user=stranger, to_user=self.viewer, is_block=True)
+        self.posts = {user.username: Post.objects.create(user=user, content=f'by {user.username}')
+            for user in [self.viewer, troll, stranger, friend]}
+        self.comment = Post.objects.create(user=troll, content='comment', comment=self.posts['friend'])
+
+    def test_timeline(self):
+        """
+        This function checks that the viewer sees neither the troll nor the stranger, while anonymous
+        users see everyone.
+        """
+        visible = Post.objects.filter(comment=None).timeline(self.viewer)
+        self.assertEqual({post.user.username for post in visible}, {'viewer', 'friend'})
+        self.assertEqual(Post.objects.filter(comment=None).timeline(AnonymousUser()).count(), 4)
+
+    def test_thread(self):
+        """
+        This function checks that the comments of the troll are left out of the threads the viewer
+        reads.
+        """
+        self.assertEqual(thread(self.posts['friend'], self.viewer), [])
+        self.assertEqual([comment.pk for comment in thread(self.posts['friend'], AnonymousUser())],
+            [self.comment.pk])
+
+    def test_page(self):
+        """
+        This function checks that the social page of the viewer lists no blocked content.
+        """
+        self.client.force_login(self.viewer)
+        response = self.client.get(reverse('post:social'))
+        authors = {post.user.username for post in response.context['posts']}
+        self.assertEqual(authors, {'viewer', 'friend'})
+        self.assertNotContains(response, 'by troll')
+        self.assertNotContains(response, 'by stranger')
+
+# The ConditionalTests class checks the entity tags of the timeline pages, which change with the cards
+# of the page and with the session of the viewer only. The pages are rendered without the manifest of
+# collectstatic.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT,
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ConditionalTests(TestCase):
+    def setUp(self):
+        """
+        This function signs in a user through the login page, so the session gets its CSRF cookie, and
+        creates a post.
+        """
+        self.user = User.objects.create_user('reader', 'reader@udg.mx', 'password')
+        self.other = User.objects.create_user('other', 'other@udg.mx', 'password')
+        self.post = Post.objects.create(user=self.other, content='post')
+        self.login()
+
+    def login(self):
+        """
+        This function signs the user in through the login page.
+        """
+        self.client.post(reverse('login'), {'username': 'reader', 'password': 'password'})
+
+    def revalidate(self, url, tag):
+        """
+        This function asks for a page again with the entity tag of an earlier response.
+
+        :param url: The url parameter is the URL of the page
+        :param tag: The tag parameter is the entity tag of the earlier response
+        :return: the status code of the response.
+        """
+        return self.client.get(url, HTTP_IF_NONE_MATCH=tag).status_code
+
+    def test_not_modified(self):
+        """
+        This function checks that an unchanged page is answered with 304 Not Modified.
+        """
+        url = reverse('post:social')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.revalidate(url, response['ETag']), 304)
+
+    def test_new_session(self):
+        """
+        This function checks that a page cached during an older session is rendered again, so its
+        forms carry the CSRF token of the current session.
+        """
+        url = reverse('post:social')
+        tag = self.client.get(url)['ETag']
+        self.client.post(reverse('logout'))
+        self.login()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], tag)
+
+    def test_cards(self):
+        """
+        This function checks that liking or commenting an item of the page changes its entity tag.
+        """
+        url = reverse('post:social')
+        tag = self.client.get(url)['ETag']
+        self.client.get(reverse('post:like', args=[self.post.pk]))
+        self.assertEqual(self.revalidate(url, tag), 200)
+        tag = self.client.get(url)['ETag']
+        Post.objects.create(user=self.other, content='comment', comment=self.post)
+        self.assertEqual(self.revalidate(url, tag), 200)
+
+    def test_other_pages(self):
+        """
+        This function checks that new content elsewhere on the site leaves the entity tag of a page
+        whose cards have not changed.
+        """
+        url = reverse('profile', args=['other'])
+        tag = self.client.get(url)['ETag']
+        Post.objects.create(user=self.user, content='elsewhere')
+        Offer.objects.create(user=self.user, head='Head', content='elsewhere')
+        self.assertEqual(self.revalidate(url, tag), 304)
+
+# The TimelineTests class checks the home timelines fanned out on write, the accounts pulled at read
+# time, the cap of the timelines and the index their pages are read from.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, FANOUT_LIMIT=1)
+class TimelineTests(TestCase):
+    def setUp(self):
+        """
+        This function creates a reader who follows an author, and a celebrity followed by the reader and
+        by a fan, whose content is pulled because it has more followers than `FANOUT_LIMIT`.
+        """
+        self.reader = User.objects.create_user('reader', 'reader@udg.mx', 'password')
+        self.author = User.objects.create_user('author', 'author@udg.mx', 'password')
+        self.celebrity = User.objects.create_user('celebrity', 'celebrity@udg.mx', 'password')
+        self.stranger = User.objects.create_user('stranger', 'stranger@udg.mx', 'password')
+        fan = User.objects.create_user('fan', 'fan@udg.mx', 'password')
+        follows = [(self.reader, self.author), (self.reader, self.celebrity), (fan, self.celebrity)]
+        for user, author in follows:
+            Relationship.objects.create(from_user=user, to_user=author, is_follow=True)
+
+    def publish(self, user, content, minutes):
+        """
+        This function creates a post and delivers it to the followers of its author.
+
+        :param user: The user parameter is the author of the post
+        :param content: The content parameter is the text of the post
+        :param minutes: The minutes parameter is the age of the post
+        :return: the Post created.
+        """
+        post = Post.objects.create(user=user, content=content,
+            timestamp=timezone.now() - timedelta(minutes=minutes))
+        fanout.enqueue(post)
+        fanout.work()
+        return post
+
+    def collect(self, size):
+        """
+        This function follows the cursors of the home timeline of the reader until the last page.
+
+        :param size: The size parameter is the number of items per page
+        :return: a list with the ids of every item, in order.
+        """
+        ids, cursor = timeline.home(self.reader, Post, None, size)
+        while cursor:
+            page, cursor = timeline.home(self.reader, Post, cursor, size)
+            ids += page
+        return ids
+
+    def test_merge(self):
+        """
+        This function checks that the home timeline merges the posts fanned out to the reader and the
+        posts pulled from the celebrity, newest first, and leaves out the accounts not followed.
+        """
+        posts = [
+            self.publish(self.author, 'first', 5),
+            self.publish(self.celebrity, 'second', 4),
+            self.publish(self.stranger, 'third', 3),
+            self.publish(self.author, 'fourth', 2),
+            self.publish(self.celebrity, 'fifth', 1),
+        ]
+        pushed = Timeline.objects.filter(author=self.celebrity).exclude(user=self.celebrity)
+        self.assertFalse(pushed.exists())
+        expected = [posts[4].pk, posts[3].pk, posts[1].pk, posts[0].pk]
+        for size in [1, 2, 3, 10]:
+            self.assertEqual(self.collect(size), expected)
+
+    def test_follow(self):
+        """
+        This function checks that following an account copies its latest posts to the home timeline,
+        that unfollowing removes them, and that deleted posts leave the timeline.
+        """
+        post = Post.objects.create(user=self.stranger, content='before')
+        timeline.follow(self.reader, self.stranger)
+        self.assertEqual(self.collect(10), [post.pk])
+        timeline.unfollow(self.reader, self.stranger)
+        self.assertEqual(self.collect(10), [])
+        post = self.publish(self.author, 'deleted', 1)
+        post.is_delete = True
+        post.save()
+        self.assertFalse(Timeline.objects.filter(post=post).exists())
+
+    @override_settings(FANOUT_MAX_ATTEMPTS=2)
+    def test_dead(self):
+        """
+        This function checks that a failing job is tried again once its lock is stale, and given up on
+        after `FANOUT_MAX_ATTEMPTS` failures.
+        """
+        post = Post.objects.create(user=self.author, content='failing')
+        fanout.enqueue(post)
+        with mock.patch.object(fanout, 'step', side_effect=OSError('Database is locked')):
+            self.assertEqual(fanout.work(), (0, 0, 1, 0))
+            self.assertEqual(fanout.work(), (0, 0, 0, 0))
+            Fanout.objects.update(locked=timezone.now() - timedelta(days=1))
+            self.assertEqual(fanout.work(), (0, 0, 1, 1))
+        Fanout.objects.update(locked=None)
+        self.assertIsNone(fanout.claim())
+        self.assertEqual(Fanout.objects.get().attempts, 2)
+
+    @override_settings(TIMELINE_SIZE=3)
+    def test_trim(self):
+        """
+        This function checks that the home timelines are capped to the `TIMELINE_SIZE` newest entries.
+        """
+        posts = [self.publish(self.author, str(i), 10 - i) for i in range(5)]
+        entries = Timeline.objects.filter(user=self.reader).order_by('-timestamp')
+        self.assertEqual([entry.post_id for entry in entries], [post.pk for post in posts[:1:-1]])
+
+    def test_index_plan(self):
+        """
+        This function checks that the entries of a page are read in order from the partial index of
+        the timelines, without sorting them.
+        """
+        post = self.publish(self.author, 'post', 1)
+        queryset, key = timeline.entries(self.reader, Post)
+        queryset = queryset.filter(timestamp__lte=post.timestamp).order_by('-timestamp', '-' + key)
+        plan = queryset[:21].explain()
+        self.assertIn('timeline_post_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+# The CardTests class checks that every page renders the cards of posts and offers from the shared
+# partials, so the content of an item is cached once whichever page shows it. The pages are rendered
+# without the manifest of collectstatic.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT,
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class CardTests(TestCase):
+    def setUp(self):
+        """
+        This function creates a business with a post and an offer on the same topic, and empties the
+        cache of the cards.
+        """
+        self.user = User.objects.create_user('business', 'business@udg.mx', 'password')
+        Profile.objects.filter(user=self.user).update(business=True)
+        self.post = Post.objects.create(user=self.user, content='post about http://udg.mx')
+        self.offer = Offer.objects.create(user=self.user, head='Head', content='offer')
+        topic = Topic.objects.create(name='guitar')
+        self.post.topics.add(topic)
+        self.offer.topics.add(topic)
+        self.cards = caches['cards']
+        self.cards.clear()
+
+    def test_shared(self):
+        """
+        This function checks that the timelines, the topics, the profiles and the search share the
+        fragments of the cards, and that the pages of the items add only their larger image.
+        """
+        pages = [
+            reverse('post:social'), reverse('post:topic', args=['guitar']),
+            reverse('profile', args=['business']), reverse('post:search') + '?q=post',
+            reverse('post:feed'), reverse('post:otopic', args=['guitar']),
+            reverse('bus', args=['business']), reverse('post:search') + '?q=offer&kind=offers',
+        ]
+        for url in pages:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.cards._cache), 4)
+        self.client.get(reverse('post:post', args=[self.post.pk]))
+        self.client.get(reverse('post:offer', args=[self.offer.pk]))
+        self.assertEqual(len(self.cards._cache), 6)
+
+    def test_version(self):
+        """
+        This function checks that editing an item renders its card again.
+        """
+        url = reverse('post:social')
+        self.client.get(url)
+        self.post.content = 'edited'
+        self.post.save()
+        self.assertContains(self.client.get(url), 'edited')
+
+# The LikeTests class checks the number of likes kept on the posts and the offers as they are liked and
+# unliked.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class LikeTests(TestCase):
+    def setUp(self):
+        """
+        This function creates a post and an offer, and a user who likes them.
+        """
+        self.user = User.objects.create_user('fan', 'fan@udg.mx', 'password')
+        self.post = Post.objects.create(user=self.user, content='post')
+        self.offer = Offer.objects.create(user=self.user, head='Head', content='offer')
+
+    def count(self, item):
+        """
+        This function reads the number of likes of an item.
+
+        :param item: The item parameter is the Post or Offer whose likes are read
+        :return: a tuple with the counter of the item and the number of rows of its likes.
+        """
+        return type(item).objects.get(pk=item.pk).like_count, item.likes.count()
+
+    def test_toggle(self):
+        """
+        This function checks that liking an item again unlikes it, keeping the counter in sync.
+        """
+        for item in [self.post, self.offer]:
+            toggle_like(item, self.user)
+            self.assertEqual(self.count(item), (1, 1))
+            toggle_like(item, self.user)
+            self.assertEqual(self.count(item), (0, 0))
+
+    def test_concurrent(self):
+        """
+        This function checks that a like inserted by another request between the look up and the insert
+        of this one is not counted twice.
+        """
+        toggle_like(self.post, self.user)
+        with mock.patch.object(QuerySet, 'delete', return_value=(0, {})):
+            toggle_like(self.post, self.user)
+        self.assertEqual(self.count(self.post), (1, 1))
+
+# The TopicTests class checks that the topics typed with a post are normalized and resolved in bulk,
+# with the ids of the hot topics cached by the process.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TopicTests(TestCase):
+    def setUp(self):
+        """
+        This function creates a post and empties the cache of the topics.
+        """
+        self.user = User.objects.create_user('writer', 'writer@udg.mx', 'password')
+        self.post = Post.objects.create(user=self.user, content='post')
+        topic_index.cache.clear()
+        self.addCleanup(topic_index.cache.clear)
+
+    def test_normalize(self):
+        """
+        This function checks that the same topic typed differently has one name.
+        """
+        self.assertEqual({topic_index.normalize(word) for word in ['#Python,', 'python', 'PYTHON!']},
+            {'python'})
+        self.assertEqual(topic_index.resolve(['#!', '']), [])
+
+    def test_bulk(self):
+        """
+        This function checks that ten topics cost one insert, one select and one insert of the links,
+        and that the cached topics are not looked up again.
+        """
+        words = [f'#Topic{i}' for i in range(10)] + ['topic0']
+        with self.assertNumQueries(3):
+            ids = topic_index.attach(self.post, words)
+        self.assertEqual(len(ids), 10)
+        self.assertEqual(self.post.topics.count(), 10)
+        other = Post.objects.create(user=self.user, content='other')
+        with self.assertNumQueries(1):
+            self.assertEqual(topic_index.attach(other, words), ids)
+
+    def test_unique(self):
+        """
+        This function checks that the names of the topics are unique in the database, so topics created
+        at the same time by two processes are not duplicated.
+        """
+        topic_index.resolve(['guitar'])
+        topic_index.cache.clear()
+        topic_index.resolve(['Guitar'])
+        self.assertEqual(Topic.objects.filter(name='guitar').count(), 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Topic.objects.create(name='guitar')
+
+# The TrendingTests class checks the counters of the topics in time buckets and the decayed scores the
+# trending topics are ranked by.
+@override_settings(TRENDING_BUCKET=3600, TRENDING_WINDOW=48 * 3600, TRENDING_HALF_LIFE=3600,
+    TRENDING_SIZE=2)
+class TrendingTests(TestCase):
+    def setUp(self):
+        """
+        This function creates the topics counted and empties the cached list.
+        """
+        self.topics = [Topic.objects.create(name=name) for name in ['old', 'new', 'quiet']]
+        cache.delete(trending.CACHE_KEY)
+        self.addCleanup(cache.delete, trending.CACHE_KEY)
+
+    def test_record(self):
+        """
+        This function checks that the uses of a topic during a bucket add up in a single counter.
+        """
+        ids = [topic.pk for topic in self.topics[:2]]
+        with self.assertNumQueries(1):
+            trending.record(ids)
+        trending.record(ids[:1])
+        counts = dict(TopicCount.objects.values_list('topic__name', 'count'))
+        self.assertEqual(counts, {'old': 2, 'new': 1})
+
+    def test_decay(self):
+        """
+        This function checks that recent uses outrank a larger number of older uses, that the list is
+        cached and that the counters out of the window are pruned.
+        """
+        old, new, quiet = self.topics
+        now = trending.bucket(timezone.now())
+        TopicCount.objects.create(topic=old, bucket=now - timedelta(hours=5), count=20)
+        TopicCount.objects.create(topic=new, bucket=now, count=5)
+        TopicCount.objects.create(topic=quiet, bucket=now - timedelta(hours=1), count=1)
+        TopicCount.objects.create(topic=quiet, bucket=now - timedelta(days=3), count=100)
+        self.assertEqual([topic.name for topic in trending.trending()], ['new', 'old'])
+        TopicCount.objects.all().delete()
+        with self.assertNumQueries(0):
+            self.assertEqual([topic.name for topic in trending.trending()], ['new', 'old'])
+        self.assertEqual(trending.refresh(), [])
+        TopicCount.objects.create(topic=quiet, bucket=now - timedelta(days=3), count=100)
+        self.assertEqual(trending.prune(), 1)
+
+# The QueryTests class checks that the pages of cards cost the same number of queries whatever the
+# number of cards. The pages are rendered without the manifest of collectstatic.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT,
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class QueryTests(TestCase):
+    def setUp(self):
+        """
+        This function creates a business and a reader, logged in, who has visited the site once, so every
+        page counted is sent with the CSRF cookie and finds the trending topics cached.
+        """
+        self.user = User.objects.create_user('business', 'business@udg.mx', 'password')
+        self.reader = User.objects.create_user('reader', 'reader@udg.mx', 'password')
+        Profile.objects.filter(user=self.user).update(business=True)
+        self.topic = Topic.objects.create(name='guitar')
+        self.client.force_login(self.reader)
+        self.client.get(reverse('post:social'))
+
+    def publish(self, count):
+        """
+        This function creates posts and offers with a topic, liked and commented.
+
+        :param count: The count parameter is the number of posts and of offers created
+        """
+        for i in range(count):
+            post = Post.objects.create(user=self.user, content=f'post {i}')
+            offer = Offer.objects.create(user=self.user, head='Head', content=f'offer {i}')
+            post.topics.add(self.topic)
+            offer.topics.add(self.topic)
+            toggle_like(post, self.reader)
+            toggle_like(offer, self.reader)
+            Post.objects.create(user=self.reader, content='comment', comment=post)
+
+    def queries(self, url):
+        """
+        This function counts the queries of a page rendered with an empty cache of cards.
+
+        :param url: The url parameter is the URL of the page
+        :return: the number of queries run.
+        """
+        caches['cards'].clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_constant(self):
+        """
+        This function checks that ten times more cards cost no more queries on any page of cards.
+        """
+        pages = [
+            reverse('post:social'), reverse('post:feed'), reverse('post:topic', args=['guitar']),
+            reverse('post:otopic', args=['guitar']), reverse('profile', args=['business']),
+            reverse('bus', args=['business']),
+        ]
+        self.publish(1)
+        few = [self.queries(url) for url in pages]
+        self.publish(9)
+        self.assertEqual([self.queries(url) for url in pages], few)
+
+# The ApiTests class checks the JSON pages of the timelines, their cursors and their sparse fields.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PAGE_SIZE=2)
+class ApiTests(TestCase):
+    def setUp(self):
+        """
+        This function creates posts and an offer on a topic, some of them liked by the reader, who is
+        logged in.
+        """
+        self.user = User.objects.create_user('author', 'author@udg.mx', 'password')
+        self.reader = User.objects.create_user('reader', 'reader@udg.mx', 'password')
+        now = timezone.now()
+        self.posts = [Post.objects.create(user=self.user, content=f'post {i}',
+            timestamp=now - timedelta(minutes=i)) for i in range(5)]
+        topic = Topic.objects.create(name='guitar')
+        self.posts[0].topics.add(topic)
+        self.offer = Offer.objects.create(user=self.user, head='Head', content='offer')
+        self.offer.topics.add(topic)
+        toggle_like(self.posts[0], self.reader)
+        self.client.force_login(self.reader)
+
+    def collect(self, url, **params):
+        """
+        This function follows the cursors of a JSON timeline until the last page.
+
+        :param url: The url parameter is the URL of the endpoint
+        :return: a list with the cards of every page.
+        """
+        results, cursor = [], None
+        while True:
+            data = self.client.get(url, {**params, **({'cursor': cursor} if cursor else {})}).json()
+            results += data['results']
+            cursor = data['next']
+            if not cursor:
+                return results
+
+    def test_pages(self):
+        """
+        This function checks that the pages of the social timeline list every post once, newest first,
+        with the fields of the cards.
+        """
+        results = self.collect(reverse('post:api_social'))
+        self.assertEqual([result['id'] for result in results], [post.pk for post in self.posts])
+        first = results[0]
+        self.assertEqual((first['text'], first['likes'], first['liked_by_me'], first['comments']),
+            ('post 0', 1, True, 0))
+        self.assertEqual(first['author']['username'], 'author')
+        self.assertEqual([topic['name'] for topic in first['topics']], ['guitar'])
+        self.assertFalse(results[1]['liked_by_me'])
+
+    def test_fields(self):
+        """
+        This function checks that only the fields asked for are sent, besides the id.
+        """
+        results = self.collect(reverse('post:api_social'), fields='text')
+        self.assertEqual(set(results[0]), {'id', 'text'})
+
+    def test_timelines(self):
+        """
+        This function checks the timelines of the offers, of the topics and of the profiles.
+        """
+        offers = self.collect(reverse('post:api_feed'))
+        self.assertEqual([(offer['id'], offer['head']) for offer in offers], [(self.offer.pk, 'Head')])
+        tagged = self.collect(reverse('post:api_topic', args=['guitar']))
+        self.assertEqual([post['id'] for post in tagged], [self.posts[0].pk])
+        self.assertEqual(len(self.collect(reverse('post:api_otopic', args=['guitar']))), 1)
+        self.assertEqual(len(self.collect(reverse('post:api_profile', args=['author']))), 5)
+        self.assertEqual(self.client.get(reverse('post:api_profile', args=['nobody'])).status_code, 404)
+
+# The PollTests class checks the endpoints that tell polling clients how many items are newer than the
+# newest one they have.
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, POLL_LIMIT=2)
+class PollTests(TestCase):
+    def setUp(self):
+        """
+        This function creates a post, as the newest item the clients have, and forgets the cached
+        newest post.
+        """
+        self.user = User.objects.create_user('author', 'author@udg.mx', 'password')
+        self.post = Post.objects.create(user=self.user, content='seen',
+            timestamp=timezone.now() - timedelta(minutes=10))
+        self.since = encode_cursor(self.post)
+        conditional.reset(Post)
+        self.addCleanup(conditional.reset, Post)
+
+    def poll(self, **params):
+        """
+        This function asks for the number of posts newer than the post of the test.
+
+        :return: the decoded JSON response.
+        """
+        return self.client.get(reverse('post:api_social_new'), {'since': self.since, **params}).json()
+
+    def test_up_to_date(self):
+        """
+        This function checks that a client up to date is answered from the cache, without any query.
+        """
+        self.assertEqual(self.poll()['count'], 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.poll()['count'], 0)
+
+    def test_new(self):
+        """
+        This function checks that new posts are counted up to `POLL_LIMIT`, newest first, and that
+        deleted posts and the posts of blocked users are left out.
+        """
+        self.poll()
+        posts = [Post.objects.create(user=self.user, content=f'new {i}',
+            timestamp=timezone.now() - timedelta(minutes=5 - i)) for i in range(3)]
+        data = self.poll()
+        self.assertEqual((data['count'], data['ids']), (2, [posts[2].pk, posts[1].pk]))
+        posts[2].is_delete = True
+        posts[2].save()
+        self.assertEqual(self.poll()['ids'], [posts[1].pk, posts[0].pk])
+        reader = User.objects.create_user('reader', 'reader@udg.mx', 'password')
+        Relationship.objects.create(from_user=reader, to_user=self.user, is_block=True)
+        self.client.force_login(reader)
+        self.assertEqual(self.poll()['count'], 0)
+
+    def test_following(self):
+        """
+        This function checks that the home timeline counts the new posts of the users followed only.
+        """
+        reader = User.objects.create_user('reader', 'reader@udg.mx', 'password')
+        other = User.objects.create_user('other', 'other@udg.mx', 'password')
+        Relationship.objects.create(from_user=reader, to_user=self.user, is_follow=True)
+        for user in [self.user, other]:
+            fanout.enqueue(Post.objects.create(user=user, content='new'))
+        fanout.work()
+        self.client.force_login(reader)
+        self.assertEqual(self.poll(following='')['count'], 1)
+        self.assertEqual(self.poll()['count'], 2)
@@ -0,0 +1,173 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from app.models import Profile, Relationship
+from .models import Post, Timeline
+from .pagination import paginate, encode_position
+
+def pushed(author):
+    """
+    The function checks whether the content of an author is fanned out on write, reading the follower
+    count kept on the profile of the author instead of counting the followers.
+
+    :param author: The author parameter is the User who created the post or offer
+    :return: False if the author has more followers than the `FANOUT_LIMIT` setting, in which case the
+    content of the author is pulled at read time, True otherwise.
+    """
+    return not Profile.objects.filter(user=author, follower_count__gt=settings.FANOUT_LIMIT).exists()
+
+def pulled(user):
+    """
+    The function returns the followed accounts of a user whose content is not fanned out on write.
+
+    :param user: The user parameter is the User whose home timeline is being read
+    :return: a list with the ids of the accounts followed by the user whose follower count is above
+    the `FANOUT_LIMIT` setting.
+    """
+    return list(Relationship.objects.filter(from_user=user, is_follow=True,
+        to_user__profile__follower_count__gt=settings.FANOUT_LIMIT).values_list('to_user', flat=True))
+
+def entries(user, model):
+    """
+    The function returns the entries of the home timeline of a user for one kind of content, which are
+    read in order from the partial index of that kind.
+
+    :param user: The user parameter is the User whose home timeline is being read
+    :param model: The model parameter is either Post or Offer
+    :return: a tuple with the queryset of the entries and the name of the column with the id of the
+    item of every entry.
+    """
+    field = 'post' if model is Post else 'offer'
+    return Timeline.objects.filter(user=user, **{field + '__isnull': False}), field + '_id'
+
+def deliver(item, ids):
+    """
+    The function writes a new post or offer to the home timeline of some users.
+
+    :param item: The item parameter is the Post or Offer that has just been saved
+    :param ids: The ids parameter is a list with the ids of the users, which are the author or a chunk
+    of the followers of the author
+    """
+    field = 'post' if isinstance(item, Post) else 'offer'
+    Timeline.objects.bulk_create([
+        Timeline(user_id=pk, author_id=item.user_id, timestamp=item.timestamp, **{field: item})
+        for pk in ids
+    ], batch_size=500)
+    trim(ids)
+
+def follow(user, author):
+    """
+    The function copies the latest posts and offers of an author to the home timeline of a new follower.
+
+    :param user: The user parameter is the User who has just followed the author
+    :param author: The author parameter is the User who has been followed
+    """
+    if not pushed(author):
+        return
+    size = settings.PAGE_SIZE
+    rows = [
+        Timeline(user=user, author=author, timestamp=post.timestamp, post=post)
+        for post in author.posts.filter(is_delete=False, comment=None)[:size]
+    ] + [
+        Timeline(user=user, author=author, timestamp=offer.timestamp, offer=offer)
+        for offer in author.offers.filter(is_delete=False)[:size]
+    ]
+    Timeline.objects.bulk_create(rows)
+    trim([user.pk])
+
+def unfollow(user, author):
+    """
+    The function removes the content of an author from the home timeline of a former follower.
+
+    :param user: The user parameter is the User who has just unfollowed the author
+    :param author: The author parameter is the User who has been unfollowed
+    """
+    Timeline.objects.filter(user=user, author=author).delete()
+
+def trim(ids):
+    """
+    The function caps the home timelines of some users to the `TIMELINE_SIZE` newest entries, with a
+    single statement that ranks the entries of every user over the index of the timelines.
+
+    :param ids: The ids parameter is a list with the ids of the users whose home timelines have just
+    been written to
+    """
+    if not ids:
+        return
+    table = Timeline._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE id IN (SELECT id FROM (SELECT id, ROW_NUMBER() OVER '
+            f'(PARTITION BY user_id ORDER BY timestamp DESC, id DESC) AS position FROM {table} '
+            f'WHERE user_id IN ({", ".join(["%s"] * len(ids))})) WHERE position > %s)',
+            [*ids, settings.TIMELINE_SIZE],
+        )
+
+def home(user, model, cursor, size=None):
+    """
+    The function returns one page of the home timeline of a user. The entries fanned out to the user are
+    read with keyset pagination from the index of the timelines, and the content of the followed
+    accounts with too many followers is read from the index of every author, then both are merged.
+
+    :param user: The user parameter is the User whose home timeline is being read
+    :param model: The model parameter is either Post or Offer, depending on the timeline requested
+    :param cursor: The cursor parameter is the cursor of the page, None for the first page
+    :param size: The size parameter is the number of items per page. It defaults to the `PAGE_SIZE`
+    setting
+    :return: a tuple with the list of the ids of the items of the page, newest first, and the cursor of
+    the next page, which is None when there are no more items.
+    """
+    size = size or settings.PAGE_SIZE
+    queryset, key = entries(user, model)
+    items, more = paginate(queryset.only('timestamp', key), cursor, size, key)
+    positions = {(entry.timestamp, getattr(entry, key)) for entry in items}
+    for author in pulled(user):
+        items, rest = paginate(model.objects.filter(user=author, is_delete=False).only('timestamp'),
+            cursor, size)
+        positions.update((item.timestamp, item.pk) for item in items)
+        more = more or rest
+    positions = sorted(positions, reverse=True)
+    page = positions[:size]
+    if page and (more or len(positions) > size):
+        return [pk for _, pk in page], encode_position(*page[-1])
+    return [pk for _, pk in page], None
+
+def newer(position, key):
+    """
+    The function returns the condition that selects the items newer than a position.
+
+    :param position: The position parameter is a tuple with a timestamp and an id
+    :param key: The key parameter is the field with the id of the item
+    :return: a Q object.
+    """
+    timestamp, pk = position
+    return Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, **{key + '__gt': pk})
+
+def since(user, model, position, limit):
+    """
+    The function returns the items of the home timeline of a user that are newer than a position.
+
+    :param user: The user parameter is the User whose home timeline is being read
+    :param model: The model parameter is either Post or Offer
+    :param position: The position parameter is a tuple with the timestamp and the id of the newest item
+    the client has
+    :param limit: The limit parameter is the maximum number of items returned
+    :return: a list with the ids of the newer items, newest first.
+    """
+    queryset, key = entries(user, model)
+    found = list(queryset.filter(newer(position, key)).order_by('-timestamp', '-' + key)
+        .values_list('timestamp', key)[:limit])
+    for author in pulled(user):
+        found += model.objects.filter(newer(position, 'id'), user=author, is_delete=False)\
+            .order_by('-timestamp', '-id').values_list('timestamp', 'id')[:limit]
+    return [pk for _, pk in sorted(set(found), reverse=True)[:limit]]
+
+def forget(item):
+    """
+    The function removes a deleted post or offer from every home timeline, so the pages of the
+    timelines are not left with holes.
+
+    :param item: The item parameter is the Post or Offer that has just been deleted
+    """
+    field = 'post' if isinstance(item, Post) else 'offer'
+    Timeline.objects.filter(**{field: item}).delete()
@@ -0,0 +1,97 @@
+from collections import OrderedDict
+from threading import Lock
+from django.conf import settings
+from .models import Topic
+
+# The TopicCache class is a small least recently used cache of the ids of the hottest topics, shared
+# by the requests served by the same process.
+class TopicCache:
+    def __init__(self, size):
+        """
+        This function creates an empty cache.
+        :param size: The size parameter is the maximum number of topics kept in the cache
+        """
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = Lock()
+
+    def get_many(self, names):
+        """
+        This function returns the cached ids of some topics and marks them as recently used.
+        :param names: The names parameter is a list of normalized topic names
+        :return: a dictionary with the names found in the cache and their ids.
+        """
+        found = {}
+        with self.lock:
+            for name in names:
+                if name in self.items:
+                    self.items.move_to_end(name)
+                    found[name] = self.items[name]
+        return found
+
+    def set_many(self, ids):
+        """
+        This function stores the ids of some topics, evicting the least recently used ones.
+        :param ids: The ids parameter is a dictionary of normalized topic names and their ids
+        """
+        with self.lock:
+            for name, pk in ids.items():
+                self.items[name] = pk
+                self.items.move_to_end(name)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        """
+        This function empties the cache.
+        """
+        with self.lock:
+            self.items.clear()
+
+cache = TopicCache(settings.TOPIC_CACHE_SIZE)
+
+def normalize(word):
+    """
+    The function normalizes a word into a topic name by keeping only its alphanumeric characters in
+    lowercase.
+
+    :param word: The word parameter is a string typed by the user, such as "#Python,"
+    :return: the normalized name of the topic, which may be empty if the word had no alphanumeric
+    characters.
+    """
+    return ''.join(filter(str.isalnum, word)).lower()[:255]
+
+def resolve(words):
+    """
+    The function returns the ids of the topics named by some words, creating the missing topics. Cached
+    topics cost nothing, and the others are resolved with one insert and one select whatever the number
+    of words.
+
+    :param words: The words parameter is a list of strings typed by the user
+    :return: a list with the ids of the topics, without duplicates, in the order of the words.
+    """
+    names = list(dict.fromkeys(name for name in map(normalize, words) if name))
+    ids = cache.get_many(names)
+    missing = [name for name in names if name not in ids]
+    if missing:
+        Topic.objects.bulk_create([Topic(name=name) for name in missing], ignore_conflicts=True)
+        found = dict(Topic.objects.filter(name__in=missing).values_list('name', 'pk'))
+        cache.set_many(found)
+        ids.update(found)
+    return [ids[name] for name in names if name in ids]
+
+def attach(item, words):
+    """
+    The function adds the topics named by some words to a post or an offer with a single insert into
+    the table that links them.
+
+    :param item: The item parameter is the Post or Offer the topics belong to
+    :param words: The words parameter is a list of strings typed by the user
+    :return: a list with the ids of the topics added to the item.
+    """
+    ids = resolve(words)
+    through = type(item).topics.through
+    field = type(item)._meta.model_name + '_id'
+    through.objects.bulk_create([through(**{field: item.pk}, topic_id=pk) for pk in ids],
+        ignore_conflicts=True)
+    return ids
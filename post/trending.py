@@ -0,0 +1,92 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+from .models import Topic, TopicCount
+
+CACHE_KEY = 'post:trending'
+
+def bucket(moment):
+    """
+    The function returns the start of the time bucket a moment belongs to.
+
+    :param moment: The moment parameter is an aware datetime
+    :return: the moment rounded down to a multiple of the `TRENDING_BUCKET` setting, in seconds.
+    """
+    size = settings.TRENDING_BUCKET
+    return moment - timedelta(seconds=moment.timestamp() % size)
+
+def record(ids):
+    """
+    The function increments the counters of the current bucket of some topics with a single statement
+    that inserts the missing counters and updates the existing ones.
+
+    :param ids: The ids parameter is a list of topic ids that have just been used by a post or an offer
+    """
+    if not ids:
+        return
+    table = TopicCount._meta.db_table
+    start = connection.ops.adapt_datetimefield_value(bucket(timezone.now()))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {table} (topic_id, bucket, count) VALUES (%s, %s, 1) '
+            f'ON CONFLICT (topic_id, bucket) DO UPDATE SET count = {table}.count + 1',
+            [(pk, start) for pk in ids],
+        )
+
+def compute():
+    """
+    The function computes the trending topics from the counters of the current window. Every count is
+    decayed by its age, halving every `TRENDING_HALF_LIFE` seconds, so recent bursts rank higher than
+    old popular topics.
+
+    :return: a list with the `TRENDING_SIZE` topics with the highest score, each with a `score`
+    attribute.
+    """
+    now = timezone.now()
+    start = now - timedelta(seconds=settings.TRENDING_WINDOW)
+    scores = {}
+    counts = TopicCount.objects.filter(bucket__gte=start).values_list('topic_id', 'bucket', 'count')
+    for pk, moment, count in counts.iterator():
+        age = (now - moment).total_seconds()
+        scores[pk] = scores.get(pk, 0) + count * 0.5 ** (age / settings.TRENDING_HALF_LIFE)
+    best = sorted(scores, key=scores.get, reverse=True)[:settings.TRENDING_SIZE]
+    topics = Topic.objects.in_bulk(best)
+    trending = []
+    for pk in best:
+        if pk in topics:
+            topics[pk].score = scores[pk]
+            trending.append(topics[pk])
+    return trending
+
+def refresh():
+    """
+    The function computes the trending topics and stores them in the cache.
+
+    :return: the list of trending topics.
+    """
+    trending = compute()
+    cache.set(CACHE_KEY, trending, settings.TRENDING_REFRESH)
+    return trending
+
+def trending():
+    """
+    The function returns the cached trending topics, computing them again once the cache has expired.
+
+    :return: the list of trending topics.
+    """
+    topics = cache.get(CACHE_KEY)
+    if topics is None:
+        topics = refresh()
+    return topics
+
+def prune():
+    """
+    The function deletes the counters that are older than the trending window.
+
+    :return: the number of counters deleted.
+    """
+    start = timezone.now() - timedelta(seconds=settings.TRENDING_WINDOW)
+    deleted, _ = TopicCount.objects.filter(bucket__lt=bucket(start)).delete()
+    return deleted
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, api
 
 app_name = 'post'
 
@@ -17,4 +17,12 @@ urlpatterns = [
     path('social/<int:pk>/report/', views.report, name='report'),
     path('feed/<int:pk>/report/', views.oreport, name='oreport'),
     path('feed/<int:pk>/apply/', views.apply, name='apply'),
+    path('search/', views.search, name='search'),
+    path('api/social/', api.social, name='api_social'),
+    path('api/feed/', api.feed, name='api_feed'),
+    path('api/social/new/', api.social_new, name='api_social_new'),
+    path('api/feed/new/', api.feed_new, name='api_feed_new'),
+    path('api/social/topic/<str:name>', api.topics, name='api_topic'),
+    path('api/feed/topic/<str:name>', api.otopics, name='api_otopic'),
+    path('api/u/<str:username>/', api.profile, name='api_profile'),
 ]
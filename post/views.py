@@ -2,15 +2,23 @@ from django.shortcuts import render, redirect
 from .forms import PostForm, OfferForm, TopicForm
 from .models import Post, Offer, Topic
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import F
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from staff.models import RePost, ReOffer
-from notifications.views import post as notify, offer as onotify, comment as cnotify
+from notifications.views import comment as cnotify
 from chat.views import send
+from . import trending, comments as threads, topics as topic_index, search as search_index
+from . import conditional, fanout, pages
 
 OFFER = 'post:offer'
 POST = 'post:post'
 SOCIAL = 'post:social'
 FEED = 'post:feed'
 
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=conditional.feed)
 def feed(request):
     """
     This function displays a feed of offers and allows users to create new offers with associated
@@ -20,9 +28,12 @@ def feed(request):
     server. It contains information about the user's request, such as the HTTP method used (GET, POST,
     etc.), any data submitted in the request, and the user's session information
     :return: an HTTP response that renders the 'post/feed.html' template with the context dictionary
-    containing the 'offers', 'form', and 'form_t' variables.
+    containing the 'offers', 'form', 'form_t' and 'cursor' variables, where 'cursor' points to the
+    next page of offers. When the 'following' parameter is present, only the offers of the home
+    timeline of the user are listed.
     """
-    offers = Offer.objects.filter(is_delete=False)
+    following = request.user.is_authenticated and 'following' in request.GET
+    offers, cursor = pages.home(request, Offer)
     if request.method == 'POST':
         form = OfferForm(request.POST, request.FILES)
         form_t = TopicForm(request.POST)
@@ -32,15 +43,17 @@ def feed(request):
             if request.user.profile.strikes == 0:
                 offer.save()
                 create_topics(form_t, offer)
-                for follower in request.user.profile.followers():
-                    onotify(request, follower, offer.pk)
+                fanout.enqueue(offer)
             return redirect(FEED)
     else:
         form = OfferForm()
         form_t = TopicForm()
-    context = {'offers':offers, 'form':form, 'form_t':form_t}
+    context = {'offers':offers, 'form':form, 'form_t':form_t, 'cursor':cursor, 'following':following,
+        'trending':trending.trending()}
     return render(request, 'post/feed.html', context)
 
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=conditional.social)
 def social(request):
     """
     This function displays posts and allows users to create new posts with topics and notifications.
@@ -49,9 +62,12 @@ def social(request):
     access the web application. It contains information about the user's request, such as the HTTP
     method used (GET, POST, etc.), the requested URL, any submitted data, and more
     :return: an HTTP response that renders the 'post/social.html' template with the context dictionary
-    containing the 'posts', 'form', and 'form_t' variables.
+    containing the 'posts', 'form', 'form_t' and 'cursor' variables, where 'cursor' points to the
+    next page of posts. When the 'following' parameter is present, only the posts of the home
+    timeline of the user are listed.
     """
-    posts = Post.objects.filter(is_delete=False)
+    following = request.user.is_authenticated and 'following' in request.GET
+    posts, cursor = pages.home(request, Post)
     if request.method == 'POST':
         form = PostForm(request.POST, request.FILES)
         form_t = TopicForm(request.POST)
@@ -61,13 +77,13 @@ def social(request):
             if request.user.profile.strikes == 0:
                 post.save()
                 create_topics(form_t, post)
-                for follower in request.user.profile.followers():
-                    notify(request, follower, post.pk)
+                fanout.enqueue(post)
             return redirect(SOCIAL)
     else:
         form = PostForm()
         form_t = TopicForm()
-    context = {'posts':posts, 'form':form, 'form_t':form_t}
+    context = {'posts':posts, 'form':form, 'form_t':form_t, 'cursor':cursor, 'following':following,
+        'trending':trending.trending()}
     return render(request, 'post/social.html', context)
 
 @login_required
@@ -128,16 +144,8 @@ def like(request, pk):
     :return: a redirect to the `POST` view with the primary key `pk` as a parameter.
     """
     post = Post.objects.get(pk=pk)
-    is_like = False
-    for like in post.likes.all():
-        if like == request.user:
-            is_like = True
-            break
     if request.user.profile.strikes <= 2:
-        if not is_like:
-            post.likes.add(request.user)
-        if is_like:
-            post.likes.remove(request.user)
+        toggle_like(post, request.user)
     return redirect(POST, pk)
 
 @login_required
@@ -155,16 +163,8 @@ def olike(request, pk):
     unliked.
     """
     offer = Offer.objects.get(pk=pk)
-    is_like = False
-    for like in offer.likes.all():
-        if like == request.user:
-            is_like = True
-            break
     if request.user.profile.strikes <= 2:
-        if not is_like:
-            offer.likes.add(request.user)
-        if is_like:
-            offer.likes.remove(request.user)
+        toggle_like(offer, request.user)
     return redirect(OFFER, pk)
 
 def offer(request, pk):
@@ -183,8 +183,8 @@ def offer(request, pk):
     the function will redirect to the FEED page. Otherwise, it will render the 'offer.html' template
     with the offer object passed in the context dictionary.
     """
-    offer = Offer.objects.get(pk=pk)
-    if offer.user in request.user.profile.blocking() or offer.user in request.user.profile.blocked():
+    offer = Offer.objects.cards(request.user).get(pk=pk)
+    if not Offer.objects.visible(request.user).filter(pk=pk).exists():
         return redirect(FEED)
     else:
         context = {'offer':offer}
@@ -203,8 +203,8 @@ def post(request, pk):
     user's blocking or blocked list, or a rendered HTML template with the post, comments, and forms for
     creating a new comment and topic.
     """
-    post = Post.objects.get(pk=pk)
-    if post.user in request.user.profile.blocking() or post.user in request.user.profile.blocked():
+    post = Post.objects.cards(request.user).get(pk=pk)
+    if not Post.objects.visible(request.user).filter(pk=pk).exists():
         return redirect(SOCIAL)
     else:
         if request.method == 'POST':
@@ -222,10 +222,17 @@ def post(request, pk):
         else:
             form = PostForm()
             form_t = TopicForm()
-        comments = Post.objects.filter(comment=post, is_delete=False).order_by('-timestamp')
-        context = {'post':post, 'form':form, 'comments':comments, 'form_t':form_t}
+        comments = threads.thread(post, request.user)
+        hide_parent = post.comment_id is not None and not Post.objects.visible(request.user)\
+            .filter(pk=post.comment_id).exists()
+        if post.comment_id is not None and not hide_parent:
+            post.comment = Post.objects.cards(request.user).get(pk=post.comment_id)
+        context = {'post':post, 'form':form, 'comments':comments, 'form_t':form_t,
+            'hide_parent':hide_parent}
         return render(request, 'post/post.html', context)
 
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=conditional.topics)
 def topics(request, name):
     """
     This function retrieves all posts associated with a given topic and renders them on a topic-specific
@@ -239,14 +246,16 @@ def topics(request, name):
     and the topic object filtered by the name parameter passed in the URL. If the tag object is not
     found, it redirects to the SOCIAL page.
     """
-    tag = Topic.objects.filter(name=name).first()
+    tag = Topic.objects.filter(name=topic_index.normalize(name)).first()
     if tag:
-        posts = Post.objects.filter(is_delete=False, topics__in=[tag])
+        posts, cursor = pages.tagged(request, Post, name)
     else:
         return redirect(SOCIAL)
-    context = {'posts':posts,'topic':tag}
+    context = {'posts':posts,'topic':tag, 'cursor':cursor}
     return render(request, 'post/topic.html', context)
 
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=conditional.otopics)
 def otopics(request, name):
     """
     This function retrieves offers related to a specific topic and renders them on a topic page.
@@ -263,14 +272,34 @@ def otopics(request, name):
     offers related to a specific topic. If the topic does not exist, the user is redirected to the FEED
     page.
     """
-    tag = Topic.objects.filter(name=name).first()
+    tag = Topic.objects.filter(name=topic_index.normalize(name)).first()
     if tag:
-        offers = Offer.objects.filter(is_delete=False, topics__in=[tag])
+        offers, cursor = pages.tagged(request, Offer, name)
     else:
         return redirect(FEED)
-    context = {'offers':offers}
+    context = {'offers':offers, 'cursor':cursor}
     return render(request, 'post/topic.html', context)
 
+def search(request):
+    """
+    This function searches the posts or the offers that match the text typed by the user, best matches
+    first, and renders them with the same cards as the topic pages.
+    
+    :param request: The request parameter is an HttpRequest object whose query string has the text to
+    search in 'q', the kind of content to search in 'kind' ('posts' or 'offers') and the cursor of the
+    page in 'cursor'
+    :return: an HTTP response that renders the 'post/search.html' template with the results of the
+    page, the query, the kind and the cursor of the next page.
+    """
+    query = request.GET.get('q', '')
+    kind = 'offers' if request.GET.get('kind') == 'offers' else 'posts'
+    model = Offer if kind == 'offers' else Post
+    ids, cursor = search_index.search(model, query, request.GET.get('cursor'))
+    items = model.objects.filter(pk__in=ids).timeline(request.user).in_bulk()
+    results = [items[pk] for pk in ids if pk in items]
+    context = {kind:results, 'query':query, 'kind':kind, 'cursor':cursor}
+    return render(request, 'post/search.html', context)
+
 @login_required
 def report(request, pk):
     """
@@ -343,24 +372,37 @@ def apply(request, pk):
 
 def create_topics(form, post):
     """
-    This function creates topics for a post by splitting the post's name into words, filtering out
-    non-alphanumeric characters, and checking if a topic with that name already exists. If it does, the
-    post is associated with that topic, otherwise a new topic is created and associated with the post.
+    This function adds the topics typed in a form to a post or an offer. The words are normalized and
+    resolved in bulk, so a post with ten topics costs the same number of queries as a post with one.
     
-    :param form: The form parameter is an instance of a Django form that is used to create or update a
-    Topic object
-    :param post: The "post" parameter is likely an instance of a model representing a post or message in
-    a forum or discussion board. The code is adding topics to this post based on the words in the topic
-    name entered in a form
-    """
-    if form.is_valid:
-        t = form.save(commit=False)
-        for word in t.name.split():
-            new_word = ''.join(filter(str.isalnum, word))
-            topic = Topic.objects.filter(name=new_word).first()
-            if topic:
-                post.topics.add(topic.pk)
-            else:
-                topic = Topic(name=new_word)
-                topic.save()
-                post.topics.add(topic.pk)
+    :param form: The form parameter is an instance of TopicForm with the names of the topics separated
+    by spaces
+    :param post: The "post" parameter is the Post or Offer instance that the topics are added to
+    """
+    if form.is_valid():
+        ids = topic_index.attach(post, form.cleaned_data['name'].split())
+        trending.record(ids)
+        if ids:
+            type(post).objects.filter(pk=post.pk).touch()
+
+def toggle_like(item, user):
+    """
+    This function likes or unlikes a post or an offer and keeps its `like_count` in sync with atomic
+    updates, using the unique index of the likes table to check whether the user already liked it.
+    The count only moves by the rows actually deleted or inserted, so a like sent twice at the same
+    time is counted once.
+
+    :param item: The item parameter is the Post or Offer being liked or unliked
+    :param user: The user parameter is the User who likes or unlikes the item
+    """
+    model = type(item)
+    through = model.likes.through.objects
+    key = {model._meta.model_name: item, 'user': user}
+    with transaction.atomic():
+        deleted, _ = through.filter(**key).delete()
+        if deleted:
+            model.objects.filter(pk=item.pk).update(like_count=F('like_count') - deleted)
+        else:
+            _, created = through.get_or_create(**key)
+            if created:
+                model.objects.filter(pk=item.pk).update(like_count=F('like_count') + 1)
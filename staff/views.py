@@ -4,10 +4,26 @@ from chat.models import Message
 from app.views import strike as notify
 from app.models import Profile
 from django.utils import timezone
+from django.db.models import Count, Prefetch
 
 SOCIAL = 'staff:social'
 FEED = 'staff:feed'
 
+def reported(reports, viewer):
+    """
+    This function loads the reported posts or offers of some reports as cards, and counts the users who
+    reported them, so the reports page is rendered with a fixed number of queries. The content of the
+    users who have blocked the staff member is not hidden.
+
+    :param reports: The reports parameter is a queryset of RePost or ReOffer objects
+    :param viewer: The viewer parameter is the staff member who is reviewing the reports
+    :return: a queryset of reports with the reported item prefetched and a `reports` attribute.
+    """
+    field = 'post' if reports.model is RePost else 'offer'
+    model = reports.model._meta.get_field(field).related_model
+    return reports.annotate(reports=Count('reported_by'))\
+        .prefetch_related(Prefetch(field, queryset=model.objects.cards(viewer)))
+
 def home(request):
     """
     The "home" function checks if the user is a staff member and renders the staff home page if they
@@ -40,7 +56,7 @@ def feed(request):
     the user is not a staff member, the function redirects to the 'home' page.
     """
     if request.user.is_staff:
-        offers = ReOffer.objects.all().order_by('timestamp')
+        offers = reported(ReOffer.objects.all(), request.user).order_by('timestamp')
         context = {'offers':offers}
         return render(request, 'staff/feed.html', context)
     else:
@@ -65,7 +81,7 @@ def offer(request, pk):
     not a staff member, the function redirects to the 'home'
     """
     if request.user.is_staff:
-        offers = ReOffer.objects.filter(pk=pk)
+        offers = reported(ReOffer.objects.filter(pk=pk), request.user)
         if offers:
             context = {'offers':offers}
             return render(request, 'staff/feed.html', context)
@@ -137,7 +153,7 @@ def social(request):
     the function redirects to the 'home' page.
     """
     if request.user.is_staff:
-        posts = RePost.objects.all().order_by('timestamp')
+        posts = reported(RePost.objects.all(), request.user).order_by('timestamp')
         context = {'posts':posts}
         return render(request, 'staff/social.html', context)
     else:
@@ -161,7 +177,7 @@ def post(request, pk):
     not a staff member, they are redirected to the home page.
     """
     if request.user.is_staff:
-        posts = RePost.objects.filter(pk=pk)
+        posts = reported(RePost.objects.filter(pk=pk), request.user)
         if posts:
             context = {'posts':posts}
             return render(request, 'staff/social.html', context)
@@ -325,7 +341,7 @@ def user(request):
     attribute. If the user is not a staff member, the function redirects them to the 'home' page.
     """
     if request.user.is_staff:
-        users = ReUser.objects.all().order_by('timestamp')
+        users = ReUser.objects.annotate(reports=Count('reported_by')).order_by('timestamp')
         context = {'users':users}
         return render(request, 'staff/user.html', context)
     else:
@@ -353,7 +369,7 @@ def bus(request, pk):
         report = ReUser.objects.filter(pk=pk).first()
         if report:
             if report.user.profile.business:
-                offers = report.user.offers.filter(is_delete=False)
+                offers = report.user.offers.filter(is_delete=False).cards(request.user)
                 context = {'user':report.user, 'offers':offers, 'report':report}
                 return render(request, 'staff/bus.html', context)
             else:
@@ -382,7 +398,7 @@ def profile(request, pk):
     if request.user.is_staff:
         report = ReUser.objects.filter(pk=pk).first()
         if report:
-            posts = report.user.posts.filter(is_delete=False)
+            posts = report.user.posts.filter(is_delete=False).cards(request.user)
             context = {'user':report.user, 'posts':posts, 'report':report}
             return render(request, 'staff/profile.html', context)
         else:
@@ -481,7 +497,7 @@ def bprofile(request, pk):
     if request.user.is_staff:
         form = FoBusiness.objects.filter(pk=pk).first()
         if form:
-            posts = form.business.posts.filter(is_delete=False)
+            posts = form.business.posts.filter(is_delete=False).cards(request.user)
             context = {'report':form, 'user':form.business, 'posts':posts}
             return render(request, 'staff/bprofile.html', context)
         else:
@@ -578,7 +594,7 @@ def sprofile(request, pk):
     if request.user.is_staff:
         form = FoStaff.objects.filter(pk=pk).first()
         if form:
-            posts = form.staff.posts.filter(is_delete=False)
+            posts = form.staff.posts.filter(is_delete=False).cards(request.user)
             context = {'report':form, 'user':form.staff, 'posts':posts}
             return render(request, 'staff/sprofile.html', context)
         else: